@@ -0,0 +1,111 @@
+"""
+Sorted prefix array for type-ahead over card names, keywords and subtypes.
+
+Every searchable term is stored lower-cased in one sorted list, so the
+completions of a prefix are a contiguous run found with a binary search.
+Names are also indexed from each later word ("Loose Cannon" for
+"Jinx, Loose Cannon") so typing a word from the middle of a name still
+completes it. Entries are added and removed per card, so a card write only
+touches that card's terms.
+"""
+
+import re
+from bisect import bisect_left, insort
+from typing import Dict, List, Set, Tuple
+
+# Completion sources, in the order they are ranked
+COMPLETION_FIELDS = ("name", "keywords", "subtype")
+
+WORD_START_PATTERN = re.compile(r"(?<![\w'])\w")
+
+# (lower-cased term, field rank, display text)
+CompletionKey = Tuple[str, int, str]
+
+
+def _completion_keys(card: dict) -> List[CompletionKey]:
+    keys = set()
+    for field_rank, field in enumerate(COMPLETION_FIELDS):
+        value = card.get(field)
+        values = value if isinstance(value, list) else [value]
+        for text in values:
+            if not isinstance(text, str) or not text.strip():
+                continue
+            display = text.strip()
+            lowered = display.lower()
+            keys.add((lowered, field_rank, display))
+            if field == "name":
+                for match in WORD_START_PATTERN.finditer(lowered):
+                    if match.start() > 0:
+                        keys.add((lowered[match.start():], field_rank, display))
+    return list(keys)
+
+
+class CompletionIndex:
+    """Prefix completions over card names, keywords and subtypes"""
+
+    def __init__(self):
+        self._keys: List[CompletionKey] = []
+        self._card_ids: Dict[CompletionKey, Set[str]] = {}
+        self._keys_by_card: Dict[str, List[CompletionKey]] = {}
+
+    def add(self, card: dict):
+        card_id = card.get("card_id")
+        if not card_id:
+            return
+        self.remove(card_id)
+        keys = _completion_keys(card)
+        for key in keys:
+            card_ids = self._card_ids.get(key)
+            if card_ids is None:
+                card_ids = self._card_ids[key] = set()
+                insort(self._keys, key)
+            card_ids.add(card_id)
+        self._keys_by_card[card_id] = keys
+
+    def remove(self, card_id: str):
+        for key in self._keys_by_card.pop(card_id, []):
+            card_ids = self._card_ids[key]
+            card_ids.discard(card_id)
+            if not card_ids:
+                del self._card_ids[key]
+                del self._keys[bisect_left(self._keys, key)]
+
+    def complete(self, prefix: str, limit: int = 10) -> List[dict]:
+        """Top completions for a prefix: names first, then keywords, then subtypes.
+
+        Within a field, completions where the prefix starts the whole text come
+        before mid-name word matches, then shorter texts first.
+        """
+        prefix = prefix.strip().lower()
+        if not prefix or limit <= 0:
+            return []
+
+        # Group matching terms by what is shown to the user
+        matches: Dict[Tuple[int, str], dict] = {}
+        index = bisect_left(self._keys, (prefix,))
+        while index < len(self._keys) and self._keys[index][0].startswith(prefix):
+            key = self._keys[index]
+            term, field_rank, display = key
+            whole_text = term == display.lower()
+            match = matches.get((field_rank, display))
+            if match is None:
+                match = matches[(field_rank, display)] = {"whole_text": whole_text, "card_ids": set()}
+            match["whole_text"] = match["whole_text"] or whole_text
+            match["card_ids"] |= self._card_ids[key]
+            index += 1
+
+        ranked = sorted(
+            matches.items(),
+            key=lambda item: (item[0][0], not item[1]["whole_text"], len(item[0][1]), item[0][1])
+        )
+
+        completions = []
+        for (field_rank, display), match in ranked[:limit]:
+            card_ids = sorted(match["card_ids"])
+            completions.append({
+                "text": display,
+                "field": COMPLETION_FIELDS[field_rank],
+                "card_id": card_ids[0],
+                "card_ids": card_ids
+            })
+        return completions
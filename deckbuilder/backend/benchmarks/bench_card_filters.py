@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark the bitmap filters of the in-memory card catalog against the
+equivalent MongoDB queries used before (find + sort + to_list).
+
+Usage:
+    python benchmarks/bench_card_filters.py              # cards from MongoDB
+    python benchmarks/bench_card_filters.py --scale 20   # catalog copied 20x, as if more sets existed
+
+Cards are read from MongoDB on localhost:27017. With --scale > 1 only the
+catalog is timed, since MongoDB does not hold the copied cards.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Add the backend directory to the path so we can import the catalog
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from card_catalog import CardCatalog
+
+# (label, catalog.select kwargs, equivalent Mongo filter, sort field)
+QUERIES = [
+    ("all cards", {}, {}, "name"),
+    ("one color", {"colors": ["Fury"]}, {"color": "Fury"}, "name"),
+    ("two colors + rarity", {"colors": ["Fury", "Mind"], "rarities": ["Rare"]},
+     {"color": {"$in": ["Fury", "Mind"]}, "rarity": "Rare"}, "cost"),
+    ("type + cost range", {"card_types": ["Unit"], "min_cost": 2, "max_cost": 4},
+     {"card_type": "Unit", "cost": {"$gte": 2, "$lte": 4}}, "name"),
+    ("set + variant + keyword", {"set_codes": ["OGN"], "variants": ["regular"], "keywords": ["Accelerate"]},
+     {"set_code": "OGN", "variant": "regular", "keywords": "Accelerate"}, "name"),
+    ("five facets", {"set_codes": ["OGN", "OGS"], "card_types": ["Unit", "Spell"], "colors": ["Calm"],
+                     "rarities": ["Common", "Uncommon"], "exact_cost": 3},
+     {"set_code": {"$in": ["OGN", "OGS"]}, "card_type": {"$in": ["Unit", "Spell"]}, "color": "Calm",
+      "rarity": {"$in": ["Common", "Uncommon"]}, "cost": 3}, "set_code"),
+]
+
+
+def time_call(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+async def time_async_call(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        await func()
+    return (time.perf_counter() - start) / repeat
+
+
+def scaled_cards(cards, scale):
+    """Copy the catalog `scale` times (with suffixed card_ids) to simulate future sets"""
+    if scale <= 1:
+        return cards
+    result = []
+    for copy in range(scale):
+        for card in cards:
+            clone = dict(card)
+            clone["card_id"] = f"{card['card_id']}#{copy}"
+            result.append(clone)
+    return result
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=1, help="copy the catalog N times")
+    parser.add_argument("--repeat", type=int, default=200, help="iterations per query")
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient("mongodb://localhost:27017", serverSelectionTimeoutMS=2000)
+    cards_collection = client.deckbuilder.cards
+
+    try:
+        cards = await cards_collection.find().to_list(None)
+    except Exception as e:
+        print(f"MongoDB not available: {e}")
+        client.close()
+        return
+
+    if not cards:
+        print("No cards found - run populate_cards.py first")
+        client.close()
+        return
+
+    for card in cards:
+        card["_id"] = str(card["_id"])
+
+    catalog = CardCatalog()
+    catalog.load(scaled_cards(cards, args.scale))
+    print(f"Catalog: {len(catalog)} cards (scale x{args.scale}), {args.repeat} iterations per query\n")
+    print(f"{'query':<26} {'matches':>8} {'bitmap (us)':>12} {'mongo (us)':>12} {'speedup':>9}")
+    print("-" * 71)
+
+    for label, select_kwargs, mongo_filter, sort_field in QUERIES:
+        def run_catalog():
+            return catalog.ordered(catalog.select(**select_kwargs), sort_field)
+
+        matches = len(run_catalog())
+        catalog_time = time_call(run_catalog, args.repeat)
+
+        mongo_column = "-"
+        speedup_column = "-"
+        if args.scale == 1:
+            async def run_mongo():
+                return await cards_collection.find(mongo_filter).sort([(sort_field, 1)]).to_list(None)
+
+            mongo_time = await time_async_call(run_mongo, max(args.repeat // 10, 1))
+            mongo_column = f"{mongo_time * 1e6:.0f}"
+            speedup_column = f"{mongo_time / catalog_time:.0f}x"
+
+        print(f"{label:<26} {matches:>8} {catalog_time * 1e6:>12.1f} {mongo_column:>12} {speedup_column:>9}")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
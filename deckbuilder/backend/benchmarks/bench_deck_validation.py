@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark of batch deck validation (POST /decks/validate-batch): validating
+every deck inline versus spreading chunks over the process pool.
+
+Runs on synthetic cards and decks, so MongoDB is not needed.
+
+Usage:
+    python benchmarks/bench_deck_validation.py [--decks 20000]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+# Add the backend directory to the path so we can import the backend modules
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import deck_validation
+from deck_validation import shutdown_executor, validate_chunk, validate_decks
+
+MAIN_TYPES = ["Unit", "Spell", "Gear", "Champion Unit"]
+
+
+def make_card_types(count: int = 300) -> dict:
+    """card_id -> card_type for a synthetic set"""
+    card_types = {}
+    for number in range(1, count + 1):
+        card_id = f"OGN_{number:03d}"
+        if number <= 10:
+            card_types[card_id] = "Legend"
+        elif number <= 30:
+            card_types[card_id] = "Battlefield"
+        elif number <= 40:
+            card_types[card_id] = "Rune"
+        else:
+            card_types[card_id] = MAIN_TYPES[number % len(MAIN_TYPES)]
+    return card_types
+
+
+def make_deck(rnd: random.Random, card_types: dict) -> dict:
+    """Quantities of a mostly legal deck (about one in ten breaks a rule)"""
+    by_type = {}
+    for card_id, card_type in card_types.items():
+        by_type.setdefault(card_type, []).append(card_id)
+    quantities = {rnd.choice(by_type["Legend"]): 1}
+    for card_id in rnd.sample(by_type["Battlefield"], 3):
+        quantities[card_id] = 1
+    runes = rnd.sample(by_type["Rune"], 2)
+    quantities[runes[0]] = 6
+    quantities[runes[1]] = 6
+    main_cards = [card_id for card_type in MAIN_TYPES for card_id in by_type[card_type]]
+    for card_id in rnd.sample(main_cards, 13):
+        quantities[card_id] = 3
+    if rnd.random() < 0.1:
+        quantities[rnd.choice(main_cards)] = 4
+    return quantities
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--decks", type=int, default=20000, help="decks per batch")
+    args = parser.parse_args()
+
+    rnd = random.Random(1)
+    card_types = make_card_types()
+    decks = [make_deck(rnd, card_types) for _ in range(args.decks)]
+
+    print(f"{args.decks} decks, {os.cpu_count()} cores\n")
+    print(f"{'method':<24} {'seconds':>9} {'decks/s':>12}")
+    print("-" * 47)
+
+    start = time.perf_counter()
+    inline = validate_chunk(decks, card_types)
+    elapsed = time.perf_counter() - start
+    print(f"{'inline':<24} {elapsed:>9.3f} {args.decks / elapsed:>12,.0f}")
+
+    # Start the workers before timing, as a running server would have them
+    deck_validation.PARALLEL_MIN_DECKS = 0
+    asyncio.run(validate_decks(decks[:deck_validation.CHUNK_SIZE], card_types))
+    start = time.perf_counter()
+    parallel = asyncio.run(validate_decks(decks, card_types))
+    elapsed = time.perf_counter() - start
+    print(f"{'process pool':<24} {elapsed:>9.3f} {args.decks / elapsed:>12,.0f}")
+    shutdown_executor()
+
+    assert parallel == inline
+    print(f"\n{sum(1 for violations in inline if violations)} invalid decks")
+
+
+if __name__ == "__main__":
+    main()
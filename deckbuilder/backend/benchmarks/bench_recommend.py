@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the deck x card matrix behind POST /decks/recommend: time to
+build it, query latency for partial decks of different sizes, the cost of
+incremental deck writes and of a compaction.
+
+Runs on synthetic decks, so MongoDB is not needed.
+
+Usage:
+    python benchmarks/bench_recommend.py [--decks 200000] [--cards 600] [--queries 200]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+# Add the backend directory to the path so we can import the backend modules
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from deck_recommend import DeckMatrix
+
+
+def synthetic_decks(deck_count, card_count, seed=1):
+    """Decks of 14-20 distinct cards drawn around a few archetypes, like real decklists"""
+    rnd = random.Random(seed)
+    card_ids = [f"OGN_{number:03d}" for number in range(1, card_count + 1)]
+    archetypes = [rnd.sample(card_ids, 40) for _ in range(max(card_count // 20, 1))]
+    decks = []
+    for number in range(deck_count):
+        core = rnd.choice(archetypes)
+        cards = set(rnd.sample(core, 12)) | set(rnd.sample(card_ids, rnd.randint(2, 8)))
+        decks.append((f"deck{number}", sorted(cards)))
+    return decks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--decks", type=int, default=200_000, help="stored decks")
+    parser.add_argument("--cards", type=int, default=600, help="distinct cards")
+    parser.add_argument("--queries", type=int, default=200, help="queries per partial deck size")
+    args = parser.parse_args()
+
+    decks = synthetic_decks(args.decks, args.cards)
+    matrix = DeckMatrix()
+    start = time.perf_counter()
+    matrix.load(decks)
+    print(f"Built a {matrix.matrix.shape[0]:,} x {matrix.matrix.shape[1]:,} matrix "
+          f"({matrix.matrix.nnz:,} entries) in {time.perf_counter() - start:.2f}s\n")
+
+    rnd = random.Random(2)
+    print(f"{'partial deck':>13} {'ms/query':>10}")
+    print("-" * 24)
+    for size in (0, 1, 5, 15):
+        queries = [rnd.choice(decks)[1][:size] for _ in range(args.queries)]
+        start = time.perf_counter()
+        for card_ids in queries:
+            matrix.recommend(card_ids, lambda card_id: True, 20)
+        print(f"{size:>13} {(time.perf_counter() - start) / args.queries * 1000:>10.2f}")
+
+    writes = synthetic_decks(2000, args.cards, seed=3)
+    start = time.perf_counter()
+    for (_, card_ids), (deck_id, _) in zip(writes, decks):
+        matrix.update(deck_id, card_ids)
+    elapsed = time.perf_counter() - start
+    print(f"\n{len(writes):,} deck writes: {elapsed / len(writes) * 1e6:.1f} us/write")
+
+    start = time.perf_counter()
+    matrix.recommend(writes[0][1][:5], lambda card_id: True, 20)
+    print(f"First query with {len(matrix.pending):,} pending decks: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    start = time.perf_counter()
+    snapshot = matrix.compaction_snapshot()
+    matrix.install(snapshot, DeckMatrix.compact(snapshot))
+    print(f"Compaction: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
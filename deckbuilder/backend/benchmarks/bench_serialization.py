@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of the ways a list of card documents can be turned into a
+JSON response body:
+
+  1. convert_mongo_document + jsonable_encoder + json.dumps (FastAPI's default path)
+  2. serialization.encode_json on the raw documents (MongoJSONResponse)
+  3. joining per-card bytes cached by the card catalog (GET /cards, /cards/search)
+
+Runs on synthetic documents, so MongoDB is not needed.
+
+Usage:
+    python benchmarks/bench_serialization.py [--cards 400] [--repeat 50]
+"""
+
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+# Add the backend directory to the path so we can import the backend modules
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+
+from card_catalog import CardCatalog
+from serialization import convert_mongo_document, encode_json, encode_list_response, orjson
+
+
+def make_card(number: int) -> dict:
+    """A card document shaped like the ones populate_cards.py inserts"""
+    card_id = f"OGN_{number:03d}"
+    return {
+        "_id": ObjectId(),
+        "name": f"Card {card_id}",
+        "image_path": f"{card_id}.png",
+        "card_id": card_id,
+        "set_name": "Origins_MainSet",
+        "set_code": "OGN",
+        "set_release_date": "2024-01-01",
+        "card_type": "Unit",
+        "subtype": ["Yordle"],
+        "color": ["Fury"],
+        "cost": number % 8,
+        "rarity": "Common",
+        "might": 3,
+        "description": "When you play me, deal 2 damage to an enemy unit here. " * 2,
+        "flavor_text": "Some say the rift sings before it opens.",
+        "artist": "Riot Games",
+        "collector_number": f"{number:03d}",
+        "variant": "regular",
+        "keywords": ["Accelerate"],
+        "created_at": datetime.now(),
+        "updated_at": datetime.now()
+    }
+
+
+def default_path(cards):
+    """What the endpoints did before: convert, jsonable_encoder, then JSONResponse.render"""
+    content = {"cards": [convert_mongo_document(card) for card in cards], "count": len(cards)}
+    return json.dumps(
+        jsonable_encoder(content),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cards", type=int, default=400, help="documents per response")
+    parser.add_argument("--repeat", type=int, default=50, help="responses encoded per method")
+    args = parser.parse_args()
+
+    cards = [make_card(number) for number in range(1, args.cards + 1)]
+    # The default path mutates its input, so every run gets fresh copies
+    fresh_copies = [copy.deepcopy(cards) for _ in range(args.repeat)]
+
+    catalog = CardCatalog()
+    catalog.load([convert_mongo_document(copy.deepcopy(card)) for card in cards])
+    slots = list(range(len(catalog)))
+    for slot in slots:
+        catalog.encoded(slot)
+
+    methods = [
+        ("convert + jsonable_encoder + json", lambda run: default_path(fresh_copies[run])),
+        ("encode_json (single pass)", lambda run: encode_json({"cards": cards, "count": len(cards)})),
+        ("cached card bytes", lambda run: encode_list_response("cards", map(catalog.encoded, slots), {"count": len(slots)})),
+    ]
+
+    print(f"{args.cards} cards per response, {args.repeat} responses, encoder: {'orjson' if orjson else 'json'}\n")
+    print(f"{'method':<36} {'ms/response':>12} {'speedup':>9}")
+    print("-" * 59)
+
+    baseline = None
+    for label, method in methods:
+        start = time.perf_counter()
+        for run in range(args.repeat):
+            method(run)
+        elapsed = (time.perf_counter() - start) / args.repeat
+        baseline = baseline or elapsed
+        print(f"{label:<36} {elapsed * 1e3:>12.3f} {baseline / elapsed:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
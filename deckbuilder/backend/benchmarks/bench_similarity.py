@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the MinHash/LSH signatures behind GET /decks/{deck_id}/similar
+and GET /decks/near-duplicates: signing cost per deck, and how many of the
+truly similar decks the band buckets find (recall) compared with a brute
+force scan, for the number of decks each approach has to read.
+
+Runs on synthetic decks with an in-memory band index, so MongoDB is not
+needed.
+
+Usage:
+    python benchmarks/bench_similarity.py [--decks 20000] [--queries 200]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+# Add the backend directory to the path so we can import the backend modules
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from deck_similarity import deck_bands, deck_similarity
+
+
+def synthetic_decks(deck_count, seed=1):
+    """Variations of a few hundred base lists: each deck swaps 0-6 main cards"""
+    rnd = random.Random(seed)
+    card_ids = [f"OGN_{number:03d}" for number in range(1, 301)]
+    bases = []
+    for _ in range(max(deck_count // 50, 1)):
+        main = rnd.sample(card_ids, 14)
+        bases.append({**{card_id: 3 for card_id in main[:13]}, main[13]: 1})
+    decks = []
+    for _ in range(deck_count):
+        deck = dict(rnd.choice(bases))
+        for card_id in rnd.sample(list(deck), rnd.randint(0, 6)):
+            deck.pop(card_id)
+            deck[rnd.choice(card_ids)] = 3
+        decks.append(deck)
+    return decks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--decks", type=int, default=20_000, help="stored decks")
+    parser.add_argument("--queries", type=int, default=200, help="similar-deck queries")
+    args = parser.parse_args()
+
+    decks = synthetic_decks(args.decks)
+    start = time.perf_counter()
+    bands = [deck_bands(deck) for deck in decks]
+    elapsed = time.perf_counter() - start
+    print(f"Signed {len(decks):,} decks: {elapsed / len(decks) * 1e6:.0f} us/deck\n")
+
+    buckets = {}
+    for position, keys in enumerate(bands):
+        for key in keys:
+            buckets.setdefault(key, []).append(position)
+
+    rnd = random.Random(2)
+    queries = rnd.sample(range(len(decks)), min(args.queries, len(decks)))
+    print(f"{'similarity >=':>14} {'recall':>8} {'decks read (LSH)':>18} {'decks read (scan)':>18}")
+    print("-" * 62)
+    for threshold in (0.9, 0.8, 0.7, 0.5):
+        found = 0
+        expected = 0
+        read = 0
+        for query in queries:
+            candidates = {position for key in bands[query] for position in buckets[key]} - {query}
+            read += len(candidates)
+            truth = {
+                position for position, deck in enumerate(decks)
+                if position != query and deck_similarity(decks[query], deck) >= threshold
+            }
+            expected += len(truth)
+            found += len(truth & candidates)
+        recall = found / expected if expected else 1.0
+        print(f"{threshold:>14} {recall:>8.3f} {read / len(queries):>18,.0f} {len(decks) - 1:>18,}")
+
+
+if __name__ == "__main__":
+    main()
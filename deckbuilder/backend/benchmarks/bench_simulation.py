@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the draw simulator behind GET /decks/{deck_id}/simulate:
+shuffles per second for a 40-card main deck, by number of target cards and
+turns, and how far the Monte Carlo estimates are from the exact
+hypergeometric probabilities.
+
+Runs on a synthetic deck, so MongoDB is not needed.
+
+Usage:
+    python benchmarks/bench_simulation.py [--shuffles 1000000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add the backend directory to the path so we can import the backend modules
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from deck_simulation import draw_probabilities
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shuffles", type=int, default=1_000_000, help="shuffles per run")
+    args = parser.parse_args()
+
+    # 13 cards x 3 copies + 1 single copy = 40 cards
+    quantities = {f"OGN_{number:03d}": 3 for number in range(1, 14)}
+    quantities["OGN_014"] = 1
+    card_ids = list(quantities)
+
+    print(f"40-card deck, {args.shuffles:,} shuffles per run\n")
+    print(f"{'targets':>8} {'turns':>6} {'seconds':>9} {'shuffles/s':>12} {'max |exact - simulated|':>24}")
+    print("-" * 63)
+
+    for targets, turns in ((1, 5), (3, 5), (3, 10), (14, 10)):
+        start = time.perf_counter()
+        result = draw_probabilities(quantities, card_ids[-targets:], turns, shuffles=args.shuffles, seed=1)
+        elapsed = time.perf_counter() - start
+        error = max(
+            abs(entry["exact"] - entry["simulated"])
+            for card in result["cards"] for entry in card["by_turn"]
+        )
+        print(f"{targets:>8} {turns:>6} {elapsed:>9.3f} {args.shuffles / elapsed:>12,.0f} {error:>24.4f}")
+
+
+if __name__ == "__main__":
+    main()
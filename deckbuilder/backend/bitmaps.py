@@ -0,0 +1,23 @@
+"""
+Helpers for bitmaps stored as Python ints (bit N set = item in slot N).
+"""
+
+from typing import List
+
+
+def bit_positions(bits: int) -> List[int]:
+    """Return the positions of the set bits in ascending order"""
+    # bin() runs in C, so scanning its (reversed) string is much faster than
+    # peeling bits off one at a time on a large int
+    digits = bin(bits)[:1:-1]
+    positions = []
+    index = digits.find("1")
+    while index != -1:
+        positions.append(index)
+        index = digits.find("1", index + 1)
+    return positions
+
+
+def popcount(bits: int) -> int:
+    """Number of set bits"""
+    return bin(bits).count("1")
@@ -0,0 +1,457 @@
+"""
+In-memory snapshot of the cards collection.
+
+The card catalog only changes when cards are written through the admin
+endpoints, so instead of querying MongoDB on every GET /cards request the
+backend keeps every card document (already converted to its JSON-serializable
+form) in memory and runs the filters, sorts and limits in-process.
+
+Every card lives in a numbered slot. For each value of the facet fields
+(color, rarity, card_type, cost, set_code, variant, keywords) the catalog keeps
+a bitmap - a Python int with bit N set when the card in slot N has that value -
+so any filter combination is evaluated as bitwise AND/OR over those bitmaps.
+Free-text search goes through a gram/token index over the same slots
+(see text_index) and type-ahead through a sorted prefix array (see autocomplete).
+The summaries behind /cards/options and /cards/stats/* are maintained
+alongside (see catalog_views).
+"""
+
+import base64
+import json
+from typing import Optional, List, Dict, Iterable, Tuple
+
+from autocomplete import CompletionIndex
+from bitmaps import bit_positions, popcount
+from catalog_views import CatalogViews
+from serialization import encode_json, project_document
+from text_index import CardTextIndex
+
+
+# Fields that get one bitmap per distinct value
+BITMAP_FIELDS = ("color", "rarity", "card_type", "cost", "set_code", "variant", "keywords")
+
+# Fields that GET /cards and /cards/search can sort by
+SORT_FIELDS = ("name", "cost", "rarity", "set_code", "card_id")
+
+# Fieldsets whose encoded bytes are cached per card (beyond the full document)
+MAX_CACHED_FIELDSETS = 4
+
+# Response key -> bitmap field of the facet counts returned by /cards/search
+FACET_FIELDS = {
+    "colors": "color",
+    "rarities": "rarity",
+    "card_types": "card_type",
+    "costs": "cost",
+    "sets": "set_code",
+}
+
+# Fields matched by the free-text search of GET /cards and /cards/search
+CARDS_TEXT_FIELDS = ("name", "description", "flavor_text", "keywords")
+SEARCH_TEXT_FIELDS = ("name", "description", "flavor_text", "keywords", "subtype")
+
+
+def _indexed_values(value) -> list:
+    """Values a document is indexed under: each element of an array, or the scalar itself"""
+    values = value if isinstance(value, list) else [value]
+    return [item for item in values if item is None or isinstance(item, (str, int, float, bool))]
+
+
+def encode_cursor(order: str, key: tuple) -> str:
+    """Opaque, URL-safe cursor holding the order it belongs to and the last sort key"""
+    payload = json.dumps([order, list(key)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, order: str) -> tuple:
+    """Return the sort key stored in a cursor, checking it was issued for the same order"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_order, key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if cursor_order != order or not isinstance(key, list):
+        raise ValueError("Cursor does not match the requested sort order")
+    return tuple(key)
+
+
+def _sort_value(value):
+    """Order values the way Mongo does: missing/null first, then numbers, then strings"""
+    if value is None:
+        return (0, 0)
+    if isinstance(value, bool):
+        return (3, int(value))
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    return (4, str(value))
+
+
+class CardCatalog:
+    """Holds every card document in memory and answers card queries from bitmaps"""
+
+    def __init__(self):
+        self._slots: List[Optional[dict]] = []
+        self._slot_by_id: Dict[str, int] = {}
+        self._live = 0
+        self._bitmaps: Dict[str, Dict[object, int]] = {field: {} for field in BITMAP_FIELDS}
+        self._text_index = CardTextIndex(SEARCH_TEXT_FIELDS)
+        self._completions = CompletionIndex()
+        self._views = CatalogViews()
+        # Slot -> fieldset -> JSON bytes of the card, so unchanged cards are encoded only once
+        self._encoded: Dict[int, Dict[Optional[tuple], bytes]] = {}
+        # Sort field -> rank of every slot, rebuilt lazily after writes
+        self._ranks: Dict[str, List[int]] = {}
+        self.loaded = False
+        # Bumped on every write so cached views can tell when they are stale
+        self.version = 0
+
+    def __len__(self):
+        return len(self._slot_by_id)
+
+    # ----- Maintenance -----
+
+    def load(self, cards: List[dict]):
+        """Replace the whole snapshot with the given (already serialized) card documents"""
+        self._slots = []
+        self._slot_by_id = {}
+        self._live = 0
+        self._bitmaps = {field: {} for field in BITMAP_FIELDS}
+        self._text_index = CardTextIndex(SEARCH_TEXT_FIELDS)
+        self._completions = CompletionIndex()
+        self._views = CatalogViews()
+        self._encoded = {}
+        for card in cards:
+            if card.get("card_id"):
+                self._insert(card)
+        self._ranks = {}
+        self.loaded = True
+        self.version += 1
+
+    def upsert(self, card: dict):
+        """Insert or replace a single card in the snapshot"""
+        card_id = card.get("card_id")
+        if not card_id:
+            return
+        slot = self._slot_by_id.get(card_id)
+        if slot is None:
+            self._insert(card)
+        else:
+            self._unindex(slot)
+            self._slots[slot] = card
+            self._index(slot)
+        self._ranks = {}
+        self.version += 1
+
+    def remove(self, card_id: str):
+        """Drop a card from the snapshot"""
+        slot = self._slot_by_id.pop(card_id, None)
+        if slot is None:
+            return
+        self._unindex(slot)
+        self._slots[slot] = None
+        self._live &= ~(1 << slot)
+        self._ranks = {}
+        self.version += 1
+
+    def _insert(self, card: dict):
+        # Slots are never reused, so slot order stays in load/insert order
+        slot = len(self._slots)
+        self._slots.append(card)
+        self._slot_by_id[card["card_id"]] = slot
+        self._live |= 1 << slot
+        self._index(slot)
+
+    def _index(self, slot: int):
+        card = self._slots[slot]
+        bit = 1 << slot
+        for field in BITMAP_FIELDS:
+            values = self._bitmaps[field]
+            for value in _indexed_values(card.get(field)):
+                values[value] = values.get(value, 0) | bit
+        self._text_index.add(slot, card)
+        self._completions.add(card)
+        self._views.add(card)
+        self._encoded.pop(slot, None)
+
+    def _unindex(self, slot: int):
+        card = self._slots[slot]
+        mask = ~(1 << slot)
+        for field in BITMAP_FIELDS:
+            values = self._bitmaps[field]
+            for value in _indexed_values(card.get(field)):
+                remaining = values.get(value, 0) & mask
+                if remaining:
+                    values[value] = remaining
+                else:
+                    values.pop(value, None)
+        self._text_index.remove(slot)
+        self._completions.remove(card["card_id"])
+        self._views.remove(card)
+        self._encoded.pop(slot, None)
+
+    # ----- Lookups -----
+
+    def get(self, card_id: str) -> Optional[dict]:
+        slot = self._slot_by_id.get(card_id)
+        return self._slots[slot] if slot is not None else None
+
+    def cards(self, card_ids: Iterable[str]) -> Dict[str, dict]:
+        """card_id -> card document for the given cards that are in the catalog"""
+        cards = {}
+        for card_id in set(card_ids):
+            card = self.get(card_id)
+            if card is not None:
+                cards[card_id] = card
+        return cards
+
+    def card_types(self, card_ids: Iterable[str]) -> Dict[str, str]:
+        """card_id -> card_type for the given cards that are in the catalog"""
+        card_types = {}
+        for card_id in set(card_ids):
+            card = self.get(card_id)
+            if card is not None:
+                card_types[card_id] = card.get("card_type")
+        return card_types
+
+    def get_slot(self, slot: int) -> Optional[dict]:
+        return self._slots[slot]
+
+    def encoded(self, slot: int, fields: Optional[tuple] = None) -> bytes:
+        """JSON bytes of the card in a slot (optionally projected), cached until the card changes"""
+        cached = self._encoded.get(slot)
+        if cached is None:
+            cached = self._encoded[slot] = {}
+        data = cached.get(fields)
+        if data is None:
+            data = encode_json(project_document(self._slots[slot], fields))
+            # Keep the full document plus a few fieldsets (e.g. the thumb preset) per card
+            if fields is not None and len(cached) > MAX_CACHED_FIELDSETS:
+                for key in [key for key in cached if key is not None]:
+                    del cached[key]
+            cached[fields] = data
+        return data
+
+    def values(self, field: str) -> list:
+        """Distinct indexed values of a bitmap field"""
+        return list(self._bitmaps[field].keys())
+
+    def bitmap(self, field: str, values: Iterable) -> int:
+        """OR of the bitmaps of the given values of a field"""
+        bitmaps = self._bitmaps[field]
+        bits = 0
+        for value in values:
+            bits |= bitmaps.get(value, 0)
+        return bits
+
+    def cost_bitmap(self, min_cost=None, max_cost=None, exact_cost=None) -> int:
+        """Bitmap of the cards whose cost matches an exact value or an inclusive range"""
+        if exact_cost is not None:
+            return self._bitmaps["cost"].get(exact_cost, 0)
+        bits = 0
+        for cost, cost_bits in self._bitmaps["cost"].items():
+            if not isinstance(cost, (int, float)) or isinstance(cost, bool):
+                continue
+            if min_cost is not None and cost < min_cost:
+                continue
+            if max_cost is not None and cost > max_cost:
+                continue
+            bits |= cost_bits
+        return bits
+
+    def select(
+        self,
+        set_codes: Optional[List[str]] = None,
+        card_types: Optional[List[str]] = None,
+        colors: Optional[List[str]] = None,
+        rarities: Optional[List[str]] = None,
+        variants: Optional[List[str]] = None,
+        keywords: Optional[List[str]] = None,
+        min_cost: Optional[int] = None,
+        max_cost: Optional[int] = None,
+        exact_cost: Optional[int] = None,
+        search_text: Optional[str] = None,
+        search_fields=CARDS_TEXT_FIELDS
+    ) -> int:
+        """Evaluate a filter and return the bitmap of matching slots.
+
+        Values within one field are ORed together, and the fields are ANDed.
+        """
+        bits = self._live
+        if set_codes:
+            bits &= self.bitmap("set_code", set_codes)
+        if card_types:
+            bits &= self.bitmap("card_type", card_types)
+        if colors:
+            bits &= self.bitmap("color", colors)
+        if rarities:
+            bits &= self.bitmap("rarity", rarities)
+        if variants:
+            bits &= self.bitmap("variant", variants)
+        if keywords:
+            bits &= self.bitmap("keywords", keywords)
+        if exact_cost is not None or min_cost is not None or max_cost is not None:
+            bits &= self.cost_bitmap(min_cost, max_cost, exact_cost)
+
+        if search_text and bits:
+            # Case-insensitive substring match on any of the search fields
+            bits = self._text_index.match(search_text, search_fields, bits)
+
+        return bits
+
+    def count(self, bits: int) -> int:
+        return popcount(bits)
+
+    def _sort_ranks(self, sort_field: str) -> List[int]:
+        ranks = self._ranks.get(sort_field)
+        if ranks is None:
+            # Ties are broken by card_id so the order is stable
+            live_slots = sorted(
+                self._slot_by_id.values(),
+                key=lambda slot: (_sort_value(self._slots[slot].get(sort_field)), self._slots[slot]["card_id"])
+            )
+            ranks = [0] * len(self._slots)
+            for rank, slot in enumerate(live_slots):
+                ranks[slot] = rank
+            self._ranks[sort_field] = ranks
+        return ranks
+
+    def ordered_slots(self, bits: int, sort_by: Optional[str] = None, sort_order: Optional[str] = "asc") -> List[int]:
+        """Slots of a bitmap in the requested order (catalog order when sort_by is None)"""
+        slots = bit_positions(bits)
+        if sort_by is None:
+            return slots
+        sort_field = sort_by if sort_by in SORT_FIELDS else "name"
+        slots.sort(key=self._sort_ranks(sort_field).__getitem__, reverse=sort_order != "asc")
+        return slots
+
+    def options(self) -> dict:
+        return self._views.options()
+
+    def summary(self) -> dict:
+        return self._views.summary()
+
+    def stats_by_set(self) -> list:
+        return self._views.stats_by_set()
+
+    def complete(self, prefix: str, limit: int = 10) -> List[dict]:
+        """Type-ahead completions over card names, keywords and subtypes"""
+        return self._completions.complete(prefix, limit)
+
+    def _field_key(self, slot: int, sort_field: str) -> tuple:
+        """Sort key of a slot for a field; consistent with _sort_ranks"""
+        card = self._slots[slot]
+        return _sort_value(card.get(sort_field)) + (card["card_id"],)
+
+    def search_page(
+        self,
+        bits: int,
+        sort_by: Optional[str] = None,
+        sort_order: Optional[str] = "asc",
+        search_text: Optional[str] = None,
+        search_fields=SEARCH_TEXT_FIELDS,
+        cursor: Optional[str] = None,
+        offset: int = 0,
+        limit: Optional[int] = None
+    ) -> Tuple[List[int], int, Optional[str]]:
+        """Order a bitmap and cut one page out of it.
+
+        Text searches without sort_by are ranked by match quality, everything else
+        is ordered by sort_by (card_id when not given). A cursor resumes right after
+        the sort key of the previous page's last card, so deep pages cost the same
+        as the first one. Returns (page slots, start index, next cursor).
+        """
+        descending = False
+        if search_text and not sort_by:
+            slots = bit_positions(bits)
+            scores = self._text_index.scores(slots, search_text, search_fields)
+            name_ranks = self._sort_ranks("name")
+            slots.sort(key=lambda slot: (-scores[slot], name_ranks[slot]))
+            order = "relevance:" + search_text.lower()
+
+            def key_of(slot):
+                return (-scores[slot],) + self._field_key(slot, "name")
+        else:
+            sort_field = (sort_by if sort_by in SORT_FIELDS else "name") if sort_by else "card_id"
+            descending = sort_order != "asc"
+            slots = bit_positions(bits)
+            slots.sort(key=self._sort_ranks(sort_field).__getitem__, reverse=descending)
+            order = f"{sort_field}:{'desc' if descending else 'asc'}"
+
+            def key_of(slot):
+                return self._field_key(slot, sort_field)
+
+        if cursor:
+            # Binary search for the first slot that sorts after the cursor key
+            cursor_key = decode_cursor(cursor, order)
+            low, high = 0, len(slots)
+            try:
+                while low < high:
+                    middle = (low + high) // 2
+                    key = key_of(slots[middle])
+                    if (key < cursor_key) if descending else (key > cursor_key):
+                        high = middle
+                    else:
+                        low = middle + 1
+            except TypeError:
+                # A well-formed cursor whose key does not compare with this order's keys
+                raise ValueError("Invalid cursor")
+            start = low
+        else:
+            start = max(offset, 0)
+
+        end = start + abs(limit) if limit else len(slots)
+        page = slots[start:end]
+        next_cursor = encode_cursor(order, key_of(page[-1])) if page and end < len(slots) else None
+        return page, start, next_cursor
+
+    def facet_counts(self, bits: int) -> Dict[str, Dict[str, int]]:
+        """Number of matching cards per value of each facet field"""
+        facets = {}
+        for name, field in FACET_FIELDS.items():
+            counts = {}
+            for value in sorted(self._bitmaps[field], key=_sort_value):
+                count = popcount(bits & self._bitmaps[field][value])
+                if count:
+                    counts[str(value)] = count
+            facets[name] = counts
+        return facets
+
+    def ordered(self, bits: int, sort_by: Optional[str] = None, sort_order: Optional[str] = "asc") -> List[dict]:
+        """Documents of a bitmap in the requested order"""
+        return [self._slots[slot] for slot in self.ordered_slots(bits, sort_by, sort_order)]
+
+    def query(
+        self,
+        set_code: Optional[str] = None,
+        card_type: Optional[str] = None,
+        colors: Optional[List[str]] = None,
+        rarities: Optional[List[str]] = None,
+        variant: Optional[str] = None,
+        min_cost: Optional[int] = None,
+        max_cost: Optional[int] = None,
+        exact_cost: Optional[int] = None,
+        search_text: Optional[str] = None,
+        sort_by: Optional[str] = "name",
+        sort_order: Optional[str] = "asc",
+        limit: Optional[int] = None
+    ) -> List[int]:
+        """Filter, sort and limit the catalog with the semantics of GET /cards; returns slots"""
+        bits = self.select(
+            set_codes=[set_code] if set_code else None,
+            card_types=[card_type] if card_type else None,
+            colors=colors,
+            rarities=rarities,
+            variants=[variant] if variant else None,
+            min_cost=min_cost,
+            max_cost=max_cost,
+            exact_cost=exact_cost,
+            search_text=search_text
+        )
+        slots = self.ordered_slots(bits, sort_by or "name", sort_order)
+
+        # Mongo treats limit(0) as "no limit" and a negative limit as its absolute value
+        if limit:
+            slots = slots[:abs(limit)]
+
+        return slots
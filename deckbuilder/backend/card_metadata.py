@@ -0,0 +1,76 @@
+"""
+Card details read from JSON or CSV files, for populate_cards.py --metadata.
+
+JSON files use the body formats of the card update endpoints: a list of
+cards with their card_id (POST /cards/bulk-update), an object keyed by
+card_id (POST /cards/update-from-data), or {"cards": [...]}. CSV files have
+a card_id column and one column per field; list fields (subtype, color,
+keywords) are separated by "|" and empty cells are left out.
+
+Records are only parsed here; populate_cards.py validates each card's
+details against CardModel (card_model.py) before writing them.
+"""
+
+import csv
+import json
+from typing import Dict, List, Tuple
+
+# Card fields a metadata file can set
+METADATA_FIELDS = (
+    "name", "card_type", "subtype", "color", "cost", "rarity", "might",
+    "description", "flavor_text", "artist", "keywords",
+)
+INT_FIELDS = ("cost", "might")
+LIST_FIELDS = ("subtype", "color", "keywords")
+LIST_SEPARATOR = "|"
+
+
+def normalize_record(record: dict) -> dict:
+    """The metadata fields of a record, with CSV strings converted to ints and lists"""
+    fields = {}
+    for field in METADATA_FIELDS:
+        value = record.get(field)
+        if value is None or value == "":
+            continue
+        if field in INT_FIELDS and isinstance(value, str):
+            value = int(value)
+        elif field in LIST_FIELDS and isinstance(value, str):
+            value = [item.strip() for item in value.split(LIST_SEPARATOR) if item.strip()]
+        fields[field] = value
+    return fields
+
+
+def read_records(path: str) -> List[dict]:
+    """Raw records of a JSON or CSV metadata file, each with a card_id"""
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as file:
+            return list(csv.DictReader(file))
+
+    with open(path, encoding="utf-8") as file:
+        data = json.load(file)
+    if isinstance(data, dict) and isinstance(data.get("cards"), list):
+        data = data["cards"]
+    if isinstance(data, dict):
+        return [{**(fields or {}), "card_id": card_id} for card_id, fields in data.items()]
+    if isinstance(data, list):
+        return data
+    raise ValueError("Expected a list of cards or an object keyed by card_id")
+
+
+def load_metadata(path: str) -> Tuple[Dict[str, dict], List[dict]]:
+    """card_id -> fields to set, and the records that could not be read"""
+    metadata = {}
+    errors = []
+    for position, record in enumerate(read_records(path), start=1):
+        card_id = record.get("card_id") if isinstance(record, dict) else None
+        if not card_id:
+            errors.append({"record": position, "error": "Missing card_id"})
+            continue
+        try:
+            fields = normalize_record(record)
+        except ValueError as e:
+            errors.append({"record": position, "card_id": card_id, "error": str(e)})
+            continue
+        if fields:
+            metadata[card_id] = {**metadata.get(card_id, {}), **fields}
+    return metadata, errors
@@ -0,0 +1,107 @@
+"""
+Card classification enums and the card document model, shared by the API
+(main.py) and the populate_cards.py ingest.
+"""
+
+from datetime import datetime
+from enum import Enum
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, validator
+
+
+# Enums for card classification
+class CardType(str, Enum):
+    SPELL = "Spell"
+    UNIT = "Unit"
+    CHAMPION_UNIT = "Champion Unit"
+    SIGNATURE_UNIT = "Signature Unit"
+    SIGNATURE_SPELL = "Signature Spell"
+    LEGEND = "Legend"
+    BATTLEFIELD = "Battlefield"
+    GEAR = "Gear"
+    RUNE = "Rune"
+    TOKEN = "Token"
+
+
+class CardColor(str, Enum):
+    FURY = "Fury"
+    BODY = "Body"
+    MIND = "Mind"
+    CALM = "Calm"
+    CHAOS = "Chaos"
+    ORDER = "Order"
+    COLORLESS = "Colorless"
+
+
+class CardRarity(str, Enum):
+    COMMON = "Common"
+    UNCOMMON = "Uncommon"
+    RARE = "Rare"
+    EPIC = "Epic"
+    OVERNUMBERED = "Overnumbered"
+
+
+class CardModel(BaseModel):
+    name: str = Field(..., min_length=1)
+    image_path: str
+    card_id: str = Field(..., pattern=r'^[A-Z]{2,3}_\d{3}[aS]?$')  # e.g., "OGN_001", "OGN_007a", "OGN_299S"
+    set_name: str
+    set_code: str = Field(..., pattern=r'^[A-Z]{2,3}$')  # e.g., "OGN"
+    set_release_date: Optional[str] = None
+    card_type: CardType
+    subtype: List[str] = []
+    color: List[CardColor] = []
+    cost: int = Field(..., ge=0, le=12)  # 0 to 12
+    rarity: CardRarity
+    might: int = Field(0, ge=0)
+    description: str = ""
+    flavor_text: str = ""
+    artist: str = ""
+    collector_number: str
+    variant: Optional[str] = "regular"  # "regular", "alt_art", or "signature"
+    keywords: List[str] = []
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    
+    @validator('subtype')
+    def validate_subtype(cls, v, values):
+        """Validate that cards can have at most 3 subtypes"""
+        if len(v) > 3:
+            raise ValueError('Cards can have at most 3 subtypes')
+        return v
+    
+    @validator('color')
+    def validate_color(cls, v, values):
+        """Validate that only Legend, Signature Unit, and Signature Spell cards can have 2 colors"""
+        card_type = values.get('card_type')
+        
+        if len(v) > 2:
+            raise ValueError('Cards can have at most 2 colors')
+        elif len(v) > 1 and card_type not in [CardType.LEGEND, CardType.SIGNATURE_UNIT, CardType.SIGNATURE_SPELL]:
+            raise ValueError(f'{card_type} cards can only have 1 color, not {len(v)}')
+            
+        return v
+    
+    @validator('keywords')
+    def validate_keywords(cls, v):
+        """Validate that cards can have at most 2 keywords"""
+        if len(v) > 2:
+            raise ValueError('Cards can have at most 2 keywords')
+        return v
+
+
+def validated_fields(card: dict, updates: dict) -> dict:
+    """The fields of `updates` once applied to `card` and validated as a whole card.
+
+    Values come back plain (enums as their strings), the way the scanner
+    stores them. Raises pydantic's ValidationError if the result is not a
+    valid card.
+    """
+    validated = CardModel(**{**card, **updates}).model_dump(mode="json")
+    return {field: validated[field] for field in updates}
+
+
+def validation_message(error) -> str:
+    """One line per field of a pydantic ValidationError"""
+    return "; ".join(f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" for item in error.errors())
@@ -0,0 +1,221 @@
+"""
+Incremental scan of the Riftbound_Cards directory (POST /scan-cards and
+populate_cards.py).
+
+The set folders are walked in a worker thread with os.scandir, which gets
+each file's size and mtime without an extra stat call. The result is diffed
+against a manifest stored in MongoDB, one document per image:
+
+    card_manifest  {_id: "Origins_MainSet/OGN_001.png", card_id, size, mtime}
+
+Only new or changed files are written: one unordered bulk_write of upserts to
+the cards collection (placeholder details on insert, the image path on every
+write), then one bulk_write to the manifest. Files that vanished are dropped
+from the manifest; their cards are kept. A rescan where nothing changed
+is a directory walk and a single manifest read.
+"""
+
+import asyncio
+import os
+import re
+from datetime import datetime
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from pymongo import DeleteOne, ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+
+# e.g. "OGN_001", "OGN_007a" (alt art), "OGN_299S" (signature)
+CARD_FILE_PATTERN = re.compile(r'^([A-Z]{2,3})_(\d{3})([aS]?)$')
+
+VARIANT_TYPES = {"a": "alt_art", "S": "signature", "": "regular"}
+
+
+def parse_card_filename(filename: str) -> Optional[dict]:
+    """card_id, set_code, collector_number and variant of an image file name (None if it is not a card)"""
+    card_id = os.path.splitext(filename)[0]
+    match = CARD_FILE_PATTERN.match(card_id)
+    if not match:
+        return None
+    return {
+        "card_id": card_id,
+        "set_code": match.group(1),
+        "collector_number": match.group(2),
+        "variant": VARIANT_TYPES[match.group(3)],
+    }
+
+
+def scan_directory(cards_path: str) -> Tuple[Dict[str, dict], List[str]]:
+    """Card images under the set folders, keyed by "set_folder/filename", and the image files skipped"""
+    entries = {}
+    skipped = []
+    with os.scandir(cards_path) as set_folders:
+        for set_folder in set_folders:
+            if not set_folder.is_dir() or set_folder.name.startswith('.'):
+                continue
+            with os.scandir(set_folder.path) as files:
+                for file in files:
+                    if not file.name.lower().endswith(IMAGE_EXTENSIONS) or not file.is_file():
+                        continue
+                    card = parse_card_filename(file.name)
+                    if card is None:
+                        skipped.append(f"{set_folder.name}/{file.name}")
+                        continue
+                    stat = file.stat()
+                    entries[f"{set_folder.name}/{file.name}"] = {
+                        **card,
+                        "set_folder": set_folder.name,
+                        "filename": file.name,
+                        "size": stat.st_size,
+                        "mtime": stat.st_mtime_ns,
+                    }
+    return entries, sorted(skipped)
+
+
+def diff_manifest(entries: Mapping[str, dict], manifest: Mapping[str, dict]) -> Tuple[List[dict], List[str]]:
+    """Files that are new or changed since the manifest was written, and manifest keys no longer on disk"""
+    changed = [
+        entry for key, entry in sorted(entries.items())
+        if key not in manifest
+        or (manifest[key].get("size"), manifest[key].get("mtime")) != (entry["size"], entry["mtime"])
+    ]
+    removed = sorted(key for key in manifest if key not in entries)
+    return changed, removed
+
+
+def new_card_document(entry: dict, release_date: Optional[str], now: datetime) -> dict:
+    """Placeholder details of a card first seen on disk, to be completed through the card endpoints"""
+    return {
+        "name": f"Card {entry['card_id']}",
+        "card_id": entry["card_id"],
+        "set_name": entry["set_folder"],
+        "set_code": entry["set_code"],
+        "set_release_date": release_date,
+        "card_type": "Spell",
+        "subtype": [],
+        "color": ["Colorless"],
+        "cost": 0,
+        "rarity": "Common",
+        "might": 0,
+        "description": "",
+        "flavor_text": "",
+        "artist": "",
+        "collector_number": entry["collector_number"],
+        "variant": entry["variant"],
+        "keywords": [],
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def card_upserts(
+    changed: List[dict],
+    release_dates: Mapping[str, str],
+    now: datetime,
+    metadata: Optional[Mapping[str, dict]] = None
+) -> Tuple[List[str], List[UpdateOne]]:
+    """One update per card with a changed image or metadata, and their card_ids.
+
+    A changed image upserts its card: the image path always, the placeholder
+    details only on insert. Metadata fields (see card_metadata.py) are set on
+    every write and replace the matching placeholders; metadata for a card
+    without an image on disk only updates an existing card.
+    """
+    # Two images of one card (e.g. .png and .jpg) would race on the card_id index: the last one wins
+    latest = {entry["card_id"]: entry for entry in changed}
+    metadata = metadata or {}
+    card_ids = sorted(set(latest) | set(metadata))
+    operations = []
+    for card_id in card_ids:
+        entry = latest.get(card_id)
+        fields = dict(metadata.get(card_id, {}))
+        if fields:
+            fields["updated_at"] = now
+        update = {}
+        if entry is not None:
+            # Only a different image_path (or new metadata) modifies an existing card
+            fields["image_path"] = entry["filename"]
+            placeholder = new_card_document(entry, release_dates.get(entry["set_folder"]), now)
+            update["$setOnInsert"] = {field: value for field, value in placeholder.items() if field not in fields}
+        update["$set"] = fields
+        operations.append(UpdateOne({"card_id": card_id}, update, upsert=entry is not None))
+    return card_ids, operations
+
+
+def manifest_operations(changed: List[dict], removed: List[str] = ()) -> list:
+    """Manifest writes recording the given files as scanned and forgetting the removed ones"""
+    return [
+        ReplaceOne(
+            {"_id": f"{entry['set_folder']}/{entry['filename']}"},
+            {"card_id": entry["card_id"], "size": entry["size"], "mtime": entry["mtime"]},
+            upsert=True
+        )
+        for entry in changed
+    ] + [DeleteOne({"_id": key}) for key in removed]
+
+
+async def read_manifest(manifest_collection) -> Dict[str, dict]:
+    """The stored manifest, keyed by set_folder/filename"""
+    return {
+        document["_id"]: document
+        for document in await manifest_collection.find({}, {"size": 1, "mtime": 1}).to_list(None)
+    }
+
+
+async def write_cards(cards_collection, card_ids: List[str], operations: List[UpdateOne]) -> dict:
+    """Run card updates as one unordered bulk_write; counts and per-card errors"""
+    failed = {}
+    try:
+        result = (await cards_collection.bulk_write(operations, ordered=False)).bulk_api_result
+    except BulkWriteError as e:
+        result = e.details
+        for error in result.get("writeErrors", []):
+            failed[card_ids[error["index"]]] = error.get("errmsg", "write failed")
+    return {
+        "added": result.get("nUpserted", 0),
+        "matched": result.get("nMatched", 0),
+        "updated": result.get("nModified", 0),
+        "errors": [{"card_id": card_id, "error": error} for card_id, error in failed.items()],
+    }
+
+
+async def apply_scan(
+    cards_collection,
+    manifest_collection,
+    cards_path: str,
+    release_dates: Optional[Mapping[str, str]] = None,
+    full: bool = False
+) -> dict:
+    """Scan the cards directory and write only what changed since the last scan.
+
+    With full=True the manifest is ignored and every image is upserted again.
+    Returns the counts and the card_ids of the cards written.
+    """
+    loop = asyncio.get_running_loop()
+    entries, skipped = await loop.run_in_executor(None, scan_directory, cards_path)
+    manifest = {} if full else await read_manifest(manifest_collection)
+    changed, removed = diff_manifest(entries, manifest)
+
+    result = {"added": 0, "updated": 0, "errors": []}
+    card_ids, operations = card_upserts(changed, release_dates or {}, datetime.now())
+    if operations:
+        result = await write_cards(cards_collection, card_ids, operations)
+    failed_ids = {error["card_id"] for error in result["errors"]}
+
+    # Failed cards stay out of the manifest, so the next scan retries them
+    operations = manifest_operations([entry for entry in changed if entry["card_id"] not in failed_ids], removed)
+    if operations:
+        await manifest_collection.bulk_write(operations, ordered=False)
+
+    return {
+        "scanned": len(entries),
+        "changed": len(changed),
+        "added": result["added"],
+        "updated": result["updated"],
+        "unchanged": len(entries) - len(changed),
+        "removed": removed,
+        "skipped": skipped,
+        "errors": result["errors"],
+        "card_ids": sorted({entry["card_id"] for entry in changed} - failed_ids),
+    }
@@ -0,0 +1,174 @@
+"""
+Card popularity and co-occurrence across all stored decks.
+
+Three small collections are kept up to date by every deck write:
+
+    card_usage     {_id: card_id, deck_count, copies}
+    card_pairs     {card_id, other_id, deck_count}   (both directions stored)
+    deck_features  {_id: "all" | "set:OGN" | "color:Fury", deck_count}
+
+deck_count is the number of decks playing at least one copy. A write turns
+the deck's card quantities before and after into $inc deltas that touch
+only the cards, pairs and features whose presence changed, so "most played",
+"most played with X" and per-set/per-color play rates are index reads
+instead of a scan over every deck.
+
+Decks counted in these collections carry usage_counted: true, so that only
+their edits and deletions apply deltas. A deck without it (stored before the
+counts existed) is counted in full on its first edit, and a rebuild counts
+every deck; decks are never subtracted without having been added.
+"""
+
+import asyncio
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import Dict, Iterable, List, Mapping, Set
+
+from pymongo import UpdateOne
+
+ALL_DECKS = "all"
+
+# Deck field marking the decks included in the counts
+USAGE_COUNTED = "usage_counted"
+
+
+class UsageGate:
+    """Keeps deck writes and usage rebuilds apart within this process.
+
+    Deck writes share the gate; a rebuild waits for the writes in flight,
+    holds back new ones until it has swapped in the new counts, and runs
+    alone, so no write lands between reading the decks and replacing the
+    counts.
+    """
+
+    def __init__(self):
+        self._writers = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._open = asyncio.Event()
+        self._open.set()
+        self._rebuild_lock = asyncio.Lock()
+
+    @asynccontextmanager
+    async def writing(self):
+        await self._open.wait()
+        self._writers += 1
+        self._idle.clear()
+        try:
+            yield
+        finally:
+            self._writers -= 1
+            if not self._writers:
+                self._idle.set()
+
+    @asynccontextmanager
+    async def exclusive(self):
+        async with self._rebuild_lock:
+            self._open.clear()
+            try:
+                await self._idle.wait()
+                yield
+            finally:
+                self._open.set()
+
+
+def deck_features(card_ids: Iterable[str], cards: Mapping[str, dict]) -> Set[str]:
+    """Sets and colors present in a deck, e.g. {"set:OGN", "color:Fury"}"""
+    features = set()
+    for card_id in card_ids:
+        card = cards.get(card_id)
+        if card is None:
+            continue
+        if card.get("set_code"):
+            features.add(f"set:{card['set_code']}")
+        for color in card.get("color") or []:
+            features.add(f"color:{color}")
+    return features
+
+
+def usage_deltas(
+    before: Mapping[str, int],
+    after: Mapping[str, int],
+    cards: Mapping[str, dict]
+) -> Dict[str, Counter]:
+    """Counter changes when a deck goes from `before` to `after` quantities.
+
+    An empty `before` is a new deck and an empty `after` a deleted one.
+    """
+    present_before = {card_id for card_id, quantity in before.items() if quantity > 0}
+    present_after = {card_id for card_id, quantity in after.items() if quantity > 0}
+    added = present_after - present_before
+    removed = present_before - present_after
+
+    usage = Counter()
+    copies = Counter()
+    for card_id in present_before | present_after:
+        copies[card_id] = after.get(card_id, 0) - before.get(card_id, 0)
+    for card_id in added:
+        usage[card_id] += 1
+    for card_id in removed:
+        usage[card_id] -= 1
+
+    # Only pairs with a card whose presence changed can change
+    pairs = Counter()
+    for card_id in added:
+        for other_id in present_after:
+            if other_id != card_id:
+                pairs[(card_id, other_id)] += 1
+                if other_id not in added:
+                    pairs[(other_id, card_id)] += 1
+    for card_id in removed:
+        for other_id in present_before:
+            if other_id != card_id:
+                pairs[(card_id, other_id)] -= 1
+                if other_id not in removed:
+                    pairs[(other_id, card_id)] -= 1
+
+    features = Counter()
+    for feature in deck_features(present_after, cards):
+        features[feature] += 1
+    for feature in deck_features(present_before, cards):
+        features[feature] -= 1
+    if not present_before and present_after:
+        features[ALL_DECKS] += 1
+    elif present_before and not present_after:
+        features[ALL_DECKS] -= 1
+
+    return {"usage": usage, "copies": copies, "pairs": pairs, "features": features}
+
+
+def usage_operations(deltas: Dict[str, Counter]) -> Dict[str, List[UpdateOne]]:
+    """Upserting $inc operations per collection for a set of deltas"""
+    card_ids = set(deltas["usage"]) | set(deltas["copies"])
+    usage_ops = []
+    for card_id in card_ids:
+        increments = {"deck_count": deltas["usage"][card_id], "copies": deltas["copies"][card_id]}
+        increments = {field: value for field, value in increments.items() if value}
+        if increments:
+            usage_ops.append(UpdateOne({"_id": card_id}, {"$inc": increments}, upsert=True))
+    pair_ops = [
+        UpdateOne({"card_id": card_id, "other_id": other_id}, {"$inc": {"deck_count": delta}}, upsert=True)
+        for (card_id, other_id), delta in deltas["pairs"].items() if delta
+    ]
+    feature_ops = [
+        UpdateOne({"_id": feature}, {"$inc": {"deck_count": delta}}, upsert=True)
+        for feature, delta in deltas["features"].items() if delta
+    ]
+    return {"card_usage": usage_ops, "card_pairs": pair_ops, "deck_features": feature_ops}
+
+
+def merge_deltas(total: Dict[str, Counter], deltas: Dict[str, Counter]):
+    """Add one deck's deltas into a running total (used when rebuilding from all decks)"""
+    for name, counter in deltas.items():
+        total.setdefault(name, Counter()).update(counter)
+
+
+def play_rates(features: Mapping[str, int], prefix: str, key: str) -> List[dict]:
+    """Decks playing each set or color, as counts and shares of all decks"""
+    total = features.get(ALL_DECKS, 0)
+    rates = [
+        {key: feature[len(prefix):], "deck_count": count, "play_rate": round(count / total, 4) if total else 0.0}
+        for feature, count in features.items()
+        if feature.startswith(prefix) and count > 0
+    ]
+    return sorted(rates, key=lambda rate: (-rate["deck_count"], rate[key]))
@@ -0,0 +1,155 @@
+"""
+Materialized card summaries behind /cards/options and /cards/stats/*.
+
+These endpoints used to run a full $group aggregation over the cards
+collection on every call, although their values only change when cards are
+written. The card catalog feeds every card it indexes or unindexes into
+CatalogViews, which keeps running counters, so the responses are built from
+a handful of counters and cached until the next write.
+"""
+
+from collections import Counter
+from typing import Dict, Optional
+
+
+def _numeric(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _hashable(value):
+    """Arrays are counted as tuples so distinct arrays can be tracked like $addToSet does"""
+    return tuple(value) if isinstance(value, list) else value
+
+
+def _average(total, count) -> Optional[float]:
+    return round(total / count, 2) if count else None
+
+
+def _distinct(counter: Counter) -> list:
+    """Values still present in a counter, arrays turned back into lists, in a stable order"""
+    values = [list(value) if isinstance(value, tuple) else value for value, count in counter.items() if count > 0]
+    return sorted(values, key=lambda value: (str(type(value)), value))
+
+
+class _CardAggregate:
+    """Running counters for a group of cards (the whole catalog or one set)"""
+
+    def __init__(self):
+        self.card_count = 0
+        self.cost_total = 0
+        self.cost_count = 0
+        self.set_names = Counter()
+        self.set_codes = Counter()
+        self.card_types = Counter()
+        self.color_arrays = Counter()
+        self.colors = Counter()
+        self.rarities = Counter()
+        self.keywords = Counter()
+        self.costs = Counter()
+
+    def apply(self, card: dict, sign: int):
+        """Add (sign=1) or remove (sign=-1) a card from the counters"""
+        self.card_count += sign
+        cost = card.get("cost")
+        if _numeric(cost):
+            self.cost_total += sign * cost
+            self.cost_count += sign
+            self.costs[cost] += sign
+        for counter, field in (
+            (self.set_names, "set_name"),
+            (self.set_codes, "set_code"),
+            (self.card_types, "card_type"),
+            (self.rarities, "rarity"),
+        ):
+            value = card.get(field)
+            if value is not None:
+                counter[_hashable(value)] += sign
+
+        color = card.get("color")
+        if color is not None:
+            self.color_arrays[_hashable(color)] += sign
+        for value in color if isinstance(color, list) else []:
+            self.colors[value] += sign
+        keywords = card.get("keywords")
+        for value in keywords if isinstance(keywords, list) else []:
+            self.keywords[value] += sign
+
+
+class CatalogViews:
+    """Incrementally maintained options, summary and per-set statistics"""
+
+    def __init__(self):
+        self._totals = _CardAggregate()
+        self._sets: Dict[str, _CardAggregate] = {}
+        self._cache: Dict[str, object] = {}
+
+    def add(self, card: dict):
+        self._apply(card, 1)
+
+    def remove(self, card: dict):
+        self._apply(card, -1)
+
+    def _apply(self, card: dict, sign: int):
+        self._totals.apply(card, sign)
+        set_code = card.get("set_code")
+        aggregate = self._sets.get(set_code)
+        if aggregate is None:
+            aggregate = self._sets[set_code] = _CardAggregate()
+        aggregate.apply(card, sign)
+        if aggregate.card_count <= 0:
+            del self._sets[set_code]
+        self._cache = {}
+
+    def _cached(self, name: str, build):
+        if name not in self._cache:
+            self._cache[name] = build()
+        return self._cache[name]
+
+    def options(self) -> dict:
+        """Distinct values of the searchable fields (GET /cards/options)"""
+        def build():
+            totals = self._totals
+            return {
+                "colors": _distinct(totals.colors),
+                "rarities": _distinct(totals.rarities),
+                "card_types": _distinct(totals.card_types),
+                "set_codes": _distinct(totals.set_codes),
+                "keywords": _distinct(totals.keywords),
+                "costs": _distinct(totals.costs)
+            }
+        return self._cached("options", build)
+
+    def summary(self) -> dict:
+        """Summary statistics for all cards (GET /cards/stats/summary)"""
+        def build():
+            totals = self._totals
+            if totals.card_count <= 0:
+                return {"total_cards": 0, "total_sets": 0, "avg_cost": 0}
+            return {
+                "total_cards": totals.card_count,
+                "total_sets": len(_distinct(totals.set_codes)),
+                "avg_cost": _average(totals.cost_total, totals.cost_count),
+                "card_types": _distinct(totals.card_types),
+                "colors": _distinct(totals.color_arrays),
+                "rarities": _distinct(totals.rarities)
+            }
+        return self._cached("summary", build)
+
+    def stats_by_set(self) -> list:
+        """Card statistics grouped by set (GET /cards/stats/by-set)"""
+        def build():
+            set_stats = []
+            for set_code in sorted(self._sets, key=lambda code: (code is not None, str(code))):
+                aggregate = self._sets[set_code]
+                # Like $first, report the set_name of the earliest card still in the set
+                set_names = [name for name, count in aggregate.set_names.items() if count > 0]
+                set_stats.append({
+                    "set_name": set_names[0] if set_names else None,
+                    "card_count": aggregate.card_count,
+                    "avg_cost": _average(aggregate.cost_total, aggregate.cost_count),
+                    "card_types": _distinct(aggregate.card_types),
+                    "colors": _distinct(aggregate.color_arrays),
+                    "set_code": set_code
+                })
+            return set_stats
+        return self._cached("stats_by_set", build)
@@ -0,0 +1,128 @@
+"""
+Short, URL-safe deck codes for sharing decklists.
+
+A code is the URL-safe base64 (without padding) of a small binary payload:
+
+    version              1 byte (DECK_CODE_VERSION)
+    set count            varint, then per set: length byte + ASCII set code
+    per set, in order:   varint entry count, then per entry (sorted by
+                         collector number):
+                           varint (collector number delta << 2 | variant bits)
+                           varint quantity
+
+Card IDs look like OGN_007, OGN_007a or OGN_299S; the variant bits encode the
+optional suffix. Collector numbers are delta-encoded within a set, so most
+entries take two bytes and a full 56-card deck fits in ~60 characters.
+Sections are not encoded: they follow from the card types when the code is
+resolved against the card catalog.
+"""
+
+import base64
+import re
+from typing import Dict, List, Mapping, Tuple
+
+DECK_CODE_VERSION = 1
+
+CARD_ID_PATTERN = re.compile(r"^([A-Z]{2,3})_(\d{3})([aS]?)$")
+
+# Card ID suffix <-> variant bits
+VARIANT_BITS = {"": 0, "a": 1, "S": 2}
+VARIANT_SUFFIXES = {bits: suffix for suffix, bits in VARIANT_BITS.items()}
+
+
+def _write_varint(out: bytearray, value: int):
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    value = 0
+    shift = 0
+    while True:
+        if pos >= len(data):
+            raise ValueError("Truncated deck code")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+        if shift > 35:
+            raise ValueError("Invalid deck code")
+
+
+def encode_deck(quantities: Mapping[str, int]) -> str:
+    """Pack card_id -> quantity into a deck code. Raises ValueError for card IDs that cannot be encoded."""
+    by_set: Dict[str, List[Tuple[int, int, int]]] = {}
+    for card_id, quantity in quantities.items():
+        if quantity <= 0:
+            continue
+        match = CARD_ID_PATTERN.match(card_id)
+        if not match:
+            raise ValueError(f"Card ID cannot be encoded: {card_id}")
+        set_code, number, suffix = match.groups()
+        by_set.setdefault(set_code, []).append((int(number), VARIANT_BITS[suffix], quantity))
+
+    out = bytearray([DECK_CODE_VERSION])
+    set_codes = sorted(by_set)
+    _write_varint(out, len(set_codes))
+    for set_code in set_codes:
+        out.append(len(set_code))
+        out.extend(set_code.encode("ascii"))
+    for set_code in set_codes:
+        entries = sorted(by_set[set_code])
+        _write_varint(out, len(entries))
+        previous = 0
+        for number, variant, quantity in entries:
+            _write_varint(out, (number - previous) << 2 | variant)
+            _write_varint(out, quantity)
+            previous = number
+    return base64.urlsafe_b64encode(bytes(out)).rstrip(b"=").decode("ascii")
+
+
+def decode_deck(code: str) -> Dict[str, int]:
+    """Unpack a deck code into card_id -> quantity. Raises ValueError for malformed codes."""
+    try:
+        data = base64.urlsafe_b64decode(code + "=" * (-len(code) % 4))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid deck code")
+    if not data:
+        raise ValueError("Empty deck code")
+    if data[0] != DECK_CODE_VERSION:
+        raise ValueError(f"Unsupported deck code version: {data[0]}")
+
+    pos = 1
+    set_count, pos = _read_varint(data, pos)
+    set_codes = []
+    for _ in range(set_count):
+        if pos >= len(data):
+            raise ValueError("Truncated deck code")
+        length = data[pos]
+        set_code = data[pos + 1:pos + 1 + length].decode("ascii", errors="replace")
+        pos += 1 + length
+        if not re.match(r"^[A-Z]{2,3}$", set_code):
+            raise ValueError("Invalid set code in deck code")
+        set_codes.append(set_code)
+
+    quantities = {}
+    for set_code in set_codes:
+        entry_count, pos = _read_varint(data, pos)
+        number = 0
+        for _ in range(entry_count):
+            packed, pos = _read_varint(data, pos)
+            quantity, pos = _read_varint(data, pos)
+            number += packed >> 2
+            variant = packed & 0b11
+            if variant not in VARIANT_SUFFIXES or number > 999:
+                raise ValueError("Invalid card in deck code")
+            card_id = f"{set_code}_{number:03d}{VARIANT_SUFFIXES[variant]}"
+            quantities[card_id] = quantities.get(card_id, 0) + quantity
+    if pos != len(data):
+        raise ValueError("Trailing data in deck code")
+    return quantities
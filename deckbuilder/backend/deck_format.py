@@ -0,0 +1,121 @@
+"""
+Storage format of deck documents.
+
+Decks used to store a card_ids list with one entry per copy, so every reader
+re-derived quantities from it and a full deck repeated ~56 card ID strings.
+Decks are now stored compactly as quantities per distinct card, split into the
+main deck, battlefields, legend and runes sections:
+
+    {"format": 2,
+     "sections": {"main": {"OGN_001": 3, ...}, "battlefields": {...},
+                  "legend": {"OGN_004": 1}, "runes": {"OGN_006": 6, ...}},
+     "section_counts": {"main": 40, ...}, "special_count": 1,
+     "legend_id": "OGN_004", ...}
+
+The API still returns card_ids, expanded from the sections, so clients keep
+working. Documents in the old format are read transparently and converted on
+their first write, or all at once with migrate_decks.py.
+"""
+
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from deck_rules import DECK_SECTIONS, build_sections, card_quantities, deck_counters
+from deck_similarity import similarity_fields
+from deck_stats import deck_stats
+from serialization import project_document
+
+DECK_FORMAT = 2
+
+# Fields of the old format that the compact format replaces
+LEGACY_FIELDS = ("card_ids", "card_counts")
+
+# Stored for indexing only, never returned
+INTERNAL_FIELDS = ("lsh_bands", "usage_counted")
+
+
+def is_compact(deck: dict) -> bool:
+    return "sections" in deck
+
+
+def deck_quantities(deck: dict) -> Dict[str, int]:
+    """card_id -> copies over all sections, for either storage format"""
+    if not is_compact(deck):
+        return card_quantities(deck.get("card_ids", []))
+    quantities = {}
+    for section in DECK_SECTIONS:
+        for card_id, quantity in deck["sections"].get(section, {}).items():
+            if quantity > 0:
+                quantities[card_id] = quantities.get(card_id, 0) + quantity
+    return quantities
+
+
+def deck_card_ids(deck: dict) -> List[str]:
+    """One entry per copy, as the old card_ids list, for either storage format"""
+    if not is_compact(deck):
+        return list(deck.get("card_ids", []))
+    card_ids = []
+    for card_id, quantity in deck_quantities(deck).items():
+        card_ids.extend([card_id] * quantity)
+    return card_ids
+
+
+def merge_quantities(card_ids: List[str], sections: Optional[Mapping[str, Mapping[str, int]]]) -> Dict[str, int]:
+    """Quantities of a deck given as a card_ids list and/or a sections quantity map"""
+    quantities = card_quantities(card_ids)
+    for section in (sections or {}).values():
+        for card_id, quantity in section.items():
+            if quantity > 0:
+                quantities[card_id] = quantities.get(card_id, 0) + quantity
+    return quantities
+
+
+def compact_fields(quantities: Mapping[str, int], card_types: Mapping[str, str]) -> dict:
+    """The stored card fields of a deck: sections (by card type) and their counters"""
+    sections, _ = build_sections(quantities, card_types)
+    fields = {"format": DECK_FORMAT, "sections": sections, **deck_counters(sections, card_types)}
+    # Denormalized so decks can be listed by legend through an index
+    fields["legend_id"] = next(iter(sections["legend"]), None)
+    return fields
+
+
+def migration_update(deck: dict, cards: Mapping[str, dict]) -> Tuple[dict, dict]:
+    """(filter, update) converting an old-format deck document in place.
+
+    `cards` maps card_id -> card document (card_type, cost and color are used).
+    The filter only matches while the document still has the card list the
+    update was computed from, so a concurrent write is never overwritten.
+    """
+    card_ids = deck.get("card_ids", [])
+    quantities = card_quantities(card_ids)
+    card_types = {card_id: card.get("card_type") for card_id, card in cards.items()}
+    update = {
+        "$set": {
+            **compact_fields(quantities, card_types),
+            **deck_stats(quantities, cards),
+            **similarity_fields(quantities)
+        },
+        "$unset": {field: "" for field in LEGACY_FIELDS},
+    }
+    return {"_id": deck["_id"], "card_ids": card_ids, "sections": {"$exists": False}}, update
+
+
+def stored_projection(fields: Optional[Tuple[str, ...]]) -> Optional[dict]:
+    """Mongo projection that reads what a fieldset needs from either storage format"""
+    if fields is None:
+        return None
+    projection = {field: 1 for field in fields if field != "cards"}
+    if "card_ids" in fields or "cards" in fields:
+        projection.update({"sections": 1, "card_ids": 1})
+    return projection
+
+
+def present_deck(deck: dict, fields: Optional[Tuple[str, ...]] = None) -> dict:
+    """A stored deck as the API returns it: card_ids expanded, legacy-only and internal fields dropped"""
+    for field in INTERNAL_FIELDS:
+        deck.pop(field, None)
+    if is_compact(deck):
+        if fields is None or "card_ids" in fields:
+            deck["card_ids"] = deck_card_ids(deck)
+    else:
+        deck.pop("card_counts", None)
+    return project_document(deck, fields)
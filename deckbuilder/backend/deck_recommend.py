@@ -0,0 +1,316 @@
+"""
+Card suggestions for partial decks (POST /decks/recommend).
+
+Every stored deck is a row of a sparse deck x card matrix (SciPy CSR, 1 when
+the deck plays the card). For a partial deck q, each stored deck is weighted
+by its overlap with q, and a card's score is the cosine between that weight
+vector and the card's column: cards played by the decks closest to q score
+highest, and staples that every deck plays do not drown out the rest. Both
+steps run on a card-major (CSC) copy of the matrix: the overlaps only visit
+the decks playing the partial deck's cards, and the scores are a single
+float32 matrix-vector product, so a query is a few milliseconds even with
+hundreds of thousands of decks.
+
+The matrix is loaded once in the background at startup and then kept up to
+date without rebuilding it: a deck write marks the deck's old row dead and
+keeps its new cards in a small pending set, scored as a second matrix. When
+the pending set or the dead rows grow too large, a compacted matrix is built
+in a worker thread from a snapshot and swapped in; writes that happen while it
+is being built stay pending.
+"""
+
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from deck_format import compact_fields
+from deck_rules import add_card_violation
+
+# Cards of this color fit every legend
+COLORLESS = "Colorless"
+
+# Pending decks and share of dead rows that trigger a compaction
+COMPACT_PENDING = 2000
+COMPACT_DEAD_SHARE = 0.2
+
+
+def build_matrix(rows: Sequence[Sequence[int]], card_count: int) -> sparse.csr_matrix:
+    """Binary deck x card CSR matrix with one row of column indexes per deck"""
+    lengths = np.fromiter((len(row) for row in rows), dtype=np.int64, count=len(rows))
+    indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=indptr[1:])
+    indices = np.fromiter((column for row in rows for column in row), dtype=np.int32, count=int(indptr[-1]))
+    data = np.ones(len(indices), dtype=np.float32)
+    return sparse.csr_matrix((data, indices, indptr), shape=(len(rows), card_count))
+
+
+def compact_matrix(
+    matrix: sparse.csr_matrix,
+    alive: np.ndarray,
+    pending: Mapping[str, Tuple[int, ...]],
+    card_count: int
+) -> sparse.csr_matrix:
+    """The live rows of `matrix` followed by the pending decks, as a single matrix"""
+    base = matrix[np.flatnonzero(alive)]
+    base = sparse.csr_matrix((base.data, base.indices, base.indptr), shape=(base.shape[0], card_count))
+    return sparse.vstack([base, build_matrix(list(pending.values()), card_count)], format="csr")
+
+
+def deck_overlap(card_columns: sparse.csc_matrix, columns: Sequence[int]) -> np.ndarray:
+    """Number of the given card columns each deck (row) plays"""
+    indptr, indices = card_columns.indptr, card_columns.indices
+    rows = [indices[indptr[column]:indptr[column + 1]] for column in columns if column < card_columns.shape[1]]
+    if not rows:
+        return np.zeros(card_columns.shape[0], dtype=np.int64)
+    return np.bincount(np.concatenate(rows), minlength=card_columns.shape[0])
+
+
+class DeckMatrix:
+    """Incrementally maintained card x deck co-occurrence matrix"""
+
+    def __init__(self):
+        self.card_ids: List[str] = []
+        self.card_index: Dict[str, int] = {}
+        self.matrix = build_matrix([], 0)
+        # The same matrix in CSC form, to find the decks playing a card
+        self.card_columns = self.matrix.tocsc()
+        self.deck_ids: List[str] = []
+        self.row_of: Dict[str, int] = {}
+        self.alive = np.zeros(0, dtype=bool)
+        # deck_id -> columns of decks written since the last compaction
+        self.pending: Dict[str, Tuple[int, ...]] = {}
+        # Number of live decks playing each card
+        self.popularity = np.zeros(0, dtype=np.int64)
+        self.loaded = False
+        self._pending_matrix: Optional[sparse.csc_matrix] = None
+        # Decks written while a compaction runs (None when none is running)
+        self._touched: Optional[set] = None
+        # Deck writes made while the decks are being read for load()
+        self._writes: Optional[Dict[str, List[str]]] = None
+
+    def __len__(self) -> int:
+        return int(self.alive.sum()) + len(self.pending)
+
+    def _columns(self, card_ids: Iterable[str]) -> Tuple[int, ...]:
+        """Column indexes of cards, adding columns for cards not seen yet"""
+        columns = []
+        for card_id in card_ids:
+            column = self.card_index.get(card_id)
+            if column is None:
+                column = self.card_index[card_id] = len(self.card_ids)
+                self.card_ids.append(card_id)
+            columns.append(column)
+        if len(self.card_ids) > len(self.popularity):
+            self.popularity = np.concatenate([
+                self.popularity, np.zeros(len(self.card_ids) - len(self.popularity), dtype=np.int64)
+            ])
+        return tuple(sorted(set(columns)))
+
+    def _deck_columns(self, deck_id: str) -> Optional[Tuple[int, ...]]:
+        """Current columns of a deck, or None if it is not in the matrix"""
+        if deck_id in self.pending:
+            return self.pending[deck_id]
+        row = self.row_of.get(deck_id)
+        if row is None or not self.alive[row]:
+            return None
+        start, end = self.matrix.indptr[row], self.matrix.indptr[row + 1]
+        return tuple(self.matrix.indices[start:end])
+
+    def start_loading(self):
+        """Record deck writes from now on, to replay them on top of the decks passed to load()"""
+        self._writes = {}
+
+    def abort_loading(self):
+        self._writes = None
+
+    def load(self, decks: Iterable[Tuple[str, Iterable[str]]]):
+        """Build the matrix from scratch from (deck_id, card_ids) pairs"""
+        self.card_ids, self.card_index = [], {}
+        self.popularity = np.zeros(0, dtype=np.int64)
+        deck_ids, rows = [], []
+        for deck_id, card_ids in decks:
+            columns = self._columns(card_ids)
+            if columns:
+                deck_ids.append(deck_id)
+                rows.append(columns)
+        self.matrix = build_matrix(rows, len(self.card_ids))
+        self.card_columns = self.matrix.tocsc()
+        self.deck_ids = deck_ids
+        self.row_of = {deck_id: row for row, deck_id in enumerate(deck_ids)}
+        self.alive = np.ones(len(deck_ids), dtype=bool)
+        self.pending = {}
+        self._pending_matrix = None
+        self._touched = None
+        self.popularity = np.asarray(self.matrix.sum(axis=0), dtype=np.int64).ravel()
+        self.loaded = True
+        writes, self._writes = self._writes or {}, None
+        for deck_id, card_ids in writes.items():
+            self.update(deck_id, card_ids)
+
+    def update(self, deck_id: str, card_ids: Iterable[str]):
+        """Replace the cards of a deck (no cards removes it)"""
+        if self._writes is not None:
+            self._writes[deck_id] = list(card_ids)
+            return
+        if not self.loaded:
+            return
+        old = self._deck_columns(deck_id)
+        if old is not None:
+            self.popularity[list(old)] -= 1
+        row = self.row_of.get(deck_id)
+        if row is not None:
+            self.alive[row] = False
+        self.pending.pop(deck_id, None)
+
+        columns = self._columns(card_ids)
+        if columns:
+            self.pending[deck_id] = columns
+            self.popularity[list(columns)] += 1
+        self._pending_matrix = None
+        if self._touched is not None:
+            self._touched.add(deck_id)
+
+    def remove(self, deck_id: str):
+        self.update(deck_id, ())
+
+    def needs_compaction(self) -> bool:
+        if self._touched is not None:
+            return False
+        dead = len(self.alive) - int(self.alive.sum())
+        return len(self.pending) >= COMPACT_PENDING or dead > COMPACT_DEAD_SHARE * max(len(self.alive), 1)
+
+    def compaction_snapshot(self) -> dict:
+        """State to build a compacted matrix from; writes from now on are tracked until install"""
+        self._touched = set()
+        return {
+            "matrix": self.matrix,
+            "alive": self.alive.copy(),
+            "deck_ids": self.deck_ids,
+            "pending": dict(self.pending),
+            "card_count": len(self.card_ids),
+        }
+
+    @staticmethod
+    def compact(snapshot: dict) -> Tuple[sparse.csr_matrix, sparse.csc_matrix]:
+        """Build the compacted matrix of a snapshot, in both forms (safe to run in a worker thread)"""
+        matrix = compact_matrix(snapshot["matrix"], snapshot["alive"], snapshot["pending"], snapshot["card_count"])
+        return matrix, matrix.tocsc()
+
+    def install(self, snapshot: dict, matrices: Tuple[sparse.csr_matrix, sparse.csc_matrix]):
+        """Swap in the matrix compacted from `snapshot`"""
+        if self._touched is None:
+            # The matrix was reloaded from scratch in the meantime
+            return
+        touched = self._touched
+        self._touched = None
+        deck_ids = [snapshot["deck_ids"][row] for row in np.flatnonzero(snapshot["alive"])] + list(snapshot["pending"])
+
+        self.matrix, self.card_columns = matrices
+        self.deck_ids = deck_ids
+        self.row_of = {deck_id: row for row, deck_id in enumerate(deck_ids)}
+        self.alive = np.ones(len(deck_ids), dtype=bool)
+        # Decks written during the compaction: their new version (if any) is still pending
+        for deck_id in touched:
+            row = self.row_of.get(deck_id)
+            if row is not None:
+                self.alive[row] = False
+        self.pending = {deck_id: columns for deck_id, columns in self.pending.items() if deck_id in touched}
+        self._pending_matrix = None
+
+    def abort_compaction(self):
+        self._touched = None
+
+    def _pending_columns(self) -> sparse.csc_matrix:
+        """The pending decks as a CSC matrix, cached until the next write"""
+        if self._pending_matrix is None or self._pending_matrix.shape[1] != len(self.card_ids):
+            self._pending_matrix = build_matrix(list(self.pending.values()), len(self.card_ids)).tocsc()
+        return self._pending_matrix
+
+    def scores(self, card_ids: Iterable[str]) -> np.ndarray:
+        """Score of every card column for a partial deck.
+
+        Without any known card in `card_ids` the scores are the play rates.
+        """
+        columns = [self.card_index[card_id] for card_id in set(card_ids) if card_id in self.card_index]
+        if not columns:
+            return self.popularity / max(len(self), 1)
+
+        weighted = np.zeros(len(self.card_ids))
+        weight_norm = 0.0
+        pending = self._pending_columns()
+        for card_columns, alive in ((self.card_columns, self.alive), (pending, None)):
+            if card_columns.shape[0] == 0:
+                continue
+            overlap = deck_overlap(card_columns, columns)
+            if alive is not None:
+                overlap *= alive
+            # Decks sharing more of the partial deck count quadratically more
+            # (float32 like the matrix, which keeps the product from upcasting it)
+            weights = ((overlap / len(columns)) ** 2).astype(np.float32)
+            weight_norm += float(weights @ weights)
+            weighted[:card_columns.shape[1]] += card_columns.T @ weights
+
+        # Cosine between the deck weights and each card's column
+        return weighted / np.sqrt(np.maximum(self.popularity, 1) * max(weight_norm, 1e-12))
+
+    def recommend(
+        self,
+        card_ids: Iterable[str],
+        allowed: Callable[[str], bool],
+        limit: int
+    ) -> List[dict]:
+        """Best scoring cards that pass `allowed`, best first"""
+        scores = self.scores(card_ids)
+        suggestions = []
+        for column in np.argsort(-scores, kind="stable"):
+            if scores[column] <= 0 or len(suggestions) >= limit:
+                break
+            card_id = self.card_ids[column]
+            if allowed(card_id):
+                suggestions.append({
+                    "card_id": card_id,
+                    "score": round(float(scores[column]), 4),
+                    "deck_count": int(self.popularity[column]),
+                })
+        return suggestions
+
+
+def legend_colors(quantities: Mapping[str, int], cards: Mapping[str, dict], legend_id: Optional[str] = None):
+    """The legend of a partial deck (or `legend_id`) and its colors; (None, None) without one"""
+    if legend_id is None:
+        legend_id = next(
+            (card_id for card_id in quantities if (cards.get(card_id) or {}).get("card_type") == "Legend"),
+            None
+        )
+    legend = cards.get(legend_id) if legend_id else None
+    if legend is None:
+        return None, None
+    return legend_id, set(legend.get("color") or [])
+
+
+def suggestion_filter(
+    quantities: Mapping[str, int],
+    get_card: Callable[[str], Optional[dict]],
+    colors: Optional[set],
+    include_owned: bool = False
+) -> Callable[[str], bool]:
+    """Whether a card can still be added to the partial deck.
+
+    The card must be known, within the legend's colors (colorless cards always
+    are), and addable under the POST /decks section, copy and Legend/Signature
+    limits. Cards already in the deck are left out unless include_owned.
+    """
+    quantities = {card_id: quantity for card_id, quantity in quantities.items() if quantity > 0}
+    card_types = {card_id: (get_card(card_id) or {}).get("card_type") for card_id in quantities}
+    deck = compact_fields(quantities, card_types)
+
+    def allowed(card_id: str) -> bool:
+        card = get_card(card_id)
+        if card is None or (quantities.get(card_id, 0) > 0 and not include_owned):
+            return False
+        if colors is not None and not set(card.get("color") or []) - {COLORLESS} <= colors:
+            return False
+        return add_card_violation(deck, card_id, card.get("card_type")) is None
+
+    return allowed
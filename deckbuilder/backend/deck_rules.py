@@ -0,0 +1,156 @@
+"""
+Deck construction rules.
+
+A deck is a main deck of up to 40 cards (at most 3 copies of each), plus
+exactly 3 Battlefields, 1 Legend and 12 Runes. The checks run in memory on a
+card_id -> card_type table and on quantities per distinct card, so validating
+a deck needs no per-card queries and no walk over every copy.
+
+Stored decks also carry counters (cards per section and the number of
+Legend/Signature cards). They are kept up to date by every write, so adding a
+card is validated by the filter of a single conditional update_one instead of
+re-reading the deck's cards, which is also safe under concurrent edits.
+"""
+
+from collections import Counter
+from typing import Dict, List, Mapping, Optional, Tuple
+
+MAIN_DECK_LIMIT = 40
+BATTLEFIELD_COUNT = 3
+LEGEND_COUNT = 1
+RUNE_COUNT = 12
+COPY_LIMIT = 3
+
+# Card types that get their own section instead of counting towards the main deck
+SECTION_BY_TYPE = {
+    "Battlefield": "battlefields",
+    "Legend": "legend",
+    "Rune": "runes",
+}
+DECK_SECTIONS = ("main", "battlefields", "legend", "runes")
+SECTION_LIMITS = {
+    "main": MAIN_DECK_LIMIT,
+    "battlefields": BATTLEFIELD_COUNT,
+    "legend": LEGEND_COUNT,
+    "runes": RUNE_COUNT,
+}
+
+# Only one of these may be in a deck when cards are added one at a time
+SPECIAL_TYPES = ("Legend", "Signature Unit", "Signature Spell")
+SPECIAL_LIMIT = 1
+
+
+def section_of(card_type: Optional[str]) -> str:
+    return SECTION_BY_TYPE.get(card_type, "main")
+
+
+def card_quantities(card_ids: List[str]) -> Dict[str, int]:
+    """card_id -> number of copies, in the order cards first appear"""
+    return dict(Counter(card_ids))
+
+
+def build_sections(
+    quantities: Mapping[str, int],
+    card_types: Mapping[str, str]
+) -> Tuple[Dict[str, Dict[str, int]], List[str]]:
+    """Split card quantities into deck sections by card type.
+
+    Returns the sections and the card IDs missing from card_types, which are
+    kept in the main deck so no card is lost.
+    """
+    sections = {section: {} for section in DECK_SECTIONS}
+    unknown = []
+    for card_id, quantity in quantities.items():
+        if quantity <= 0:
+            continue
+        card_type = card_types.get(card_id)
+        if card_type is None:
+            unknown.append(card_id)
+        section = sections[section_of(card_type)]
+        section[card_id] = section.get(card_id, 0) + quantity
+    return sections, unknown
+
+
+def deck_violations(quantities: Mapping[str, int], card_types: Mapping[str, str]) -> List[str]:
+    """Every rule the deck breaks, as user-facing messages (empty if the deck is legal)"""
+    sections, unknown = build_sections(quantities, card_types)
+    violations = []
+
+    if unknown:
+        violations.append(f"Unknown card IDs: {', '.join(unknown)}")
+        for card_id in unknown:
+            del sections["main"][card_id]
+
+    # Validate regular deck size (max 40 cards)
+    if sum(sections["main"].values()) > MAIN_DECK_LIMIT:
+        violations.append(f"Regular deck cannot exceed {MAIN_DECK_LIMIT} cards")
+
+    # Validate special card requirements
+    if sum(sections["battlefields"].values()) != BATTLEFIELD_COUNT:
+        violations.append(f"You must have exactly {BATTLEFIELD_COUNT} Battlefield cards")
+    if sum(sections["legend"].values()) != LEGEND_COUNT:
+        violations.append(f"You must have exactly {LEGEND_COUNT} Legend card")
+    if sum(sections["runes"].values()) != RUNE_COUNT:
+        violations.append(f"You must have exactly {RUNE_COUNT} Rune cards")
+
+    # Check for more than 3 copies of any regular card
+    for card_id, count in sections["main"].items():
+        if count > COPY_LIMIT:
+            violations.append(f"Cannot have more than {COPY_LIMIT} copies of {card_id}")
+
+    return violations
+
+
+def deck_counters(sections: Mapping[str, Mapping[str, int]], card_types: Mapping[str, str]) -> dict:
+    """The counters stored on a deck document, computed from its sections"""
+    special_count = 0
+    for section in sections.values():
+        for card_id, quantity in section.items():
+            if card_types.get(card_id) in SPECIAL_TYPES:
+                special_count += quantity
+    return {
+        "section_counts": {section: sum(sections.get(section, {}).values()) for section in DECK_SECTIONS},
+        "special_count": special_count,
+    }
+
+
+def add_card_filter(card_id: str, card_type: str) -> dict:
+    """Conditions a deck's counters must meet for one more copy of a card to be legal.
+
+    Missing counters are treated as 0 ($not/$gte matches missing fields).
+    """
+    section = section_of(card_type)
+    conditions = {f"section_counts.{section}": {"$not": {"$gte": SECTION_LIMITS[section]}}}
+    if section == "main":
+        conditions[f"sections.main.{card_id}"] = {"$not": {"$gte": COPY_LIMIT}}
+    if card_type in SPECIAL_TYPES:
+        conditions["special_count"] = {"$not": {"$gte": SPECIAL_LIMIT}}
+    return conditions
+
+
+def counter_increments(card_id: str, card_type: Optional[str], copies: int) -> dict:
+    """$inc that adds (copies > 0) or removes (copies < 0) copies of a card from a stored deck"""
+    section = section_of(card_type)
+    increments = {
+        f"sections.{section}.{card_id}": copies,
+        f"section_counts.{section}": copies,
+    }
+    if card_type in SPECIAL_TYPES:
+        increments["special_count"] = copies
+    return increments
+
+
+def add_card_violation(deck: dict, card_id: str, card_type: str) -> Optional[str]:
+    """Why one more copy of a card cannot be added to a stored deck (None if it can)"""
+    section = section_of(card_type)
+    section_count = deck.get("section_counts", {}).get(section, 0)
+    if section == "main":
+        if section_count >= MAIN_DECK_LIMIT:
+            return f"Deck is full ({MAIN_DECK_LIMIT} cards)"
+        if deck.get("sections", {}).get("main", {}).get(card_id, 0) >= COPY_LIMIT:
+            return f"Cannot have more than {COPY_LIMIT} copies of {card_id}"
+    elif section_count >= SECTION_LIMITS[section]:
+        return f"Deck already has {SECTION_LIMITS[section]} {card_type} card(s)"
+    if card_type in SPECIAL_TYPES and deck.get("special_count", 0) >= SPECIAL_LIMIT:
+        return "You can only have 1 Legend, Signature Unit, or Signature Spell card in your deck"
+    return None
@@ -0,0 +1,138 @@
+"""
+Similar and near-duplicate decks through MinHash and locality-sensitive hashing.
+
+A deck is the multiset of its cards: three copies of a card are the tokens
+"OGN_001#1", "OGN_001#2" and "OGN_001#3", so the Jaccard similarity of two
+token sets is the weighted Jaccard of the decks (sum of the smaller
+quantities over sum of the larger ones). A MinHash signature of NUM_HASHES
+values estimates it, and the signature is cut into BANDS bands of ROWS
+values. Each band is hashed into one int64 and stored on the deck document
+as lsh_bands, with a multikey index.
+
+Decks sharing at least one band are candidates: the index finds them
+without reading the other decks, and the exact similarity is only computed
+for those. Two decks of similarity s share a band with probability
+1 - (1 - s^ROWS)^BANDS: about 99.98% at s = 0.8, 64% at s = 0.5 and 2.5%
+at s = 0.2.
+
+Changing any of the constants below changes every stored band: decks have to
+be re-signed afterwards (migrate_decks.py --signatures).
+"""
+
+import hashlib
+from typing import Dict, Iterable, List, Mapping, Set, Tuple
+
+import numpy as np
+
+NUM_HASHES = 64
+BANDS = 16
+ROWS = NUM_HASHES // BANDS
+
+# Decks read per GET /decks/{deck_id}/similar, those sharing the most bands first
+MAX_CANDIDATES = 500
+# Larger buckets are chained rather than paired in the near-duplicate report
+MAX_BUCKET = 50
+
+# Fixed seeds, so signatures stay comparable across restarts
+_SEEDS = np.random.default_rng(20240601).integers(0, 2 ** 63, size=(2, NUM_HASHES), dtype=np.uint64)
+_XORS = _SEEDS[0]
+# Odd multipliers keep each hash a bijection of the 64-bit token hash
+_MULTIPLIERS = _SEEDS[1] | np.uint64(1)
+
+
+def _hash64(value: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(value, digest_size=8).digest(), "little")
+
+
+def deck_tokens(quantities: Mapping[str, int]) -> List[str]:
+    """One token per copy of each card"""
+    return [f"{card_id}#{copy}" for card_id, quantity in quantities.items() for copy in range(1, quantity + 1)]
+
+
+def minhash(quantities: Mapping[str, int]) -> np.ndarray:
+    """MinHash signature (NUM_HASHES uint64 values) of a deck"""
+    tokens = np.array([_hash64(token.encode()) for token in deck_tokens(quantities)], dtype=np.uint64)
+    # NUM_HASHES hash functions of every token at once; overflow wraps around as intended
+    with np.errstate(over="ignore"):
+        hashes = (tokens[:, None] ^ _XORS[None, :]) * _MULTIPLIERS[None, :]
+    return hashes.min(axis=0)
+
+
+def signature_bands(signature: np.ndarray) -> List[int]:
+    """One signed 64-bit key per band, prefixed with the band number so bands never collide"""
+    keys = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS:(band + 1) * ROWS]
+        key = _hash64(band.to_bytes(2, "little") + rows.tobytes())
+        # BSON integers are signed
+        keys.append(key - 2 ** 64 if key >= 2 ** 63 else key)
+    return keys
+
+
+def deck_bands(quantities: Mapping[str, int]) -> List[int]:
+    """LSH band keys of a deck (none for an empty deck)"""
+    quantities = {card_id: quantity for card_id, quantity in quantities.items() if quantity > 0}
+    if not quantities:
+        return []
+    return signature_bands(minhash(quantities))
+
+
+def similarity_fields(quantities: Mapping[str, int]) -> dict:
+    """The stored similarity fields of a deck"""
+    return {"lsh_bands": deck_bands(quantities)}
+
+
+def deck_similarity(first: Mapping[str, int], second: Mapping[str, int]) -> float:
+    """Exact weighted Jaccard similarity of two decks"""
+    shared = 0
+    total = 0
+    for card_id in set(first) | set(second):
+        a = max(first.get(card_id, 0), 0)
+        b = max(second.get(card_id, 0), 0)
+        shared += min(a, b)
+        total += max(a, b)
+    return shared / total if total else 0.0
+
+
+def candidate_pairs(buckets: Iterable[List[str]], max_bucket: int) -> Set[Tuple[str, str]]:
+    """Pairs of decks sharing a band bucket.
+
+    Buckets of up to max_bucket decks yield all their pairs. Larger ones, in
+    practice many copies of the same list, are chained instead (each deck
+    paired with the next), which keeps the report linear and still links all
+    of them into one group.
+    """
+    pairs = set()
+    for deck_ids in buckets:
+        deck_ids = sorted(set(deck_ids))
+        if len(deck_ids) <= max_bucket:
+            pairs.update(
+                (first, second)
+                for position, first in enumerate(deck_ids)
+                for second in deck_ids[position + 1:]
+            )
+        else:
+            pairs.update(zip(deck_ids, deck_ids[1:]))
+    return pairs
+
+
+def duplicate_groups(pairs: Iterable[Tuple[str, str]]) -> List[List[str]]:
+    """Connected groups of decks linked by near-duplicate pairs (largest first)"""
+    parent: Dict[str, str] = {}
+
+    def find(deck_id):
+        parent.setdefault(deck_id, deck_id)
+        while parent[deck_id] != deck_id:
+            parent[deck_id] = parent[parent[deck_id]]
+            deck_id = parent[deck_id]
+        return deck_id
+
+    for first, second in pairs:
+        root_first, root_second = find(first), find(second)
+        if root_first != root_second:
+            parent[max(root_first, root_second)] = min(root_first, root_second)
+
+    groups: Dict[str, List[str]] = {}
+    for deck_id in parent:
+        groups.setdefault(find(deck_id), []).append(deck_id)
+    return sorted((sorted(group) for group in groups.values()), key=lambda group: (-len(group), group[0]))
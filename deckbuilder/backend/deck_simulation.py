@@ -0,0 +1,141 @@
+"""
+Draw probabilities for decks (GET /decks/{deck_id}/simulate).
+
+"How likely am I to see at least k copies of X by turn t?" has an exact
+answer: the number of copies among the cards seen follows a hypergeometric
+distribution. The Monte Carlo simulation answers the same question by
+shuffling the main deck many times, and also answers what the closed form
+does not cover, e.g. the chance of holding all target cards together.
+
+Shuffles are vectorized with NumPy: a block of decks is shuffled row by row
+in one call, only the cards that can be seen are kept, and hits are counted
+for every target card and turn at once.
+"""
+
+import math
+import time
+from typing import Dict, List, Mapping, Optional
+
+import numpy as np
+
+OPENING_HAND = 4
+DRAWS_PER_TURN = 1
+MAX_SHUFFLES = 2_000_000
+# Decks shuffled per NumPy call, to bound memory
+SHUFFLE_BLOCK = 50_000
+# Cells of the per-block hit counts (shuffles x cards seen x targets, int16): about 40 MB
+BLOCK_CELLS = 20_000_000
+
+
+def cards_seen(turn: int, opening_hand: int = OPENING_HAND, draws_per_turn: int = DRAWS_PER_TURN) -> int:
+    """Cards seen by a turn: the opening hand on turn 1, plus the draws of each later turn"""
+    return opening_hand + (turn - 1) * draws_per_turn
+
+
+def hypergeometric_at_least(deck_size: int, copies: int, seen: int, at_least: int) -> float:
+    """Exact P(at least `at_least` of `copies` cards among `seen` cards drawn from `deck_size`)"""
+    seen = min(seen, deck_size)
+    total = math.comb(deck_size, seen)
+    if total == 0 or at_least > copies:
+        return 0.0
+    favourable = sum(
+        math.comb(copies, hits) * math.comb(deck_size - copies, seen - hits)
+        for hits in range(max(at_least, 0), min(copies, seen) + 1)
+    )
+    return favourable / total
+
+
+def simulate_draws(
+    quantities: Mapping[str, int],
+    targets: List[str],
+    turns: int,
+    at_least: int = 1,
+    opening_hand: int = OPENING_HAND,
+    draws_per_turn: int = DRAWS_PER_TURN,
+    shuffles: int = 100_000,
+    seed: Optional[int] = None
+) -> Dict[str, object]:
+    """Monte Carlo estimate of seeing `at_least` copies of each target by each turn.
+
+    Returns per-target probabilities by turn, the probability of seeing every
+    target together by turn, and the shuffle throughput.
+    """
+    deck = np.repeat(np.arange(len(quantities)), list(quantities.values()))
+    index_of = {card_id: index for index, card_id in enumerate(quantities)}
+    target_indexes = np.array([index_of[card_id] for card_id in targets])
+    seen_by_turn = np.array([min(cards_seen(turn, opening_hand, draws_per_turn), len(deck)) for turn in range(1, turns + 1)])
+    max_seen = int(seen_by_turn.max()) if len(seen_by_turn) else 0
+
+    rng = np.random.default_rng(seed)
+    hits = np.zeros((turns, len(targets)), dtype=np.int64)
+    together = np.zeros(turns, dtype=np.int64)
+
+    # Fewer shuffles per block when many targets are counted at once
+    block_size = max(1, min(SHUFFLE_BLOCK, BLOCK_CELLS // ((max_seen + 1) * len(targets))))
+
+    start = time.perf_counter()
+    remaining = shuffles
+    while remaining > 0:
+        block = min(remaining, block_size)
+        remaining -= block
+        # Shuffle every row independently, then keep only the cards that can be seen
+        drawn = rng.permuted(np.broadcast_to(deck, (block, len(deck))), axis=1)[:, :max_seen]
+        # copies[d, n, t]: copies of target t among the first n cards of shuffle d (none when no card is seen)
+        copies = np.zeros((block, max_seen + 1, len(targets)), dtype=np.int16)
+        np.cumsum(drawn[:, :, None] == target_indexes[None, None, :], axis=1, dtype=np.int16, out=copies[:, 1:, :])
+        enough = copies[:, seen_by_turn, :] >= at_least
+        hits += enough.sum(axis=0)
+        together += enough.all(axis=2).sum(axis=0)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "by_turn": (hits / shuffles).tolist(),
+        "together": (together / shuffles).tolist(),
+        "shuffles_per_second": round(shuffles / elapsed) if elapsed > 0 else None,
+    }
+
+
+def draw_probabilities(
+    quantities: Mapping[str, int],
+    targets: List[str],
+    turns: int,
+    at_least: int = 1,
+    opening_hand: int = OPENING_HAND,
+    draws_per_turn: int = DRAWS_PER_TURN,
+    shuffles: int = 100_000,
+    seed: Optional[int] = None
+) -> dict:
+    """Exact and simulated probabilities of seeing `at_least` copies of each target, turn by turn"""
+    deck_size = sum(quantities.values())
+    simulated = None
+    if shuffles > 0 and deck_size > 0 and targets:
+        simulated = simulate_draws(quantities, targets, turns, at_least, opening_hand, draws_per_turn, shuffles, seed)
+
+    cards = []
+    for position, card_id in enumerate(targets):
+        by_turn = []
+        for turn in range(1, turns + 1):
+            seen = min(cards_seen(turn, opening_hand, draws_per_turn), deck_size)
+            entry = {
+                "turn": turn,
+                "cards_seen": seen,
+                "exact": hypergeometric_at_least(deck_size, quantities[card_id], seen, at_least)
+            }
+            if simulated:
+                entry["simulated"] = simulated["by_turn"][turn - 1][position]
+            by_turn.append(entry)
+        cards.append({"card_id": card_id, "copies": quantities[card_id], "by_turn": by_turn})
+
+    return {
+        "deck_size": deck_size,
+        "at_least": at_least,
+        "opening_hand": opening_hand,
+        "draws_per_turn": draws_per_turn,
+        "shuffles": shuffles if simulated else 0,
+        "cards": cards,
+        "all_targets_by_turn": [
+            {"turn": turn, "simulated": probability}
+            for turn, probability in enumerate(simulated["together"], start=1)
+        ] if simulated else [],
+        "shuffles_per_second": simulated["shuffles_per_second"] if simulated else None,
+    }
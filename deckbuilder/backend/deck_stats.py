@@ -0,0 +1,85 @@
+"""
+Deck statistics computed from a card lookup table.
+
+deck_colors, average_cost and card_type_distribution used to be sent by the
+client and stored unchecked. They are now computed here on every deck write,
+from the quantities of the deck's distinct cards and the card documents of
+the in-memory catalog, so each card is visited once whatever its number of
+copies. card_list_stats adds the mana curve, color split and might totals
+for POST /decks/stats.
+"""
+
+from typing import Dict, Mapping
+
+# Every card type, in the order the frontend lists them
+CARD_TYPES = (
+    "Spell", "Unit", "Champion Unit", "Signature Unit", "Signature Spell",
+    "Legend", "Battlefield", "Gear", "Rune", "Token",
+)
+
+# Fields stored on deck documents
+DECK_STATS_FIELDS = ("deck_colors", "average_cost", "card_type_distribution")
+
+
+def _numeric(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def card_list_stats(quantities: Mapping[str, int], cards: Mapping[str, dict]) -> dict:
+    """Statistics of a list of cards given as card_id -> copies, in one pass over the distinct cards"""
+    card_count = 0
+    cost_total = 0
+    cost_count = 0
+    might_total = 0
+    mana_curve: Dict[int, int] = {}
+    colors: Dict[str, int] = {}
+    type_distribution = dict.fromkeys(CARD_TYPES, 0)
+    might_by_type: Dict[str, int] = {}
+    unknown = []
+
+    for card_id, quantity in quantities.items():
+        if quantity <= 0:
+            continue
+        card = cards.get(card_id)
+        if card is None:
+            unknown.append(card_id)
+            continue
+        card_count += quantity
+
+        cost = card.get("cost")
+        if _numeric(cost):
+            cost_total += cost * quantity
+            cost_count += quantity
+            mana_curve[cost] = mana_curve.get(cost, 0) + quantity
+
+        # Colors keep the order in which they first appear in the deck
+        for color in card.get("color") or []:
+            colors[color] = colors.get(color, 0) + quantity
+
+        card_type = card.get("card_type")
+        if card_type is not None:
+            type_distribution[card_type] = type_distribution.get(card_type, 0) + quantity
+
+        might = card.get("might")
+        if _numeric(might) and might:
+            might_total += might * quantity
+            might_by_type[card_type] = might_by_type.get(card_type, 0) + might * quantity
+
+    return {
+        "card_count": card_count,
+        "distinct_cards": len(quantities) - len(unknown),
+        "deck_colors": list(colors),
+        "average_cost": round(cost_total / cost_count, 2) if cost_count else 0.0,
+        "card_type_distribution": type_distribution,
+        "mana_curve": {str(cost): mana_curve[cost] for cost in sorted(mana_curve)},
+        "color_split": colors,
+        "might_total": might_total,
+        "might_by_type": might_by_type,
+        "unknown_card_ids": unknown,
+    }
+
+
+def deck_stats(quantities: Mapping[str, int], cards: Mapping[str, dict]) -> dict:
+    """The statistics stored on a deck document"""
+    stats = card_list_stats(quantities, cards)
+    return {field: stats[field] for field in DECK_STATS_FIELDS}
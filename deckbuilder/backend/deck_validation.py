@@ -0,0 +1,126 @@
+"""
+Batch deck validation (POST /decks/validate-batch).
+
+Tournament registration submits thousands of decklists at once. Each one is
+checked with the same rules as POST /decks (deck_rules.deck_violations)
+against a card_id -> card_type table built once for the whole batch from the
+in-memory card catalog, so no query is made per deck or per card.
+
+Small batches are validated inline. Large ones are split into chunks and
+spread over a process pool, each chunk shipped with only the part of the type
+table it needs, so throughput scales with the number of cores.
+"""
+
+import asyncio
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from deck_codes import decode_deck
+from deck_format import merge_quantities
+from deck_rules import deck_violations
+
+# Below this many decks, process start-up and pickling cost more than they save
+PARALLEL_MIN_DECKS = 2000
+CHUNK_SIZE = 500
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """The shared process pool, started on first use"""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def parse_decklist(entry) -> Tuple[Optional[str], Optional[Dict[str, int]], Optional[str]]:
+    """(label, card quantities, error) of one submitted decklist.
+
+    A decklist is an object with card_ids (one entry per copy), sections
+    (quantities per card, as stored decks) and/or a deck code; id or name is
+    echoed back as its label.
+    """
+    if not isinstance(entry, dict):
+        return None, None, "Decklist must be a JSON object"
+    label = entry.get("id", entry.get("name"))
+    label = None if label is None else str(label)
+
+    card_ids = entry.get("card_ids", [])
+    sections = entry.get("sections")
+    if not isinstance(card_ids, list) or not all(isinstance(card_id, str) for card_id in card_ids):
+        return label, None, "card_ids must be a list of card IDs"
+    if sections is not None and not (
+        isinstance(sections, dict)
+        and all(
+            isinstance(section, dict)
+            and all(isinstance(card_id, str) and isinstance(quantity, int) for card_id, quantity in section.items())
+            for section in sections.values()
+        )
+    ):
+        return label, None, "sections must map section names to {card_id: quantity}"
+
+    quantities = merge_quantities(card_ids, sections)
+    code = entry.get("code")
+    if code is not None:
+        try:
+            for card_id, quantity in decode_deck(str(code)).items():
+                quantities[card_id] = quantities.get(card_id, 0) + quantity
+        except ValueError as e:
+            return label, None, str(e)
+    return label, quantities, None
+
+
+def validate_chunk(decks: List[Dict[str, int]], card_types: Mapping[str, str]) -> List[List[str]]:
+    """Violations of each deck in a chunk (runs in a worker process for large batches)"""
+    return [deck_violations(quantities, card_types) for quantities in decks]
+
+
+def _chunk_types(decks: Iterable[Dict[str, int]], card_types: Mapping[str, str]) -> Dict[str, str]:
+    """The part of the type table a chunk of decks needs"""
+    return {card_id: card_types[card_id] for deck in decks for card_id in deck if card_id in card_types}
+
+
+async def validate_decks(decks: List[Dict[str, int]], card_types: Mapping[str, str]) -> List[List[str]]:
+    """Violations of every deck, spread over the process pool for large batches"""
+    if len(decks) < PARALLEL_MIN_DECKS or (os.cpu_count() or 1) < 2:
+        return validate_chunk(decks, card_types)
+
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+    chunks = [decks[start:start + CHUNK_SIZE] for start in range(0, len(decks), CHUNK_SIZE)]
+    results = await asyncio.gather(*(
+        loop.run_in_executor(executor, validate_chunk, chunk, _chunk_types(chunk, card_types))
+        for chunk in chunks
+    ))
+    return [violations for chunk_result in results for violations in chunk_result]
+
+
+async def ndjson_objects(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[Optional[object], Optional[str]]]:
+    """(object, error) for each non-empty line of a streamed NDJSON body"""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        lines = buffer.split(b"\n")
+        buffer = lines.pop()
+        for line in lines:
+            if line.strip():
+                yield _parse_line(line)
+    if buffer.strip():
+        yield _parse_line(buffer)
+
+
+def _parse_line(line: bytes) -> Tuple[Optional[object], Optional[str]]:
+    try:
+        return json.loads(line), None
+    except ValueError:
+        return None, "Invalid JSON"
@@ -0,0 +1,162 @@
+"""
+MongoDB index definitions and the index advisor.
+
+Indexes follow the shapes of the queries the backend actually runs: an
+equality filter followed by the sort field (so Mongo can walk the index in
+order instead of sorting in memory), plus the lookups by card_id, set_name
+and the deck listing orders. The advisor runs explain() on those shapes and
+reports any collection scan or in-memory SORT stage, so index regressions are
+caught before they reach production.
+"""
+
+from typing import List, Tuple
+
+from pymongo import ASCENDING, DESCENDING
+
+# (keys, options) per collection
+CARD_INDEXES = [
+    ([("card_id", ASCENDING)], {"unique": True}),
+    ([("set_code", ASCENDING)], {}),
+    ([("card_type", ASCENDING)], {}),
+    ([("color", ASCENDING)], {}),
+    ([("cost", ASCENDING)], {}),
+    ([("rarity", ASCENDING)], {}),
+    ([("set_name", ASCENDING)], {}),
+    # Equality filter + sort on name or cost (GET /cards, /cards/search)
+    ([("set_code", ASCENDING), ("name", ASCENDING)], {}),
+    ([("set_code", ASCENDING), ("cost", ASCENDING)], {}),
+    ([("card_type", ASCENDING), ("name", ASCENDING)], {}),
+    ([("card_type", ASCENDING), ("cost", ASCENDING)], {}),
+    ([("color", ASCENDING), ("name", ASCENDING)], {}),
+    ([("color", ASCENDING), ("cost", ASCENDING)], {}),
+    ([("rarity", ASCENDING), ("name", ASCENDING)], {}),
+    ([("name", ASCENDING)], {}),
+]
+
+SET_INDEXES = [
+    ([("set_code", ASCENDING)], {"unique": True}),
+]
+
+DECK_INDEXES = [
+    ([("updated_at", DESCENDING)], {}),
+    ([("name", ASCENDING)], {}),
+    # Cursor pagination of GET /decks: the sort field, then _id as a tie-breaker
+    ([("updated_at", DESCENDING), ("_id", DESCENDING)], {}),
+    ([("name", ASCENDING), ("_id", ASCENDING)], {}),
+    # Filters of GET /decks, followed by the default sort
+    ([("deck_colors", ASCENDING), ("updated_at", DESCENDING), ("_id", DESCENDING)], {}),
+    ([("legend_id", ASCENDING), ("updated_at", DESCENDING), ("_id", DESCENDING)], {}),
+    # LSH band keys of GET /decks/{deck_id}/similar (multikey)
+    ([("lsh_bands", ASCENDING)], {}),
+]
+
+# Card popularity and co-occurrence (card_usage.py): most played first
+CARD_USAGE_INDEXES = [
+    ([("deck_count", DESCENDING)], {}),
+]
+
+CARD_PAIR_INDEXES = [
+    ([("card_id", ASCENDING), ("other_id", ASCENDING)], {"unique": True}),
+    ([("card_id", ASCENDING), ("deck_count", DESCENDING)], {}),
+]
+
+# (label, collection name, filter, sort) of the queries the advisor explains
+QUERY_SHAPES = [
+    ("card by card_id", "cards", {"card_id": "OGN_001"}, None),
+    ("cards by card_id list", "cards", {"card_id": {"$in": ["OGN_001", "OGN_002"]}}, None),
+    ("cards by set_name", "cards", {"set_name": "Origins_MainSet"}, None),
+    ("cards by set, sorted by name", "cards", {"set_code": "OGN"}, [("name", ASCENDING)]),
+    ("cards by set, sorted by cost", "cards", {"set_code": "OGN"}, [("cost", ASCENDING)]),
+    ("cards by type, sorted by name", "cards", {"card_type": "Unit"}, [("name", ASCENDING)]),
+    ("cards by type, sorted by cost", "cards", {"card_type": "Unit"}, [("cost", DESCENDING)]),
+    ("cards by color, sorted by name", "cards", {"color": "Fury"}, [("name", ASCENDING)]),
+    ("cards by color, sorted by cost", "cards", {"color": "Fury"}, [("cost", ASCENDING)]),
+    ("cards by rarity, sorted by name", "cards", {"rarity": "Rare"}, [("name", ASCENDING)]),
+    ("all cards sorted by name", "cards", {}, [("name", ASCENDING)]),
+    ("set by set_code", "sets", {"set_code": "OGN"}, None),
+    ("decks by most recently updated", "decks", {}, [("updated_at", DESCENDING), ("_id", DESCENDING)]),
+    ("decks sorted by name", "decks", {}, [("name", ASCENDING), ("_id", ASCENDING)]),
+    ("decks by name prefix", "decks", {"name": {"$regex": "^Agg"}}, [("name", ASCENDING), ("_id", ASCENDING)]),
+    ("decks by color, most recent first", "decks", {"deck_colors": "Fury"},
+     [("updated_at", DESCENDING), ("_id", DESCENDING)]),
+    ("decks by legend, most recent first", "decks", {"legend_id": "OGN_004"},
+     [("updated_at", DESCENDING), ("_id", DESCENDING)]),
+    ("decks sharing an LSH band", "decks", {"lsh_bands": {"$in": [1, 2]}}, None),
+    ("most played cards", "card_usage", {"deck_count": {"$gt": 0}}, [("deck_count", DESCENDING)]),
+    ("cards most played with a card", "card_pairs", {"card_id": "OGN_001", "deck_count": {"$gt": 0}},
+     [("deck_count", DESCENDING)]),
+]
+
+
+def index_name(keys: List[Tuple[str, int]]) -> str:
+    """The name Mongo gives an index by default, e.g. set_code_1_name_1"""
+    return "_".join(f"{field}_{direction}" for field, direction in keys)
+
+
+async def ensure_indexes(collection, specs) -> List[str]:
+    """Create the indexes of a collection that do not exist yet; returns the created names"""
+    existing_indexes = await collection.list_indexes().to_list(None)
+    existing_index_names = {idx["name"] for idx in existing_indexes}
+
+    created = []
+    for keys, options in specs:
+        name = index_name(keys)
+        if name not in existing_index_names:
+            await collection.create_index(keys, **options)
+            created.append(name)
+    return created
+
+
+def plan_stages(plan) -> List[str]:
+    """All stage names in an explain() plan tree, whatever its nesting (classic or SBE)"""
+    stages = []
+    if isinstance(plan, dict):
+        if isinstance(plan.get("stage"), str):
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(plan_stages(item))
+    return stages
+
+
+def plan_index_names(plan) -> List[str]:
+    """Names of the indexes used anywhere in an explain() plan tree"""
+    names = []
+    if isinstance(plan, dict):
+        if isinstance(plan.get("indexName"), str):
+            names.append(plan["indexName"])
+        for value in plan.values():
+            names.extend(plan_index_names(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            names.extend(plan_index_names(item))
+    return names
+
+
+async def explain_query_shapes(db) -> List[dict]:
+    """Explain every query shape and flag collection scans and in-memory sorts"""
+    report = []
+    for label, collection_name, filter_query, sort in QUERY_SHAPES:
+        cursor = db[collection_name].find(filter_query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explanation = await cursor.explain()
+        winning_plan = explanation.get("queryPlanner", {}).get("winningPlan", {})
+        stages = plan_stages(winning_plan)
+
+        collection_scan = "COLLSCAN" in stages
+        in_memory_sort = "SORT" in stages
+        report.append({
+            "query": label,
+            "collection": collection_name,
+            "filter": filter_query,
+            "sort": [{"field": field, "direction": direction} for field, direction in sort or []],
+            "stages": stages,
+            "indexes_used": sorted(set(plan_index_names(winning_plan))),
+            "collection_scan": collection_scan,
+            "in_memory_sort": in_memory_sort,
+            "ok": not collection_scan and not in_memory_sort
+        })
+    return report
@@ -1,38 +1,51 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request
 from fastapi.responses import JSONResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 import os
 from motor.motor_asyncio import AsyncIOMotorClient
-from pydantic import BaseModel, Field, validator
-from typing import Optional, List, Union
+from pydantic import BaseModel, Field, ValidationError
+from typing import Optional, List, Union, Dict
 from datetime import datetime
-from enum import Enum
+import asyncio
+import json
 import re
+import time
+from functools import partial
+from collections import Counter
 from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from card_usage import usage_deltas, usage_operations, merge_deltas, play_rates, ALL_DECKS, USAGE_COUNTED, UsageGate
+from card_scanner import apply_scan, write_cards
+from card_metadata import METADATA_FIELDS
+from card_model import CardType, CardColor, CardModel, validated_fields, validation_message
+from card_catalog import CardCatalog, SEARCH_TEXT_FIELDS, encode_cursor, decode_cursor
+from deck_rules import build_sections, deck_violations, add_card_filter, add_card_violation, counter_increments, section_of
+from deck_stats import deck_stats, card_list_stats
+from deck_simulation import draw_probabilities, MAX_SHUFFLES, OPENING_HAND, DRAWS_PER_TURN
+from deck_codes import encode_deck, decode_deck
+from deck_recommend import DeckMatrix, legend_colors, suggestion_filter
+from deck_similarity import (
+    similarity_fields, deck_bands, deck_similarity, candidate_pairs, duplicate_groups,
+    MAX_CANDIDATES, MAX_BUCKET
+)
+from deck_validation import parse_decklist, validate_decks, ndjson_objects, shutdown_executor
+from deck_format import (
+    deck_card_ids, deck_quantities, merge_quantities, compact_fields, migration_update, stored_projection, present_deck
+)
+from indexes import (
+    CARD_INDEXES, SET_INDEXES, DECK_INDEXES, CARD_USAGE_INDEXES, CARD_PAIR_INDEXES, ensure_indexes,
+    explain_query_shapes
+)
+from serialization import (
+    convert_mongo_document, encode_list_response, MongoJSONResponse,
+    encode_json, wants_ndjson, ndjson_from_cursor, ndjson_from_encoded, ndjson_response,
+    parse_fields, mongo_projection, project_document, CARD_FIELD_PRESETS, DECK_FIELD_PRESETS,
+    NDJSON_MEDIA_TYPE
+)
 
 app = FastAPI(title="Riftbound Deck Builder", version="1.0.0")
 
-# Helper function to convert MongoDB documents to JSON-serializable format
-def convert_mongo_document(doc):
-    """Convert MongoDB document to JSON-serializable format"""
-    if isinstance(doc, dict):
-        # Convert ObjectId to string
-        if "_id" in doc and isinstance(doc["_id"], ObjectId):
-            doc["_id"] = str(doc["_id"])
-        
-        # Convert datetime objects to ISO strings
-        for key, value in doc.items():
-            if isinstance(value, datetime):
-                doc[key] = value.isoformat()
-            elif isinstance(value, dict):
-                doc[key] = convert_mongo_document(value)
-            elif isinstance(value, list):
-                doc[key] = [convert_mongo_document(item) if isinstance(item, dict) else item for item in value]
-        
-        return doc
-    return doc
-
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -48,46 +61,282 @@ db = client.deckbuilder
 cards_collection = db.cards
 decks_collection = db.decks
 sets_collection = db.sets
+# Card popularity and co-occurrence over all decks (see card_usage.py)
+card_usage_collection = db.card_usage
+card_pairs_collection = db.card_pairs
+deck_features_collection = db.deck_features
+# Image files seen by the last POST /scan-cards (card_scanner.py)
+card_manifest_collection = db.card_manifest
+
+# In-memory snapshot of the cards collection, used to serve GET /cards
+card_catalog = CardCatalog()
+
+async def load_card_catalog():
+    """Load every card from MongoDB into the in-memory catalog"""
+    cards = await cards_collection.find().to_list(None)
+    card_catalog.load([convert_mongo_document(card) for card in cards])
+    print(f"Loaded {len(card_catalog)} cards into the in-memory catalog")
+
+async def ensure_card_catalog():
+    """Make sure the catalog is loaded (e.g. if MongoDB was unreachable at startup)"""
+    if not card_catalog.loaded:
+        await load_card_catalog()
+
+def parse_fields_param(fields, presets):
+    """Parse a ?fields= parameter, turning invalid field names into a 400"""
+    try:
+        return parse_fields(fields, presets)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def refresh_catalog_cards(card_ids):
+    """Re-read the given cards from MongoDB after a write and update the catalog"""
+    card_ids = list(set(card_ids))
+    if not card_ids or not card_catalog.loaded:
+        return
+    cards = await cards_collection.find({"card_id": {"$in": card_ids}}).to_list(None)
+    found_ids = set()
+    for card in cards:
+        card_catalog.upsert(convert_mongo_document(card))
+        found_ids.add(card["card_id"])
+    for card_id in card_ids:
+        if card_id not in found_ids:
+            card_catalog.remove(card_id)
+
+async def resolve_cards(card_ids):
+    """card_id -> card document for a list of card IDs, from the catalog.
+    
+    Cards the catalog does not know (e.g. inserted by populate_cards.py since the
+    last reload) are looked up with a single $in query and added to it.
+    """
+    await ensure_card_catalog()
+    cards = card_catalog.cards(card_ids)
+    missing = list(set(card_ids) - set(cards))
+    if missing:
+        await refresh_catalog_cards(missing)
+        cards.update(card_catalog.cards(missing))
+    return cards
+
+async def resolve_card_types(card_ids):
+    """card_id -> card_type for a list of card IDs (see resolve_cards)"""
+    return {card_id: card.get("card_type") for card_id, card in (await resolve_cards(card_ids)).items()}
+
+async def hydrate_deck_cards(card_ids, card_projection=None, collapsed=False):
+    """Card documents for a deck's card_ids, fetched with a single $in query.
+    
+    Each distinct card is fetched once and expanded locally, one entry per copy
+    in deck order, or one {card, quantity} entry per distinct card if collapsed.
+    Cards that no longer exist are left out.
+    """
+    quantities = Counter(card_ids)
+    if not quantities:
+        return []
+    # card_id is needed to match cards back to the deck even if it was not requested
+    keep_card_id = card_projection is None or "card_id" in card_projection
+    if not keep_card_id:
+        card_projection = {**card_projection, "card_id": 1}
+    cursor = cards_collection.find({"card_id": {"$in": list(quantities)}}, card_projection)
+    cards_by_id = {}
+    for card in await cursor.to_list(None):
+        card_id = card["card_id"] if keep_card_id else card.pop("card_id")
+        cards_by_id[card_id] = card
+    
+    if collapsed:
+        # Counter keeps the order in which cards first appear in the deck
+        return [
+            {"card": cards_by_id[card_id], "quantity": quantity}
+            for card_id, quantity in quantities.items() if card_id in cards_by_id
+        ]
+    return [cards_by_id[card_id] for card_id in card_ids if card_id in cards_by_id]
+
+async def request_quantities(request):
+    """card_id -> copies of a DeckCardsRequest, reading the stored deck if one is given"""
+    quantities = merge_quantities(request.card_ids, request.sections)
+    if request.deck_id:
+        deck = await decks_collection.find_one({"_id": ObjectId(request.deck_id)}, stored_projection(("card_ids",)))
+        if not deck:
+            raise HTTPException(status_code=404, detail="Deck not found")
+        for card_id, quantity in deck_quantities(deck).items():
+            quantities[card_id] = quantities.get(card_id, 0) + quantity
+    return quantities
+
+USAGE_COLLECTIONS = {
+    "card_usage": card_usage_collection,
+    "card_pairs": card_pairs_collection,
+    "deck_features": deck_features_collection,
+}
+USAGE_INDEXES = {
+    "card_usage": CARD_USAGE_INDEXES,
+    "card_pairs": CARD_PAIR_INDEXES,
+    "deck_features": [],
+}
+
+# Deck writes go through the gate, so they never interleave with a usage rebuild
+card_usage_gate = UsageGate()
+
+async def write_card_usage(deltas, collections=None):
+    """Apply card usage deltas with one unordered bulk_write per collection"""
+    collections = collections or USAGE_COLLECTIONS
+    for name, operations in usage_operations(deltas).items():
+        if operations:
+            await collections[name].bulk_write(operations, ordered=False)
+
+async def record_card_usage(before, after):
+    """Update card popularity and co-occurrence after a deck went from `before` to `after` quantities.
+    
+    Failures are only logged: the deck write already happened, and
+    POST /admin/rebuild-card-usage recomputes everything from the decks.
+    """
+    try:
+        cards = await resolve_cards(list(set(before) | set(after)))
+        await write_card_usage(usage_deltas(before, after, cards))
+    except Exception as e:
+        print(f"Warning: could not update card usage: {e}")
+
+async def record_deck_usage(deck, before, after):
+    """Record an edit of `deck` (the document returned by the write, with its usage_counted flag).
+    
+    A deck that is not counted yet is counted in full instead, once: the flag
+    is claimed atomically and the deck's sections at that moment are added.
+    """
+    if deck.get(USAGE_COUNTED):
+        await record_card_usage(before, after)
+        return
+    claimed = await decks_collection.find_one_and_update(
+        {"_id": deck["_id"], USAGE_COUNTED: {"$ne": True}},
+        {"$set": {USAGE_COUNTED: True}},
+        projection={"sections": 1, "card_ids": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if claimed:
+        await record_card_usage({}, deck_quantities(claimed))
+
+async def rebuild_usage():
+    """Recount card usage from every stored deck; returns the number of decks.
+    
+    The counts are built in temporary collections that are renamed over the
+    live ones, so readers never see them empty, and deck writes wait at the
+    gate until every deck is marked as counted.
+    """
+    async with card_usage_gate.exclusive():
+        await ensure_card_catalog()
+        totals = {}
+        deck_count = 0
+        async for deck in decks_collection.find({}, stored_projection(("card_ids",))).batch_size(1000):
+            quantities = deck_quantities(deck)
+            merge_deltas(totals, usage_deltas({}, quantities, card_catalog.cards(quantities)))
+            deck_count += 1
+        
+        rebuilt = {}
+        for name, collection in USAGE_COLLECTIONS.items():
+            rebuilt[name] = collection.database[f"{collection.name}_rebuild"]
+            await rebuilt[name].drop()
+            await ensure_indexes(rebuilt[name], USAGE_INDEXES[name])
+        if totals:
+            await write_card_usage(totals, rebuilt)
+        for name, collection in USAGE_COLLECTIONS.items():
+            if await rebuilt[name].find_one({}, {"_id": 1}):
+                await rebuilt[name].rename(collection.name, dropTarget=True)
+            else:
+                await collection.delete_many({})
+                await rebuilt[name].drop()
+        await decks_collection.update_many({USAGE_COUNTED: {"$ne": True}}, {"$set": {USAGE_COUNTED: True}})
+        return deck_count
+
+async def backfill_card_usage():
+    """Count the decks stored before card usage was tracked, once, in the background"""
+    try:
+        if await decks_collection.find_one({USAGE_COUNTED: {"$ne": True}}, {"_id": 1}):
+            print("Counting card usage of decks stored before it was tracked...")
+            deck_count = await rebuild_usage()
+            print(f"Card usage rebuilt from {deck_count} decks")
+    except Exception as e:
+        print(f"Warning: could not backfill card usage: {e}")
+
+# Deck x card matrix behind POST /decks/recommend
+deck_matrix = DeckMatrix()
+deck_matrix_lock = asyncio.Lock()
+# Keeps background compactions referenced until they finish
+background_tasks = set()
+
+async def load_deck_matrix():
+    """Read the cards of every stored deck into the recommendation matrix"""
+    async with deck_matrix_lock:
+        if deck_matrix.loaded:
+            return
+        deck_matrix.start_loading()
+        try:
+            decks = []
+            async for deck in decks_collection.find({}, stored_projection(("card_ids",))).batch_size(1000):
+                decks.append((str(deck["_id"]), list(deck_quantities(deck))))
+            deck_matrix.load(decks)
+            print(f"Loaded {len(deck_matrix)} decks into the recommendation matrix")
+        except Exception:
+            deck_matrix.abort_loading()
+            raise
+
+async def ensure_deck_matrix():
+    """Make sure the recommendation matrix is loaded (waits for the startup load if it is running)"""
+    if not deck_matrix.loaded:
+        await load_deck_matrix()
+
+async def compact_deck_matrix():
+    """Fold pending deck writes into the matrix, building the new matrix in a worker thread"""
+    snapshot = deck_matrix.compaction_snapshot()
+    try:
+        matrix = await asyncio.get_running_loop().run_in_executor(None, DeckMatrix.compact, snapshot)
+    except Exception as e:
+        deck_matrix.abort_compaction()
+        print(f"Warning: could not compact the recommendation matrix: {e}")
+        return
+    deck_matrix.install(snapshot, matrix)
+
+def update_deck_matrix(deck_id, quantities):
+    """Record a deck's new cards (none once deleted) in the recommendation matrix"""
+    deck_matrix.update(str(deck_id), [card_id for card_id, quantity in quantities.items() if quantity > 0])
+    if deck_matrix.needs_compaction():
+        task = asyncio.create_task(compact_deck_matrix())
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+
+def legend_fields(card_id, card_type):
+    """The denormalized legend_id a deck gets when this card is its legend"""
+    return {"legend_id": card_id} if card_type == "Legend" else {}
+
+async def migrate_deck(deck_id):
+    """Convert a deck stored in the old card_ids format to the compact format"""
+    deck = await decks_collection.find_one({"_id": ObjectId(deck_id), "sections": {"$exists": False}}, {"card_ids": 1})
+    if not deck:
+        return
+    cards = await resolve_cards(deck.get("card_ids", []))
+    await decks_collection.update_one(*migration_update(deck, cards))
+
+async def refresh_deck_stats(deck):
+    """Recompute the stored statistics and LSH bands of a deck after its cards changed.
+    
+    `deck` holds the sections returned by the write. If another write changed
+    them since, nothing is updated: that write refreshes the stats itself.
+    """
+    quantities = deck_quantities(deck)
+    stats = deck_stats(quantities, await resolve_cards(list(quantities)))
+    await decks_collection.update_one(
+        {"_id": deck["_id"], "sections": deck["sections"]},
+        {"$set": {**stats, **similarity_fields(quantities)}}
+    )
 
 # Create indexes for better performance
 async def create_indexes():
     try:
-        # Check if indexes already exist to avoid duplicate key errors
-        existing_indexes = await cards_collection.list_indexes().to_list(None)
-        existing_index_names = [idx['name'] for idx in existing_indexes]
-        
-        # Only create indexes if they don't exist
-        if "card_id_1" not in existing_index_names:
-            await cards_collection.create_index("card_id", unique=True)
-            print("Created card_id index")
-        
-        if "set_code_1" not in existing_index_names:
-            await cards_collection.create_index("set_code")
-            print("Created set_code index")
-            
-        if "card_type_1" not in existing_index_names:
-            await cards_collection.create_index("card_type")
-            print("Created card_type index")
-            
-        if "color_1" not in existing_index_names:
-            await cards_collection.create_index("color")
-            print("Created color index")
-            
-        if "cost_1" not in existing_index_names:
-            await cards_collection.create_index("cost")
-            print("Created cost index")
-            
-        if "rarity_1" not in existing_index_names:
-            await cards_collection.create_index("rarity")
-            print("Created rarity index")
-        
-        # Check sets collection indexes
-        existing_set_indexes = await sets_collection.list_indexes().to_list(None)
-        existing_set_index_names = [idx['name'] for idx in existing_set_indexes]
-        
-        if "set_code_1" not in existing_set_index_names:
-            await sets_collection.create_index("set_code", unique=True)
-            print("Created set_code index for sets")
+        # Only indexes that don't exist yet are created, to avoid duplicate key errors
+        for collection, specs in (
+            (cards_collection, CARD_INDEXES),
+            (sets_collection, SET_INDEXES),
+            (decks_collection, DECK_INDEXES),
+            (card_usage_collection, CARD_USAGE_INDEXES),
+            (card_pairs_collection, CARD_PAIR_INDEXES),
+        ):
+            for name in await ensure_indexes(collection, specs):
+                print(f"Created {name} index for {collection.name}")
             
         print("All indexes created successfully")
         
@@ -96,7 +345,7 @@ async def create_indexes():
         print("Application will continue without optimal indexing")
         # Don't raise the error - let the app continue
 
-# Mount the cards directory to serve images
+# Cards directory containing the card images
 # Use absolute path to Riftbound_Cards folder
 cards_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "Riftbound_Cards"))
 
@@ -104,92 +353,8 @@ cards_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..",
 print(f"Cards directory path: {cards_path}")
 print(f"Directory exists: {os.path.exists(cards_path)}")
 
-# Only mount if directory exists
-if os.path.exists(cards_path):
-    app.mount("/cards", StaticFiles(directory=cards_path), name="cards")
-    print("Successfully mounted cards directory")
-else:
-    print(f"WARNING: Cards directory not found at {cards_path}")
-    print("Card images will not be served until the directory is created")
-
-# Enums for card classification
-class CardType(str, Enum):
-    SPELL = "Spell"
-    UNIT = "Unit"
-    CHAMPION_UNIT = "Champion Unit"
-    SIGNATURE_UNIT = "Signature Unit"
-    SIGNATURE_SPELL = "Signature Spell"
-    LEGEND = "Legend"
-    BATTLEFIELD = "Battlefield"
-    GEAR = "Gear"
-    RUNE = "Rune"
-    TOKEN = "Token"
-
-class CardColor(str, Enum):
-    FURY = "Fury"
-    BODY = "Body"
-    MIND = "Mind"
-    CALM = "Calm"
-    CHAOS = "Chaos"
-    ORDER = "Order"
-    COLORLESS = "Colorless"
-
-class CardRarity(str, Enum):
-    COMMON = "Common"
-    UNCOMMON = "Uncommon"
-    RARE = "Rare"
-    EPIC = "Epic"
-    OVERNUMBERED = "Overnumbered"
 
 # Pydantic models
-class CardModel(BaseModel):
-    name: str = Field(..., min_length=1)
-    image_path: str
-    card_id: str = Field(..., pattern=r'^[A-Z]{2,3}_\d{3}[aS]?$')  # e.g., "OGN_001", "OGN_007a", "OGN_299S"
-    set_name: str
-    set_code: str = Field(..., pattern=r'^[A-Z]{2,3}$')  # e.g., "OGN"
-    set_release_date: Optional[str] = None
-    card_type: CardType
-    subtype: List[str] = []
-    color: List[CardColor] = []
-    cost: int = Field(..., ge=0, le=12)  # 0 to 12
-    rarity: CardRarity
-    might: int = Field(0, ge=0)
-    description: str = ""
-    flavor_text: str = ""
-    artist: str = ""
-    collector_number: str
-    variant: Optional[str] = "regular"  # "regular", "alt_art", or "signature"
-    keywords: List[str] = []
-    created_at: Optional[datetime] = None
-    updated_at: Optional[datetime] = None
-    
-    @validator('subtype')
-    def validate_subtype(cls, v, values):
-        """Validate that cards can have at most 3 subtypes"""
-        if len(v) > 3:
-            raise ValueError('Cards can have at most 3 subtypes')
-        return v
-    
-    @validator('color')
-    def validate_color(cls, v, values):
-        """Validate that only Legend, Signature Unit, and Signature Spell cards can have 2 colors"""
-        card_type = values.get('card_type')
-        
-        if len(v) > 2:
-            raise ValueError('Cards can have at most 2 colors')
-        elif len(v) > 1 and card_type not in [CardType.LEGEND, CardType.SIGNATURE_UNIT, CardType.SIGNATURE_SPELL]:
-            raise ValueError(f'{card_type} cards can only have 1 color, not {len(v)}')
-            
-        return v
-    
-    @validator('keywords')
-    def validate_keywords(cls, v):
-        """Validate that cards can have at most 2 keywords"""
-        if len(v) > 2:
-            raise ValueError('Cards can have at most 2 keywords')
-        return v
-
 class SetInfoModel(BaseModel):
     set_code: str = Field(..., pattern=r'^[A-Z]{2,3}$')
     set_name: str
@@ -203,12 +368,27 @@ class DeckModel(BaseModel):
     name: str = Field(..., min_length=1)
     description: Optional[str] = None
     card_ids: List[str] = Field(default_factory=list)
+    # Alternatively, quantities per card: {"main": {"OGN_001": 3, ...}, "runes": {...}, ...}
+    sections: Optional[Dict[str, Dict[str, int]]] = None
+    # Statistics are computed by the server on every write; values sent by clients are ignored
     deck_colors: List[CardColor] = Field(default_factory=list)
     average_cost: float = Field(default=0.0, ge=0.0)
     card_type_distribution: dict = Field(default_factory=dict)
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
+class DeckCardsRequest(BaseModel):
+    """Cards of a deck: a stored deck_id and/or card_ids and sections like POST /decks"""
+    deck_id: Optional[str] = None
+    card_ids: List[str] = Field(default_factory=list)
+    sections: Optional[Dict[str, Dict[str, int]]] = None
+
+class DeckRecommendRequest(DeckCardsRequest):
+    """A partial deck to suggest cards for, optionally with the legend it will be built around"""
+    legend: Optional[str] = None
+    limit: int = 20
+    include_owned: bool = False
+
 # Initialize indexes on startup
 @app.on_event("startup")
 async def startup_event():
@@ -224,6 +404,16 @@ async def startup_event():
         # Create indexes
         await create_indexes()
         
+        # Load the card catalog into memory
+        await load_card_catalog()
+        
+        # The recommendation matrix is built in the background (requests that
+        # need it before it is ready wait for it), and so are the usage counts
+        # of decks stored before card usage was tracked
+        for task in (asyncio.create_task(load_deck_matrix()), asyncio.create_task(backfill_card_usage())):
+            background_tasks.add(task)
+            task.add_done_callback(background_tasks.discard)
+        
         print("Backend startup completed successfully")
         
     except Exception as e:
@@ -231,6 +421,11 @@ async def startup_event():
         print("Application will continue but some features may not work properly")
         # Don't crash the app - let it continue
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Stop the worker processes used for large deck validation batches
+    shutdown_executor()
+
 @app.get("/")
 def read_root():
     return {
@@ -257,13 +452,15 @@ async def create_set(set_info: SetInfoModel):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/sets")
-async def get_sets():
-    """Get all card sets"""
+async def get_sets(request: Request, stream: bool = False):
+    """Get all card sets (as NDJSON with ?stream=1 or Accept: application/x-ndjson)"""
     try:
+        if wants_ndjson(request.headers.get("accept"), stream):
+            return ndjson_response(ndjson_from_cursor(sets_collection.find()))
+        
         sets = await sets_collection.find().to_list(1000)
-        # Convert MongoDB documents to JSON-serializable format
-        serializable_sets = [convert_mongo_document(set_doc) for set_doc in sets]
-        return {"sets": serializable_sets}
+        # ObjectId/datetime fields are encoded directly by the response class
+        return MongoJSONResponse({"sets": sets})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -289,6 +486,7 @@ async def add_card(card: CardModel):
         
         # Store card info in MongoDB
         result = await cards_collection.insert_one(card.dict())
+        await refresh_catalog_cards([card.card_id])
         return {"message": "Card added successfully", "id": str(result.inserted_id)}
     except HTTPException:
         raise
@@ -310,6 +508,7 @@ async def update_card(card_id: str, card_updates: dict):
         )
         
         if result.modified_count > 0:
+            await refresh_catalog_cards([card_id])
             return {"message": f"Card {card_id} updated successfully"}
         else:
             raise HTTPException(status_code=404, detail=f"Card {card_id} not found")
@@ -318,173 +517,158 @@ async def update_card(card_id: str, card_updates: dict):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Fields the card update endpoints never change
+CARD_PROTECTED_FIELDS = ("_id", "card_id", "created_at", "updated_at")
+
+async def apply_card_updates(card_updates):
+    """Validate (card_id, fields) updates against CardModel, then write them in one bulk_write.
+    
+    Each update is merged into the stored card and the merged card must be a
+    valid CardModel, so a payload never leaves half-valid cards behind; later
+    updates of the same card build on the earlier ones. Updates that change
+    nothing are not written. Returns one result per update, in order, and
+    the matched/modified/invalid counts.
+    """
+    requested_ids = list({card_id for card_id, _ in card_updates if card_id})
+    existing = {
+        card["card_id"]: card
+        for card in await cards_collection.find({"card_id": {"$in": requested_ids}}).to_list(None)
+    }
+    
+    results = []
+    merged = {}
+    changes = {}
+    for card_id, fields in card_updates:
+        result = {"card_id": card_id or "missing"}
+        results.append(result)
+        if not card_id:
+            result.update(status="invalid", error="Missing card_id")
+            continue
+        updates = {field: value for field, value in fields.items() if field not in CARD_PROTECTED_FIELDS}
+        unknown = sorted(set(updates) - set(CardModel.model_fields))
+        if unknown:
+            result.update(status="invalid", error=f"Unknown fields: {', '.join(unknown)}")
+            continue
+        if card_id not in existing:
+            result.update(status="not_found", error="Card not found")
+            continue
+        card = merged.get(card_id, existing[card_id])
+        try:
+            fields = validated_fields(card, updates)
+        except ValidationError as e:
+            result.update(status="invalid", error=validation_message(e))
+            continue
+        merged[card_id] = {**card, **updates}
+        changes.setdefault(card_id, {"fields": {}, "results": []})
+        changes[card_id]["fields"].update(fields)
+        changes[card_id]["results"].append(result)
+    
+    now = datetime.now()
+    card_ids = []
+    operations = []
+    unchanged = 0
+    for card_id, change in changes.items():
+        fields = {field: value for field, value in change["fields"].items() if existing[card_id].get(field) != value}
+        if not fields:
+            unchanged += 1
+            for result in change["results"]:
+                result["status"] = "unchanged"
+            continue
+        card_ids.append(card_id)
+        operations.append(UpdateOne({"card_id": card_id}, {"$set": {**fields, "updated_at": now}}))
+    
+    written = {"matched": 0, "updated": 0, "errors": []}
+    if operations:
+        written = await write_cards(cards_collection, card_ids, operations)
+    failed = {error["card_id"]: error["error"] for error in written["errors"]}
+    modified_ids = [card_id for card_id in card_ids if card_id not in failed]
+    for card_id in card_ids:
+        for result in changes[card_id]["results"]:
+            if card_id in failed:
+                result.update(status="failed", error=failed[card_id])
+            else:
+                result["status"] = "modified"
+    
+    await refresh_catalog_cards(modified_ids)
+    return {
+        "matched": written["matched"] + unchanged,
+        "modified": written["updated"],
+        "invalid": sum(1 for result in results if result["status"] == "invalid"),
+        "not_found": sum(1 for result in results if result["status"] == "not_found"),
+        "results": results,
+    }
+
 @app.post("/cards/bulk-update")
 async def bulk_update_cards(card_updates: List[dict]):
-    """Bulk update multiple cards at once"""
-    try:
-        updated_count = 0
-        errors = []
-        
-        for update in card_updates:
-            try:
-                card_id = update.get('card_id')
-                if not card_id:
-                    errors.append({"card_id": "missing", "error": "Missing card_id"})
-                    continue
-                
-                # Remove card_id from updates
-                updates = {k: v for k, v in update.items() if k != 'card_id'}
-                updates['updated_at'] = datetime.now()
-                
-                result = await cards_collection.update_one(
-                    {"card_id": card_id},
-                    {"$set": updates}
-                )
-                
-                if result.modified_count > 0:
-                    updated_count += 1
-                else:
-                    errors.append({"card_id": card_id, "error": "Card not found"})
-                    
-            except Exception as e:
-                errors.append({"card_id": update.get('card_id', 'unknown'), "error": str(e)})
+    """Bulk update multiple cards at once (validated as a whole, written with one bulk_write)"""
+    try:
+        summary = await apply_card_updates([(update.get('card_id'), update) for update in card_updates])
         
         return {
-            "message": f"Bulk update completed. Updated {updated_count} cards.",
-            "updated_count": updated_count,
-            "errors": errors
+            "message": f"Bulk update completed. Updated {summary['modified']} cards.",
+            "updated_count": summary["modified"],
+            "matched_count": summary["matched"],
+            "invalid_count": summary["invalid"],
+            "not_found_count": summary["not_found"],
+            "results": summary["results"],
+            "errors": [result for result in summary["results"] if "error" in result]
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/cards/update-from-data")
 async def update_cards_from_data(cards_data: dict):
-    """Update cards from structured data format"""
-    try:
-        updated_count = 0
-        not_found_count = 0
-        errors = []
-        
-        for card_id, card_data in cards_data.items():
-            try:
-                # Check if card exists
-                existing_card = await cards_collection.find_one({"card_id": card_id})
-                
-                if not existing_card:
-                    not_found_count += 1
-                    errors.append({"card_id": card_id, "error": "Card not found in database"})
-                    continue
-                
-                # Prepare update data
-                update_data = {
-                    "updated_at": datetime.now()
-                }
-                
-                # Map the provided data to database fields
-                field_mapping = {
-                    "name": "name",
-                    "card_type": "card_type", 
-                    "subtype": "subtype",
-                    "color": "color",
-                    "cost": "cost",
-                    "rarity": "rarity",
-                    "might": "might",
-                    "description": "description",
-                    "flavor_text": "flavor_text",
-                    "artist": "artist",
-                    "keywords": "keywords"
-                }
-                
-                for field, db_field in field_mapping.items():
-                    if field in card_data:
-                        update_data[db_field] = card_data[field]
-                
-                # Update the card
-                result = await cards_collection.update_one(
-                    {"card_id": card_id},
-                    {"$set": update_data}
-                )
-                
-                if result.modified_count > 0:
-                    updated_count += 1
-                else:
-                    errors.append({"card_id": card_id, "error": "No changes made"})
-                    
-            except Exception as e:
-                errors.append({"card_id": card_id, "error": str(e)})
+    """Update cards from structured data format (validated as a whole, written with one bulk_write)"""
+    try:
+        # Only the card details are taken from the data; other keys are ignored
+        summary = await apply_card_updates([
+            (card_id, {field: value for field, value in (card_data or {}).items() if field in METADATA_FIELDS})
+            for card_id, card_data in cards_data.items()
+        ])
         
         return {
-            "message": f"Update completed. Updated {updated_count} cards, {not_found_count} not found.",
-            "updated_count": updated_count,
-            "not_found_count": not_found_count,
-            "errors": errors
+            "message": f"Update completed. Updated {summary['modified']} cards, {summary['not_found']} not found.",
+            "updated_count": summary["modified"],
+            "matched_count": summary["matched"],
+            "invalid_count": summary["invalid"],
+            "not_found_count": summary["not_found"],
+            "results": summary["results"],
+            "errors": [result for result in summary["results"] if "error" in result]
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/scan-cards")
-async def scan_cards_directory():
-    """Automatically scan the Riftbound_Cards directory and add all cards to MongoDB"""
-    try:
-        cards_dir = cards_path
-        added_count = 0
-        updated_count = 0
-        
-        for set_folder in os.listdir(cards_dir):
-            set_path = os.path.join(cards_dir, set_folder)
-            if os.path.isdir(set_path) and not set_folder.startswith('.'):
-                for filename in os.listdir(set_path):
-                    if filename.lower().endswith(('.png', '.jpg', '.jpeg')):
-                        # Extract card ID from filename (e.g., "OGN_001.png" -> "OGN_001")
-                        card_id = os.path.splitext(filename)[0]
-                        
-                        # Extract set code from card ID
-                        set_code_match = re.match(r'^([A-Z]{2,3})_(\d{3})([aS]?)$', card_id)
-                        if not set_code_match:
-                            continue
-                            
-                        set_code = set_code_match.group(1)
-                        collector_number = set_code_match.group(2)
-                        variant = set_code_match.group(3)  # 'a' for alt art, 'S' for signature, '' for regular
-                        
-                        # Check if card already exists
-                        existing = await cards_collection.find_one({"card_id": card_id})
-                        if not existing:
-                            # Create basic card entry (user will need to fill in details)
-                            card = CardModel(
-                                name=f"Card {card_id}",
-                                image_path=filename,
-                                card_id=card_id,
-                                set_name=set_folder,
-                                set_code=set_code,
-                                card_type=CardType.SPELL,  # Default, user should update
-                                subtype=[],  # Default empty array, user should update
-                                color=[CardColor.COLORLESS],  # Default single color, user should update
-                                cost=0,  # Default, user should update
-                                rarity=CardRarity.COMMON,  # Default, user should update
-                                collector_number=collector_number,
-                                keywords=[]
-                            )
-                            await cards_collection.insert_one(card.dict())
-                            added_count += 1
-                        else:
-                            # Update existing card with new image path if needed
-                            if existing.get("image_path") != filename:
-                                await cards_collection.update_one(
-                                    {"_id": existing["_id"]},
-                                    {"$set": {"image_path": filename, "updated_at": datetime.now()}}
-                                )
-                                updated_count += 1
+async def scan_cards_directory(full: bool = False):
+    """Scan the Riftbound_Cards directory and add or update the cards whose images changed.
+    
+    Only files that are new or changed since the last scan are written (see
+    card_scanner.py); ?full=true rescans every file.
+    """
+    try:
+        result = await apply_scan(cards_collection, card_manifest_collection, cards_path, full=full)
+        await refresh_catalog_cards(result["card_ids"])
         
         return {
-            "message": f"Scan completed. Added {added_count} new cards, updated {updated_count} existing cards"
+            "message": f"Scan completed. Added {result['added']} new cards, updated {result['updated']} existing cards",
+            **{key: value for key, value in result.items() if key != "card_ids"}
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/reload-catalog")
+async def reload_card_catalog():
+    """Reload the in-memory card catalog (e.g. after running populate_cards.py)"""
+    try:
+        await load_card_catalog()
+        return {"message": f"Catalog reloaded with {len(card_catalog)} cards", "version": card_catalog.version}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 
 @app.get("/cards")
 async def get_cards(
+    request: Request,
     set_code: Optional[str] = None,
     card_type: Optional[CardType] = None,
     color: Optional[str] = None,  # Can be single color or comma-separated colors
@@ -496,90 +680,41 @@ async def get_cards(
     search_text: Optional[str] = None,  # Search in name, description, flavor_text
     limit: Optional[int] = None,
     sort_by: Optional[str] = "name",  # Sort by: name, cost, rarity, set_code
-    sort_order: Optional[str] = "asc"  # asc or desc
+    sort_order: Optional[str] = "asc",  # asc or desc
+    fields: Optional[str] = None,  # Comma-separated fields and/or presets: thumb, full
+    stream: bool = False  # Stream the cards as NDJSON (also via Accept: application/x-ndjson)
 ):
-    """Get cards with enhanced search and filtering capabilities"""
+    """Get cards with enhanced search and filtering capabilities (served from the in-memory catalog)"""
+    projection = parse_fields_param(fields, CARD_FIELD_PRESETS)
     try:
-        # Build filter query
-        filter_query = {}
-        
-        # Set filter
-        if set_code:
-            filter_query["set_code"] = set_code
-            
-        # Card type filter
-        if card_type:
-            filter_query["card_type"] = card_type
-            
-        # Variant filter
-        if variant:
-            filter_query["variant"] = variant
-            
-        # Cost filters
-        if exact_cost is not None:
-            filter_query["cost"] = exact_cost
-        elif min_cost is not None or max_cost is not None:
-            cost_filter = {}
-            if min_cost is not None:
-                cost_filter["$gte"] = min_cost
-            if max_cost is not None:
-                cost_filter["$lte"] = max_cost
-            filter_query["cost"] = cost_filter
-        
-        # Color filter - support multiple colors (color is stored as array in DB)
-        if color:
-            colors = [c.strip() for c in color.split(',')]
-            if len(colors) == 1:
-                # Single color - check if card's color array contains this color
-                filter_query["color"] = colors[0]
-            else:
-                # Multiple colors - check if card's color array contains any of these colors
-                filter_query["color"] = {"$in": colors}
-        
-        # Rarity filter - support multiple rarities
-        if rarity:
-            rarities = [r.strip() for r in rarity.split(',')]
-            if len(rarities) == 1:
-                filter_query["rarity"] = rarities[0]
-            else:
-                filter_query["rarity"] = {"$in": rarities}
-        
-        # Text search - search in name, description, and flavor_text
-        if search_text:
-            # Create a regex pattern for case-insensitive search
-            search_pattern = re.compile(re.escape(search_text), re.IGNORECASE)
-            filter_query["$or"] = [
-                {"name": search_pattern},
-                {"description": search_pattern},
-                {"flavor_text": search_pattern},
-                {"keywords": {"$in": [search_pattern]}}  # Search in keywords array
-            ]
-        
-        # Build sort criteria
-        sort_criteria = []
-        if sort_by == "cost":
-            sort_criteria.append(("cost", 1 if sort_order == "asc" else -1))
-        elif sort_by == "rarity":
-            sort_criteria.append(("rarity", 1 if sort_order == "asc" else -1))
-        elif sort_by == "set_code":
-            sort_criteria.append(("set_code", 1 if sort_order == "asc" else -1))
-        else:  # Default to name
-            sort_criteria.append(("name", 1 if sort_order == "asc" else -1))
-        
-        # Execute query with sorting
-        cursor = cards_collection.find(filter_query).sort(sort_criteria)
-        
-        # Apply limit if specified
-        if limit:
-            cursor = cursor.limit(limit)
+        await ensure_card_catalog()
+        
+        # Color and rarity filters accept comma-separated values
+        colors = [c.strip() for c in color.split(',')] if color else None
+        rarities = [r.strip() for r in rarity.split(',')] if rarity else None
+        
+        slots = card_catalog.query(
+            set_code=set_code,
+            card_type=card_type,
+            colors=colors,
+            rarities=rarities,
+            variant=variant,
+            min_cost=min_cost,
+            max_cost=max_cost,
+            exact_cost=exact_cost,
+            search_text=search_text,
+            sort_by=sort_by,
+            sort_order=sort_order,
+            limit=limit
+        )
         
-        cards = await cursor.to_list(None)
+        # Cards are sent as their cached JSON bytes
+        encoded_cards = [card_catalog.encoded(slot, projection) for slot in slots]
+        if wants_ndjson(request.headers.get("accept"), stream):
+            return ndjson_response(ndjson_from_encoded(encoded_cards))
         
-        # Convert MongoDB documents to JSON-serializable format
-        serializable_cards = [convert_mongo_document(card) for card in cards]
-        return {
-            "cards": serializable_cards, 
-            "count": len(serializable_cards),
+        return MongoJSONResponse(encode_list_response("cards", encoded_cards, {
+            "count": len(slots),
             "filters_applied": {
                 "set_code": set_code,
                 "card_type": card_type,
@@ -590,7 +725,7 @@ async def get_cards(
                 "exact_cost": exact_cost,
                 "search_text": search_text
             }
-        }
+        }))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -605,78 +740,64 @@ async def search_cards(
     card_types: Optional[str] = None,  # Comma-separated card types
     sets: Optional[str] = None,  # Comma-separated set codes
     keywords: Optional[str] = None,  # Comma-separated keywords
+    variants: Optional[str] = None,  # Comma-separated variants
+    sort_by: Optional[str] = None,  # Sort by: name, cost, rarity, set_code, card_id (relevance when q is set, else card_id)
+    sort_order: Optional[str] = "asc",  # asc or desc
     limit: Optional[int] = 50,
-    offset: Optional[int] = 0
+    offset: Optional[int] = 0,
+    cursor: Optional[str] = None,  # next_cursor from the previous page; takes precedence over offset
+    facets: bool = True,  # Include per-facet counts of the matching cards
+    fields: Optional[str] = None  # Comma-separated fields and/or presets: thumb, full
 ):
-    """Advanced search endpoint with comprehensive filtering options"""
-    try:
-        filter_query = {}
-        
-        # Main text search query
-        if q:
-            # Create a regex pattern for case-insensitive search
-            search_pattern = re.compile(re.escape(q), re.IGNORECASE)
-            filter_query["$or"] = [
-                {"name": search_pattern},
-                {"description": search_pattern},
-                {"flavor_text": search_pattern},
-                {"keywords": {"$in": [search_pattern]}},
-                {"subtype": {"$in": [search_pattern]}}
-            ]
-        
-        # Color filtering (color is stored as array in DB)
-        if colors:
-            color_list = [c.strip() for c in colors.split(',')]
-            filter_query["color"] = {"$in": color_list}
-        
-        # Rarity filtering
-        if rarities:
-            rarity_list = [r.strip() for r in rarities.split(',')]
-            filter_query["rarity"] = {"$in": rarity_list}
-        
-        # Cost filtering
-        if cost_exact is not None:
-            filter_query["cost"] = cost_exact
-        elif cost_min is not None or cost_max is not None:
-            cost_filter = {}
-            if cost_min is not None:
-                cost_filter["$gte"] = cost_min
-            if cost_max is not None:
-                cost_filter["$lte"] = cost_max
-            filter_query["cost"] = cost_filter
-        
-        # Card type filtering
-        if card_types:
-            type_list = [t.strip() for t in card_types.split(',')]
-            filter_query["card_type"] = {"$in": type_list}
-        
-        # Set filtering
-        if sets:
-            set_list = [s.strip() for s in sets.split(',')]
-            filter_query["set_code"] = {"$in": set_list}
-        
-        # Keyword filtering
-        if keywords:
-            keyword_list = [k.strip() for k in keywords.split(',')]
-            filter_query["keywords"] = {"$in": keyword_list}
-        
-        # Execute search with pagination
-        cursor = cards_collection.find(filter_query).skip(offset).limit(limit)
-        cards = await cursor.to_list(None)
-        
-        # Get total count for pagination
-        total_count = await cards_collection.count_documents(filter_query)
-        
-        # Convert MongoDB documents to JSON-serializable format
-        serializable_cards = [convert_mongo_document(card) for card in cards]
-        
-        return {
-            "cards": serializable_cards,
-            "count": len(serializable_cards),
+    """Advanced search endpoint with comprehensive filtering options (evaluated on the catalog bitmaps)"""
+    projection = parse_fields_param(fields, CARD_FIELD_PRESETS)
+    try:
+        await ensure_card_catalog()
+        
+        def split_param(value):
+            return [v.strip() for v in value.split(',')] if value else None
+        
+        bits = card_catalog.select(
+            set_codes=split_param(sets),
+            card_types=split_param(card_types),
+            colors=split_param(colors),
+            rarities=split_param(rarities),
+            variants=split_param(variants),
+            keywords=split_param(keywords),
+            min_cost=cost_min,
+            max_cost=cost_max,
+            exact_cost=cost_exact,
+            search_text=q,
+            search_fields=SEARCH_TEXT_FIELDS
+        )
+        total_count = card_catalog.count(bits)
+        
+        # Order the matches (text searches are ranked by match quality unless sort_by is set)
+        # and cut out the page, either after the cursor or at the offset
+        try:
+            slots, offset, next_cursor = card_catalog.search_page(
+                bits,
+                sort_by=sort_by,
+                sort_order=sort_order,
+                search_text=q,
+                search_fields=SEARCH_TEXT_FIELDS,
+                cursor=cursor,
+                offset=offset or 0,
+                limit=limit
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        # Cards are sent as their cached JSON bytes
+        encoded_cards = [card_catalog.encoded(slot, projection) for slot in slots]
+        return MongoJSONResponse(encode_list_response("cards", encoded_cards, {
+            "count": len(slots),
             "total_count": total_count,
             "offset": offset,
             "limit": limit,
-            "has_more": (offset + len(serializable_cards)) < total_count,
+            "has_more": next_cursor is not None,
+            "next_cursor": next_cursor,
+            "facets": card_catalog.facet_counts(bits) if facets else None,
             "search_params": {
                 "query": q,
                 "colors": colors,
@@ -685,137 +806,155 @@ async def search_cards(
                 "cost_exact": cost_exact,
                 "card_types": card_types,
                 "sets": sets,
-                "keywords": keywords
+                "keywords": keywords,
+                "variants": variants,
+                "sort_by": sort_by,
+                "sort_order": sort_order
             }
-        }
+        }))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/cards/autocomplete")
+async def autocomplete_cards(prefix: str = "", limit: int = 10):
+    """Type-ahead completions over card names, keywords and subtypes"""
+    try:
+        await ensure_card_catalog()
+        
+        completions = card_catalog.complete(prefix, min(max(limit, 0), 50))
+        return {"prefix": prefix, "completions": completions, "count": len(completions)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/cards/options")
 async def get_search_options():
-    """Get available search options for building search interfaces"""
-    try:
-        # Get unique values for each searchable field
-        pipeline = [
-            {
-                "$group": {
-                    "_id": None,
-                    "colors": {"$addToSet": "$color"},
-                    "rarities": {"$addToSet": "$rarity"},
-                    "card_types": {"$addToSet": "$card_type"},
-                    "set_codes": {"$addToSet": "$set_code"},
-                    "keywords": {"$addToSet": "$keywords"},
-                    "costs": {"$addToSet": "$cost"}
-                }
-            }
-        ]
-        
-        result = await cards_collection.aggregate(pipeline).to_list(1)
-        
-        if result:
-            data = result[0]
-            # Flatten arrays and remove duplicates
-            all_colors = list(set([color for color_list in data.get("colors", []) for color in color_list]))
-            all_keywords = list(set([keyword for keyword_list in data.get("keywords", []) for keyword in keyword_list]))
-            
-            return {
-                "colors": sorted(all_colors),
-                "rarities": sorted(data.get("rarities", [])),
-                "card_types": sorted(data.get("card_types", [])),
-                "set_codes": sorted(data.get("set_codes", [])),
-                "keywords": sorted(all_keywords),
-                "costs": sorted(data.get("costs", []))
-            }
-        else:
-            return {
-                "colors": [],
-                "rarities": [],
-                "card_types": [],
-                "set_codes": [],
-                "keywords": [],
-                "costs": []
-            }
+    """Get available search options for building search interfaces (materialized in the catalog)"""
+    try:
+        await ensure_card_catalog()
+        return {**card_catalog.options(), "version": card_catalog.version}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/cards/popular")
+async def get_popular_cards(limit: int = 20, card_fields: Optional[str] = "thumb"):
+    """Most played cards: the number and share of decks playing each, and their average copies"""
+    fields = parse_fields_param(card_fields, CARD_FIELD_PRESETS)
+    try:
+        await ensure_card_catalog()
+        totals = await deck_features_collection.find_one({"_id": ALL_DECKS})
+        total_decks = totals["deck_count"] if totals else 0
+        
+        usage = await card_usage_collection.find({"deck_count": {"$gt": 0}}).sort(
+            "deck_count", -1
+        ).limit(min(max(limit, 1), 100)).to_list(None)
+        cards = []
+        for entry in usage:
+            card = card_catalog.get(entry["_id"])
+            cards.append({
+                "card_id": entry["_id"],
+                "card": project_document(card, fields) if card else None,
+                "deck_count": entry["deck_count"],
+                "play_rate": round(entry["deck_count"] / total_decks, 4) if total_decks else 0.0,
+                "average_copies": round(entry.get("copies", 0) / entry["deck_count"], 2)
+            })
+        return MongoJSONResponse({"cards": cards, "total_decks": total_decks})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/cards/{card_id}/played-with")
+async def get_cards_played_with(card_id: str, limit: int = 20, card_fields: Optional[str] = "thumb"):
+    """Cards most often played in the same decks as a card.
+    
+    `rate` is the share of the decks playing the card that also play the other one.
+    """
+    fields = parse_fields_param(card_fields, CARD_FIELD_PRESETS)
+    try:
+        await ensure_card_catalog()
+        usage = await card_usage_collection.find_one({"_id": card_id})
+        deck_count = usage["deck_count"] if usage else 0
+        
+        pairs = await card_pairs_collection.find({"card_id": card_id, "deck_count": {"$gt": 0}}).sort(
+            "deck_count", -1
+        ).limit(min(max(limit, 1), 100)).to_list(None)
+        cards = []
+        for pair in pairs:
+            card = card_catalog.get(pair["other_id"])
+            cards.append({
+                "card_id": pair["other_id"],
+                "card": project_document(card, fields) if card else None,
+                "deck_count": pair["deck_count"],
+                "rate": round(pair["deck_count"] / deck_count, 4) if deck_count else 0.0
+            })
+        return MongoJSONResponse({"card_id": card_id, "deck_count": deck_count, "played_with": cards})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/cards/{set_name}")
-async def get_cards_by_set(set_name: str):
-    """Get all cards from a specific set"""
+async def get_cards_by_set(set_name: str, request: Request, fields: Optional[str] = None, stream: bool = False):
+    """Get all cards from a specific set (as NDJSON with ?stream=1 or Accept: application/x-ndjson)"""
+    projection = mongo_projection(parse_fields_param(fields, CARD_FIELD_PRESETS))
     try:
-        cards = await cards_collection.find({"set_name": set_name}).to_list(1000)
-        # Convert MongoDB documents to JSON-serializable format
-        serializable_cards = [convert_mongo_document(card) for card in cards]
-        return {"cards": serializable_cards, "count": len(serializable_cards)}
+        if wants_ndjson(request.headers.get("accept"), stream):
+            return ndjson_response(ndjson_from_cursor(cards_collection.find({"set_name": set_name}, projection)))
+        
+        cards = await cards_collection.find({"set_name": set_name}, projection).to_list(1000)
+        # ObjectId/datetime fields are encoded directly by the response class
+        return MongoJSONResponse({"cards": cards, "count": len(cards)})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/cards/stats/summary")
 async def get_cards_summary():
-    """Get summary statistics for all cards"""
-    try:
-        pipeline = [
-            {
-                "$group": {
-                    "_id": None,
-                    "total_cards": {"$sum": 1},
-                    "total_sets": {"$addToSet": "$set_code"},
-                    "avg_cost": {"$avg": "$cost"},
-                    "card_types": {"$addToSet": "$card_type"},
-                    "colors": {"$addToSet": "$color"},
-                    "rarities": {"$addToSet": "$rarity"}
-                }
-            },
-            {
-                "$project": {
-                    "_id": 0,
-                    "total_cards": 1,
-                    "total_sets": {"$size": "$total_sets"},
-                    "avg_cost": {"$round": ["$avg_cost", 2]},
-                    "card_types": 1,
-                    "colors": 1,
-                    "rarities": 1
-                }
-            }
-        ]
-        
-        result = await cards_collection.aggregate(pipeline).to_list(1)
-        if result:
-            return result[0]
-        return {"total_cards": 0, "total_sets": 0, "avg_cost": 0}
+    """Get summary statistics for all cards (materialized in the catalog)"""
+    try:
+        await ensure_card_catalog()
+        return {**card_catalog.summary(), "version": card_catalog.version}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/cards/stats/by-set")
 async def get_cards_stats_by_set():
-    """Get card statistics grouped by set"""
-    try:
-        pipeline = [
-            {
-                "$group": {
-                    "_id": "$set_code",
-                    "set_name": {"$first": "$set_name"},
-                    "card_count": {"$sum": 1},
-                    "avg_cost": {"$avg": "$cost"},
-                    "card_types": {"$addToSet": "$card_type"},
-                    "colors": {"$addToSet": "$color"}
-                }
-            },
-            {
-                "$project": {
-                    "_id": 0,
-                    "set_code": "$_id",
-                    "set_name": 1,
-                    "card_count": 1,
-                    "avg_cost": {"$round": ["$avg_cost", 2]},
-                    "card_types": 1,
-                    "colors": 1
-                }
-            },
-            {"$sort": {"set_code": 1}}
-        ]
-        
-        result = await cards_collection.aggregate(pipeline).to_list(1000)
-        return {"set_stats": result}
+    """Get card statistics grouped by set (materialized in the catalog)"""
+    try:
+        await ensure_card_catalog()
+        return {"set_stats": card_catalog.stats_by_set(), "version": card_catalog.version}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/cards/stats/play-rates")
+async def get_card_play_rates():
+    """Share of decks playing at least one card of each set and of each color"""
+    try:
+        features = {
+            feature["_id"]: feature["deck_count"]
+            for feature in await deck_features_collection.find().to_list(None)
+        }
+        return {
+            "total_decks": features.get(ALL_DECKS, 0),
+            "by_set": play_rates(features, "set:", "set_code"),
+            "by_color": play_rates(features, "color:", "color")
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/admin/rebuild-card-usage")
+async def rebuild_card_usage():
+    """Recompute card popularity and co-occurrence from every stored deck"""
+    try:
+        deck_count = await rebuild_usage()
+        return {"message": "Card usage rebuilt", "deck_count": deck_count}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/admin/index-report")
+async def get_index_report():
+    """Explain the common query shapes and report collection scans and in-memory sorts"""
+    try:
+        report = await explain_query_shapes(db)
+        problems = [entry["query"] for entry in report if not entry["ok"]]
+        return {"queries": report, "problem_count": len(problems), "problems": problems}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -838,143 +977,537 @@ async def get_card_image(set_name: str, filename: str):
 async def create_deck(deck: DeckModel):
     """Create a new deck"""
     try:
-        # Separate regular cards from special cards
-        regular_cards = []
-        battlefield_cards = []
-        legend_cards = []
-        rune_cards = []
-        
-        # Categorize cards by type
-        for card_id in deck.card_ids:
-            card = await cards_collection.find_one({"card_id": card_id})
-            if card:
-                card_type = card.get("card_type")
-                if card_type == "Battlefield":
-                    battlefield_cards.append(card_id)
-                elif card_type == "Legend":
-                    legend_cards.append(card_id)
-                elif card_type == "Rune":
-                    rune_cards.append(card_id)
-                else:
-                    regular_cards.append(card_id)
-        
-        # Validate regular deck size (max 40 cards)
-        if len(regular_cards) > 40:
-            raise HTTPException(status_code=400, detail="Regular deck cannot exceed 40 cards")
-        
-        # Validate special card requirements
-        if len(battlefield_cards) != 3:
-            raise HTTPException(status_code=400, detail="You must have exactly 3 Battlefield cards")
-        
-        if len(legend_cards) != 1:
-            raise HTTPException(status_code=400, detail="You must have exactly 1 Legend card")
-        
-        if len(rune_cards) != 12:
-            raise HTTPException(status_code=400, detail="You must have exactly 12 Rune cards")
-        
-        # Check for more than 3 copies of any regular card
-        card_counts = {}
-        for card_id in regular_cards:
-            card_counts[card_id] = card_counts.get(card_id, 0) + 1
-            if card_counts[card_id] > 3:
-                raise HTTPException(status_code=400, detail=f"Cannot have more than 3 copies of {card_id}")
-        
-        # Check for more than 12 copies of any rune card (total limit)
-        rune_card_counts = {}
-        for card_id in rune_cards:
-            rune_card_counts[card_id] = rune_card_counts.get(card_id, 0) + 1
+        # Resolve every distinct card in one pass and check the deck rules in memory
+        quantities = merge_quantities(deck.card_ids, deck.sections)
+        cards = await resolve_cards(list(quantities))
+        card_types = {card_id: card.get("card_type") for card_id, card in cards.items()}
+        violations = deck_violations(quantities, card_types)
+        if violations:
+            raise HTTPException(status_code=400, detail="; ".join(violations))
         
         # Set timestamps
         deck.created_at = datetime.now()
         deck.updated_at = datetime.now()
         
-        result = await decks_collection.insert_one(deck.dict())
+        # Stored as quantities per section, with the counters add-card/remove-card validate against
+        # and with statistics computed from the cards (whatever the client sent)
+        deck_doc = {
+            **deck.dict(exclude={"card_ids", "sections"}),
+            **compact_fields(quantities, card_types),
+            **deck_stats(quantities, cards),
+            **similarity_fields(quantities),
+            USAGE_COUNTED: True
+        }
+        async with card_usage_gate.writing():
+            result = await decks_collection.insert_one(deck_doc)
+            await record_card_usage({}, quantities)
+        update_deck_matrix(result.inserted_id, quantities)
         return {"message": "Deck created successfully", "id": str(result.inserted_id)}
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/decks/encode")
+async def encode_deck_code(request: DeckCardsRequest):
+    """Pack a deck into a short, URL-safe deck code"""
+    try:
+        quantities = await request_quantities(request)
+        
+        card_types = await resolve_card_types(list(quantities))
+        unknown = [card_id for card_id in quantities if card_id not in card_types]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown card IDs: {', '.join(unknown)}")
+        
+        try:
+            code = encode_deck(quantities)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {"code": code, "card_count": sum(quantities.values())}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/decks/validate-batch")
+async def validate_deck_batch(request: Request, stream: bool = False):
+    """Validate many decklists at once with the same rules as POST /decks.
+    
+    The body is a JSON array of decklists (or {"decks": [...]}), or NDJSON with
+    Content-Type: application/x-ndjson, one decklist per line. A decklist has
+    card_ids, sections and/or a deck code. Results come back in input order,
+    as NDJSON with ?stream=1 or Accept: application/x-ndjson.
+    """
+    entries = []
+    if NDJSON_MEDIA_TYPE in request.headers.get("content-type", ""):
+        async for entry, error in ndjson_objects(request.stream()):
+            entries.append((None, None, error) if error else parse_decklist(entry))
+    else:
+        try:
+            body = json.loads(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Request body must be JSON or NDJSON")
+        if isinstance(body, dict):
+            body = body.get("decks")
+        if not isinstance(body, list):
+            raise HTTPException(status_code=400, detail="Expected a list of decklists")
+        entries = [parse_decklist(entry) for entry in body]
+    
+    try:
+        # One type table for the whole batch
+        decks = [quantities for _, quantities, error in entries if error is None]
+        card_types = await resolve_card_types(list({card_id for deck in decks for card_id in deck}))
+        deck_results = iter(await validate_decks(decks, card_types))
+        
+        results = []
+        for index, (label, _, error) in enumerate(entries):
+            violations = [error] if error else next(deck_results)
+            results.append({"index": index, "id": label, "valid": not violations, "violations": violations})
+        
+        if wants_ndjson(request.headers.get("accept"), stream):
+            return ndjson_response(ndjson_from_encoded(encode_json(result) for result in results))
+        valid_count = sum(1 for result in results if result["valid"])
+        return MongoJSONResponse({
+            "results": results,
+            "deck_count": len(results),
+            "valid_count": valid_count,
+            "invalid_count": len(results) - valid_count
+        })
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/decks/stats")
+async def get_card_list_stats(request: DeckCardsRequest):
+    """Statistics of an ad-hoc list of cards (card_ids and/or sections, or a stored deck_id).
+    
+    Mana curve, color split, type distribution, might totals, average cost and
+    deck colors, computed from the card catalog in one pass over the distinct cards.
+    """
+    try:
+        quantities = await request_quantities(request)
+        return card_list_stats(quantities, await resolve_cards(list(quantities)))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/decks/recommend")
+async def recommend_cards(request: DeckRecommendRequest, card_fields: Optional[str] = "thumb"):
+    """Suggest cards for a partial deck (card_ids and/or sections, or a stored deck_id).
+    
+    Cards are ranked by how often the stored decks closest to the partial deck
+    play them, and only cards that fit the legend's colors and can still be
+    added under the POST /decks limits are returned.
+    """
+    fields = parse_fields_param(card_fields, CARD_FIELD_PRESETS)
+    try:
+        quantities = await request_quantities(request)
+        cards = await resolve_cards(list(quantities) + ([request.legend] if request.legend else []))
+        if request.legend and (cards.get(request.legend) or {}).get("card_type") != "Legend":
+            raise HTTPException(status_code=400, detail=f"{request.legend} is not a Legend card")
+        legend_id, colors = legend_colors(quantities, cards, request.legend)
+        
+        await ensure_deck_matrix()
+        start = time.perf_counter()
+        allowed = suggestion_filter(quantities, card_catalog.get, colors, request.include_owned)
+        suggestions = deck_matrix.recommend(quantities, allowed, min(max(request.limit, 1), 100))
+        elapsed = time.perf_counter() - start
+        
+        for suggestion in suggestions:
+            suggestion["card"] = project_document(card_catalog.get(suggestion["card_id"]), fields)
+            suggestion["in_deck"] = quantities.get(suggestion["card_id"], 0)
+        return MongoJSONResponse({
+            "legend_id": legend_id,
+            "colors": sorted(colors) if colors is not None else None,
+            "decks_indexed": len(deck_matrix),
+            "suggestions": suggestions,
+            "query_ms": round(elapsed * 1000, 2)
+        })
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/decks/near-duplicates")
+async def get_near_duplicate_decks(threshold: float = 0.8, limit: int = 100):
+    """Pairs and groups of stored decks at least `threshold` similar to each other.
+    
+    Only decks sharing an LSH band bucket are compared, instead of every pair
+    of decks.
+    """
+    try:
+        buckets = decks_collection.aggregate([
+            {"$project": {"lsh_bands": 1}},
+            {"$unwind": "$lsh_bands"},
+            {"$group": {"_id": "$lsh_bands", "decks": {"$push": "$_id"}}},
+            {"$match": {"decks.1": {"$exists": True}}}
+        ], allowDiskUse=True)
+        pairs = candidate_pairs([[str(deck_id) for deck_id in bucket["decks"]] async for bucket in buckets], MAX_BUCKET)
+        
+        deck_ids = list({deck_id for pair in pairs for deck_id in pair})
+        decks = {}
+        async for deck in decks_collection.find(
+            {"_id": {"$in": [ObjectId(deck_id) for deck_id in deck_ids]}},
+            {"name": 1, "sections": 1, "card_ids": 1}
+        ):
+            decks[str(deck["_id"])] = (deck.get("name"), deck_quantities(deck))
+        
+        duplicates = []
+        for first, second in pairs:
+            if first in decks and second in decks:
+                similarity = deck_similarity(decks[first][1], decks[second][1])
+                if similarity >= threshold:
+                    duplicates.append((similarity, first, second))
+        duplicates.sort(key=lambda entry: (-entry[0], entry[1], entry[2]))
+        groups = duplicate_groups((first, second) for _, first, second in duplicates)
+        
+        limit = min(max(limit, 1), 1000)
+        return {
+            "threshold": threshold,
+            "candidate_pairs": len(pairs),
+            "pair_count": len(duplicates),
+            "pairs": [
+                {"deck_ids": [first, second], "names": [decks[first][0], decks[second][0]], "similarity": round(similarity, 4)}
+                for similarity, first, second in duplicates[:limit]
+            ],
+            "groups": [
+                {"deck_ids": group, "names": [decks[deck_id][0] for deck_id in group]}
+                for group in groups[:limit]
+            ]
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/decks/decode")
+async def decode_deck_code(code: str, card_fields: Optional[str] = "thumb"):
+    """Resolve a deck code against the card catalog.
+    
+    Returns the deck's sections and card_ids (ready for POST /decks) and each
+    card once with its quantity; `card_fields` selects the card fields.
+    """
+    fields = parse_fields_param(card_fields, CARD_FIELD_PRESETS)
+    try:
+        quantities = decode_deck(code)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        card_types = await resolve_card_types(list(quantities))
+        known = {card_id: quantity for card_id, quantity in quantities.items() if card_id in card_types}
+        deck = compact_fields(known, card_types)
+        cards = [
+            {"card": project_document(card_catalog.get(card_id), fields), "quantity": quantity}
+            for card_id, quantity in known.items()
+        ]
+        return MongoJSONResponse({
+            "code": code,
+            "sections": deck["sections"],
+            "card_ids": deck_card_ids(deck),
+            "cards": cards,
+            "unknown_card_ids": [card_id for card_id in quantities if card_id not in card_types]
+        })
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Sort orders of GET /decks; _id breaks ties so cursors are stable
+DECK_SORT_FIELDS = ("updated_at", "name")
+DECK_PAGE_LIMIT = 50
+DECK_PAGE_MAX = 200
+
+def deck_cursor_key(deck, sort_by):
+    value = deck.get(sort_by)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    return (value, str(deck["_id"]))
+
+def deck_after_cursor(sort_by, direction, key):
+    """Filter for the decks after a cursor key in the (sort_by, _id) order.
+    
+    Mongo sorts missing/null values before every other value, so they come
+    first in ascending order and last in descending order.
+    """
+    value, deck_id = key
+    op = "$gt" if direction == 1 else "$lt"
+    if value is None:
+        same = {sort_by: None, "_id": {op: ObjectId(deck_id)}}
+        return {"$or": [same, {sort_by: {"$ne": None}}]} if direction == 1 else same
+    if sort_by == "updated_at":
+        value = datetime.fromisoformat(value)
+    after = [
+        {sort_by: {op: value}},
+        {sort_by: value, "_id": {op: ObjectId(deck_id)}}
+    ]
+    if direction == -1:
+        after.append({sort_by: None})
+    return {"$or": after}
+
 @app.get("/decks")
-async def get_decks():
-    """Get all decks"""
+async def get_decks(
+    request: Request,
+    sort_by: str = "updated_at",
+    sort_order: Optional[str] = None,
+    color: Optional[str] = None,
+    legend: Optional[str] = None,
+    name_prefix: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    fields: Optional[str] = "summary",
+    stream: bool = False
+):
+    """Get decks, a page at a time.
+    
+    Sorted by updated_at (newest first) or name, optionally filtered by deck
+    color, legend card_id and name prefix. Pages hold deck summaries (no card
+    list) unless other `fields` are requested; pass `next_cursor` back as
+    `cursor` for the next page. With ?stream=1 or Accept: application/x-ndjson
+    every matching deck is streamed as NDJSON instead.
+    """
+    if sort_by not in DECK_SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"sort_by must be one of: {', '.join(DECK_SORT_FIELDS)}")
+    if sort_order is None:
+        sort_order = "desc" if sort_by == "updated_at" else "asc"
+    if sort_order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="sort_order must be asc or desc")
+    direction = 1 if sort_order == "asc" else -1
+    order = f"{sort_by}:{sort_order}"
+    deck_fields = parse_fields_param(fields, DECK_FIELD_PRESETS)
+    
+    filter_query = {}
+    if color:
+        filter_query["deck_colors"] = color
+    if legend:
+        filter_query["legend_id"] = legend
+    if name_prefix:
+        # An anchored, case-sensitive regex can use the name index
+        filter_query["name"] = {"$regex": "^" + re.escape(name_prefix)}
+    if cursor:
+        try:
+            key = decode_cursor(cursor, order)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        try:
+            filter_query.update(deck_after_cursor(sort_by, direction, key))
+        except Exception:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    # The sort key is needed for the next cursor even if it was not requested
+    projection = stored_projection(deck_fields)
+    if projection is not None:
+        projection = {**projection, sort_by: 1}
+    sort = [(sort_by, direction), ("_id", direction)]
+    
     try:
-        decks = await decks_collection.find().to_list(1000)
-        # Convert MongoDB documents to JSON-serializable format
-        serializable_decks = [convert_mongo_document(deck) for deck in decks]
-        return {"decks": serializable_decks}
+        if wants_ndjson(request.headers.get("accept"), stream):
+            stream_cursor = decks_collection.find(filter_query, projection).sort(sort)
+            if limit:
+                stream_cursor = stream_cursor.limit(limit)
+            return ndjson_response(ndjson_from_cursor(
+                stream_cursor,
+                transform=lambda deck: present_deck(deck, deck_fields)
+            ))
+        
+        limit = max(1, min(limit or DECK_PAGE_LIMIT, DECK_PAGE_MAX))
+        # One extra deck tells whether there is a next page
+        decks = await decks_collection.find(filter_query, projection).sort(sort).limit(limit + 1).to_list(limit + 1)
+        next_cursor = None
+        if len(decks) > limit:
+            decks = decks[:limit]
+            next_cursor = encode_cursor(order, deck_cursor_key(decks[-1], sort_by))
+        
+        # ObjectId/datetime fields are encoded directly by the response class
+        return MongoJSONResponse({
+            "decks": [present_deck(deck, deck_fields) for deck in decks],
+            "count": len(decks),
+            "next_cursor": next_cursor
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/decks/{deck_id}")
-async def get_deck(deck_id: str):
-    """Get a specific deck with full card details"""
+async def get_deck(
+    deck_id: str,
+    fields: Optional[str] = None,
+    card_fields: Optional[str] = None,
+    collapsed: bool = False
+):
+    """Get a specific deck with full card details.
+    
+    `fields` selects deck fields (include "cards" to keep the card details) and
+    `card_fields` selects the fields of each card, e.g. card_fields=thumb.
+    With `collapsed=true`, cards are listed once each as {card, quantity}
+    instead of once per copy.
+    """
+    deck_fields = parse_fields_param(fields, DECK_FIELD_PRESETS)
+    card_projection = mongo_projection(parse_fields_param(card_fields, CARD_FIELD_PRESETS))
     try:
-        from bson import ObjectId
-        deck = await decks_collection.find_one({"_id": ObjectId(deck_id)})
+        include_cards = deck_fields is None or "cards" in deck_fields
+        
+        # The card list is read to look up the cards even if it was not requested
+        deck = await decks_collection.find_one({"_id": ObjectId(deck_id)}, stored_projection(deck_fields))
         if not deck:
             raise HTTPException(status_code=404, detail="Deck not found")
         
-        # Get full card details for each card in the deck
-        deck_cards = []
-        for card_id in deck["card_ids"]:
-            card = await cards_collection.find_one({"card_id": card_id})
-            if card:
-                deck_cards.append(convert_mongo_document(card))
-        
-        # Convert the deck document to JSON-serializable format
-        serializable_deck = convert_mongo_document(deck)
-        serializable_deck["cards"] = deck_cards
-        return {"deck": serializable_deck}
+        card_ids = deck_card_ids(deck)
+        deck = present_deck(deck, deck_fields)
+        if include_cards:
+            deck["cards"] = await hydrate_deck_cards(card_ids, card_projection, collapsed)
+        return MongoJSONResponse({"deck": deck})
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.put("/decks/{deck_id}/add-card")
-async def add_card_to_deck(deck_id: str, card_id: str):
-    """Add a card to a deck"""
+@app.get("/decks/{deck_id}/simulate")
+async def simulate_deck_draws(
+    deck_id: str,
+    cards: Optional[str] = None,
+    at_least: int = 1,
+    turns: int = 5,
+    opening_hand: int = OPENING_HAND,
+    draws_per_turn: int = DRAWS_PER_TURN,
+    shuffles: int = 100_000,
+    seed: Optional[int] = None
+):
+    """Probability of drawing at least `at_least` copies of each card by each turn.
+    
+    `cards` is a comma-separated list of main-deck card IDs (every main-deck card
+    by default). Exact hypergeometric probabilities come with a Monte Carlo
+    estimate over `shuffles` shuffles, which also gives the chance of seeing
+    all the cards together.
+    """
+    if not 1 <= turns <= 20:
+        raise HTTPException(status_code=400, detail="turns must be between 1 and 20")
+    if not 0 <= shuffles <= MAX_SHUFFLES:
+        raise HTTPException(status_code=400, detail=f"shuffles must be between 0 and {MAX_SHUFFLES}")
+    if at_least < 1 or opening_hand < 0 or draws_per_turn < 0:
+        raise HTTPException(status_code=400, detail="at_least must be positive, opening_hand and draws_per_turn not negative")
     try:
-        from bson import ObjectId
-        
-        # Check if deck exists
-        deck = await decks_collection.find_one({"_id": ObjectId(deck_id)})
+        deck = await decks_collection.find_one({"_id": ObjectId(deck_id)}, stored_projection(("card_ids",)))
         if not deck:
             raise HTTPException(status_code=404, detail="Deck not found")
         
+        # Only the main deck is drawn from
+        quantities = deck_quantities(deck)
+        sections, _ = build_sections(quantities, await resolve_card_types(list(quantities)))
+        main_deck = sections["main"]
+        targets = [card_id.strip() for card_id in cards.split(",") if card_id.strip()] if cards else list(main_deck)
+        missing = [card_id for card_id in targets if card_id not in main_deck]
+        if missing:
+            raise HTTPException(status_code=400, detail=f"Not in the main deck: {', '.join(missing)}")
+        
+        # The simulation is CPU-bound, so it runs off the event loop
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, partial(
+            draw_probabilities, main_deck, list(dict.fromkeys(targets)), turns,
+            at_least, opening_hand, draws_per_turn, shuffles, seed
+        ))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/decks/{deck_id}/similar")
+async def get_similar_decks(
+    deck_id: str,
+    limit: int = 10,
+    min_similarity: float = 0.3,
+    fields: Optional[str] = "summary"
+):
+    """Stored decks most similar to a deck (weighted Jaccard over card copies).
+    
+    Candidates come from the decks sharing an LSH band with this one, through
+    the lsh_bands index, so the cost does not grow with the number of decks.
+    """
+    deck_fields = parse_fields_param(fields, DECK_FIELD_PRESETS)
+    try:
+        deck = await decks_collection.find_one({"_id": ObjectId(deck_id)}, {"sections": 1, "card_ids": 1, "lsh_bands": 1})
+        if not deck:
+            raise HTTPException(status_code=404, detail="Deck not found")
+        quantities = deck_quantities(deck)
+        # Decks saved before signatures existed are signed on the fly
+        bands = deck.get("lsh_bands")
+        if bands is None:
+            bands = deck_bands(quantities)
+        
+        # Candidates sharing the most bands first
+        candidates = await decks_collection.aggregate([
+            {"$match": {"lsh_bands": {"$in": bands}, "_id": {"$ne": deck["_id"]}}},
+            {"$project": {"lsh_bands": 1}},
+            {"$unwind": "$lsh_bands"},
+            {"$match": {"lsh_bands": {"$in": bands}}},
+            {"$group": {"_id": "$_id", "shared_bands": {"$sum": 1}}},
+            {"$sort": {"shared_bands": -1}},
+            {"$limit": MAX_CANDIDATES}
+        ]).to_list(None)
+        shared_bands = {candidate["_id"]: candidate["shared_bands"] for candidate in candidates}
+        
+        projection = stored_projection(deck_fields)
+        if projection is not None:
+            projection.update({"sections": 1, "card_ids": 1})
+        similar = []
+        async for candidate in decks_collection.find({"_id": {"$in": list(shared_bands)}}, projection):
+            similarity = deck_similarity(quantities, deck_quantities(candidate))
+            if similarity >= min_similarity:
+                similar.append((similarity, shared_bands[candidate["_id"]], candidate))
+        similar.sort(key=lambda entry: (-entry[0], str(entry[2]["_id"])))
+        
+        return MongoJSONResponse({
+            "deck_id": deck_id,
+            "candidates": len(candidates),
+            "similar": [
+                {"similarity": round(similarity, 4), "shared_bands": bands_shared, "deck": present_deck(candidate, deck_fields)}
+                for similarity, bands_shared, candidate in similar[:min(max(limit, 1), 100)]
+            ]
+        })
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.put("/decks/{deck_id}/add-card")
+async def add_card_to_deck(deck_id: str, card_id: str):
+    """Add a card to a deck"""
+    try:
         # Check if card exists
-        card = await cards_collection.find_one({"card_id": card_id})
-        if not card:
+        card_type = (await resolve_card_types([card_id])).get(card_id)
+        if card_type is None:
             raise HTTPException(status_code=404, detail="Card not found")
         
-        # Check deck size limit
-        if len(deck["card_ids"]) >= 40:
-            raise HTTPException(status_code=400, detail="Deck is full (40 cards)")
-        
-        # Check if adding this card would exceed 3 copies
-        current_count = deck["card_ids"].count(card_id)
-        if current_count >= 3:
-            raise HTTPException(status_code=400, detail=f"Cannot have more than 3 copies of {card_id}")
-        
-        # Check Legend rule - only 1 Legend, Signature Unit, or Signature Spell allowed per deck
-        if card.get("card_type") in ["Legend", "Signature Unit", "Signature Spell"]:
-            existing_special_count = 0
-            for existing_card_id in deck["card_ids"]:
-                existing_card = await cards_collection.find_one({"card_id": existing_card_id})
-                if existing_card and existing_card.get("card_type") in ["Legend", "Signature Unit", "Signature Spell"]:
-                    existing_special_count += 1
-                    if existing_special_count >= 1:
-                        raise HTTPException(status_code=400, detail="You can only have 1 Legend, Signature Unit, or Signature Spell card in your deck")
-        
-        # Add card to deck
-        await decks_collection.update_one(
-            {"_id": ObjectId(deck_id)},
-            {
-                "$push": {"card_ids": card_id},
-                "$set": {"updated_at": datetime.now()}
-            }
-        )
-        return {"message": "Card added to deck"}
+        # The deck limits are part of the filter, so the check and the $inc are
+        # a single atomic update even under concurrent edits
+        for attempt in range(2):
+            async with card_usage_gate.writing():
+                updated = await decks_collection.find_one_and_update(
+                    {"_id": ObjectId(deck_id), "sections": {"$exists": True}, **add_card_filter(card_id, card_type)},
+                    {
+                        "$inc": counter_increments(card_id, card_type, 1),
+                        "$set": {"updated_at": datetime.now(), **legend_fields(card_id, card_type)}
+                    },
+                    projection={"sections": 1, USAGE_COUNTED: 1},
+                    return_document=ReturnDocument.AFTER
+                )
+                if updated:
+                    after = deck_quantities(updated)
+                    await record_deck_usage(updated, {**after, card_id: after.get(card_id, 0) - 1}, after)
+            if updated:
+                await refresh_deck_stats(updated)
+                update_deck_matrix(deck_id, after)
+                return {"message": "Card added to deck"}
+            
+            # Work out why nothing matched
+            deck = await decks_collection.find_one(
+                {"_id": ObjectId(deck_id)},
+                {f"sections.main.{card_id}": 1, "section_counts": 1, "special_count": 1, "format": 1}
+            )
+            if not deck:
+                raise HTTPException(status_code=404, detail="Deck not found")
+            if "format" in deck:
+                violation = add_card_violation(deck, card_id, card_type)
+                if violation:
+                    raise HTTPException(status_code=400, detail=violation)
+                # The deck changed between the update and the read; try again
+            else:
+                await migrate_deck(deck_id)
+        raise HTTPException(status_code=409, detail="Deck was modified concurrently, please retry")
     except HTTPException:
         raise
     except Exception as e:
@@ -982,22 +1515,44 @@ async def add_card_to_deck(deck_id: str, card_id: str):
 
 @app.put("/decks/{deck_id}/remove-card")
 async def remove_card_from_deck(deck_id: str, card_id: str):
-    """Remove a card from a deck"""
+    """Remove one copy of a card from a deck"""
     try:
-        from bson import ObjectId
-        
-        result = await decks_collection.update_one(
-            {"_id": ObjectId(deck_id)},
-            {
-                "$pull": {"card_ids": card_id},
-                "$set": {"updated_at": datetime.now()}
-            }
-        )
-        
-        if result.modified_count > 0:
-            return {"message": "Card removed from deck"}
-        else:
-            return {"message": "Card not found in deck"}
+        # Cards no longer in the catalog are kept in the main deck
+        card_type = (await resolve_card_types([card_id])).get(card_id)
+        entry = f"sections.{section_of(card_type)}.{card_id}"
+        
+        for attempt in range(2):
+            async with card_usage_gate.writing():
+                updated = await decks_collection.find_one_and_update(
+                    {"_id": ObjectId(deck_id), entry: {"$gte": 1}},
+                    {
+                        "$inc": counter_increments(card_id, card_type, -1),
+                        "$set": {"updated_at": datetime.now()}
+                    },
+                    projection={"sections": 1, USAGE_COUNTED: 1},
+                    return_document=ReturnDocument.AFTER
+                )
+                if updated:
+                    after = deck_quantities(updated)
+                    await record_deck_usage(updated, {**after, card_id: after.get(card_id, 0) + 1}, after)
+            if updated:
+                # Drop the card from its section once the last copy is gone
+                unset = await decks_collection.find_one_and_update(
+                    {"_id": ObjectId(deck_id), entry: {"$lte": 0}},
+                    {"$unset": {entry: "", **{field: "" for field in legend_fields(card_id, card_type)}}},
+                    projection={"sections": 1},
+                    return_document=ReturnDocument.AFTER
+                )
+                await refresh_deck_stats(unset or updated)
+                update_deck_matrix(deck_id, after)
+                return {"message": "Card removed from deck"}
+            
+            # Decks still in the old format are converted once, then retried
+            deck = await decks_collection.find_one({"_id": ObjectId(deck_id)}, {"format": 1})
+            if not deck or "format" in deck:
+                break
+            await migrate_deck(deck_id)
+        return {"message": "Card not found in deck"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1005,14 +1560,30 @@ async def remove_card_from_deck(deck_id: str, card_id: str):
 async def delete_deck(deck_id: str):
     """Delete a deck"""
     try:
-        from bson import ObjectId
-        
-        result = await decks_collection.delete_one({"_id": ObjectId(deck_id)})
-        if result.deleted_count > 0:
+        async with card_usage_gate.writing():
+            deleted = await decks_collection.find_one_and_delete(
+                {"_id": ObjectId(deck_id)},
+                projection=stored_projection(("card_ids", USAGE_COUNTED))
+            )
+            # Decks that were never counted have nothing to subtract
+            if deleted and deleted.get(USAGE_COUNTED):
+                await record_card_usage(deck_quantities(deleted), {})
+        if deleted:
+            update_deck_matrix(deck_id, {})
             return {"message": "Deck deleted successfully"}
         else:
             raise HTTPException(status_code=404, detail="Deck not found")
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Mount the cards directory to serve images (only if the directory exists).
+# This has to stay below every /cards/... API route: a mount matches the whole
+# /cards/ prefix, so registering it first would shadow those routes.
+if os.path.exists(cards_path):
+    app.mount("/cards", StaticFiles(directory=cards_path), name="cards")
+    print("Successfully mounted cards directory")
+else:
+    print(f"WARNING: Cards directory not found at {cards_path}")
+    print("Card images will not be served until the directory is created")
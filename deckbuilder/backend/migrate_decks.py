@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Script to convert stored decks from the old card_ids list (one entry per copy)
+to the compact format: quantities per card, split into main deck, battlefields,
+legend and runes sections (see deck_format.py).
+
+Decks are converted in batches, and their statistics recomputed on the way:
+the cards of each batch are read with a single $in query and the batch is
+written with one unordered bulk_write. Decks edited while the script runs are left alone and converted on their
+next write. Running the script again is safe.
+
+Compact decks saved before LSH signatures existed (see deck_similarity.py)
+are signed as well; --signatures re-signs every deck, which is needed after
+changing the signature parameters.
+
+Usage:
+    python migrate_decks.py [--batch-size 500] [--dry-run] [--signatures]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+# Add the backend directory to the path so we can import the backend modules
+sys.path.append(os.path.dirname(__file__))
+
+from deck_format import deck_quantities, migration_update
+from deck_similarity import similarity_fields
+
+
+async def migrate_batch(decks_collection, cards_collection, decks, dry_run):
+    """Convert one batch of old-format decks; returns the number of decks converted"""
+    card_ids = list({card_id for deck in decks for card_id in deck.get("card_ids", [])})
+    cards = await cards_collection.find(
+        {"card_id": {"$in": card_ids}},
+        {"card_id": 1, "card_type": 1, "cost": 1, "color": 1}
+    ).to_list(None)
+    cards = {card["card_id"]: card for card in cards}
+
+    requests = [UpdateOne(*migration_update(deck, cards)) for deck in decks]
+    if dry_run:
+        return len(requests)
+    result = await decks_collection.bulk_write(requests, ordered=False)
+    return result.modified_count
+
+
+async def sign_batch(decks_collection, decks, dry_run):
+    """Store the LSH bands of one batch of compact decks; returns the number of decks signed"""
+    requests = [
+        UpdateOne({"_id": deck["_id"], "sections": deck["sections"]}, {"$set": similarity_fields(deck_quantities(deck))})
+        for deck in decks
+    ]
+    if dry_run:
+        return len(requests)
+    result = await decks_collection.bulk_write(requests, ordered=False)
+    return result.matched_count
+
+
+async def sign_decks(decks_collection, batch_size, dry_run, all_decks):
+    """Sign the compact decks without LSH bands (or all of them)"""
+    query = {"sections": {"$exists": True}}
+    if not all_decks:
+        query["lsh_bands"] = {"$exists": False}
+
+    signed = 0
+    scanned = 0
+    batch = []
+    async for deck in decks_collection.find(query, {"sections": 1}).batch_size(batch_size):
+        batch.append(deck)
+        if len(batch) >= batch_size:
+            scanned += len(batch)
+            signed += await sign_batch(decks_collection, batch, dry_run)
+            batch = []
+    if batch:
+        scanned += len(batch)
+        signed += await sign_batch(decks_collection, batch, dry_run)
+
+    action = "Would sign" if dry_run else "Signed"
+    print(f"✅ {action} {signed} of {scanned} decks for similarity search")
+
+
+async def migrate_decks(batch_size=500, dry_run=False, all_signatures=False):
+    """Convert every deck still stored in the old format, then sign the unsigned ones"""
+    client = AsyncIOMotorClient("mongodb://localhost:27017")
+    db = client.deckbuilder
+    decks_collection = db.decks
+    cards_collection = db.cards
+
+    print("🔄 Converting decks to the compact format...")
+    converted = 0
+    scanned = 0
+    batch = []
+    cursor = decks_collection.find({"sections": {"$exists": False}}, {"card_ids": 1})
+    async for deck in cursor.batch_size(batch_size):
+        batch.append(deck)
+        if len(batch) >= batch_size:
+            scanned += len(batch)
+            converted += await migrate_batch(decks_collection, cards_collection, batch, dry_run)
+            batch = []
+    if batch:
+        scanned += len(batch)
+        converted += await migrate_batch(decks_collection, cards_collection, batch, dry_run)
+
+    action = "Would convert" if dry_run else "Converted"
+    print(f"✅ {action} {converted} of {scanned} old-format decks")
+
+    await sign_decks(decks_collection, batch_size, dry_run, all_signatures)
+    client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=500, help="decks converted per bulk write")
+    parser.add_argument("--dry-run", action="store_true", help="count the decks to convert without writing")
+    parser.add_argument("--signatures", action="store_true", help="re-sign every deck, not only unsigned ones")
+    args = parser.parse_args()
+    asyncio.run(migrate_decks(args.batch_size, args.dry_run, args.signatures))
+
+
+if __name__ == "__main__":
+    main()
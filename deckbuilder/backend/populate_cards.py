@@ -2,18 +2,44 @@
 """
 Script to populate the MongoDB database with card data from the Riftbound_Cards directory.
 This script creates card sets and populates the database with all card information.
+
+Only images that are new or changed since the last run (see card_scanner.py)
+are written, together with the cards of an optional metadata file (JSON or
+CSV, see card_metadata.py), so real card details load in the same pass as
+the images. Cards are written in batches of unordered upserts, several
+batches at a time, with timing and throughput printed per batch. Completed
+batches are recorded in a checkpoint file so that --resume can skip them after
+a failure, and --dry-run prints what would change without writing anything.
+
+Usage:
+    python populate_cards.py [--metadata cards.csv] [--batch-size 500] [--concurrency 4]
+                             [--dry-run] [--resume] [--full] [--checkpoint FILE]
 """
 
+import argparse
 import asyncio
+import hashlib
+import json
 import os
 import sys
-import re
+import time
 from motor.motor_asyncio import AsyncIOMotorClient
+from pydantic import ValidationError
+from pymongo import UpdateOne
 from datetime import datetime
 
-# Add the backend directory to the path so we can import from main.py
+# Add the backend directory to the path so we can import the backend modules
 sys.path.append(os.path.dirname(__file__))
 
+from card_metadata import load_metadata
+from card_model import validated_fields, validation_message
+from card_scanner import card_upserts, diff_manifest, manifest_operations, new_card_document, read_manifest, scan_directory, write_cards
+
+DEFAULT_CHECKPOINT = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".populate_checkpoint.json")
+
+# Changes listed one by one by --dry-run before only counting them
+DRY_RUN_DETAILS = 50
+
 # Set information
 SETS_INFO = {
     "Origins_MainSet": {
@@ -68,22 +94,20 @@ RARITY_MAPPING = {
     "Overnumbered": "Overnumbered"
 }
 
-async def create_sets():
-    """Create card sets in the database"""
-    client = AsyncIOMotorClient("mongodb://localhost:27017")
-    db = client.deckbuilder
-    sets_collection = db.sets
-    
+async def create_sets(db, dry_run=False):
+    """Create the card sets that do not exist yet, with one bulk upsert"""
     print("Creating card sets...")
-    
-    for set_name, set_info in SETS_INFO.items():
-        # Check if set already exists
-        existing = await sets_collection.find_one({"set_code": set_info["set_code"]})
-        if existing:
+    existing = {
+        set_doc["set_code"]
+        for set_doc in await db.sets.find({"set_code": {"$in": [info["set_code"] for info in SETS_INFO.values()]}}).to_list(None)
+    }
+    now = datetime.now()
+    requests = []
+    for set_info in SETS_INFO.values():
+        if set_info["set_code"] in existing:
             print(f"⚠️  Set {set_info['set_code']} already exists")
             continue
-            
-        # Create the set
+        print(f"✅ {'Would create' if dry_run else 'Creating'} set {set_info['set_code']}: {set_info['set_name']}")
         set_doc = {
             "set_code": set_info["set_code"],
             "set_name": set_info["set_name"],
@@ -92,16 +116,124 @@ async def create_sets():
             "card_count": set_info["card_count"],
             "is_active": True,
             "description": set_info["description"],
-            "created_at": datetime.now(),
-            "updated_at": datetime.now()
+            "created_at": now,
+            "updated_at": now
         }
-        
-        result = await sets_collection.insert_one(set_doc)
-        print(f"✅ Created set {set_info['set_code']}: {set_info['set_name']}")
+        requests.append(UpdateOne({"set_code": set_info["set_code"]}, {"$setOnInsert": set_doc}, upsert=True))
+    if requests and not dry_run:
+        await db.sets.bulk_write(requests, ordered=False)
+
+def input_fingerprint(metadata_path, full):
+    """Identifies the input of a run, so a checkpoint is only resumed with the same input"""
+    digest = hashlib.sha1(f"full={full}".encode())
+    if metadata_path:
+        with open(metadata_path, "rb") as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+def load_checkpoint(path, fingerprint):
+    """card_ids already written by an interrupted run with the same input"""
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as file:
+        checkpoint = json.load(file)
+    if checkpoint.get("fingerprint") != fingerprint:
+        print("⚠️  Checkpoint was written for a different input, starting over")
+        return set()
+    return set(checkpoint.get("done", []))
+
+def save_checkpoint(path, fingerprint, done):
+    """Write the checkpoint atomically, so an interrupted write never leaves it corrupt"""
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as file:
+        json.dump({"fingerprint": fingerprint, "done": sorted(done)}, file)
+    os.replace(temporary, path)
+
+def describe_value(value):
+    text = json.dumps(value, default=str)
+    return text if len(text) <= 40 else text[:37] + "..."
+
+async def validate_metadata(cards_collection, metadata, entries_by_card, release_dates, batch_size):
+    """Check each card's metadata against CardModel, merged into the stored card (or a new image's placeholder).
     
-    client.close()
+    Returns the valid metadata, as plain values, and the invalid cards with
+    their errors. Metadata for unknown cards is kept: it only updates an
+    existing card, so it is never written.
+    """
+    valid = {}
+    invalid = []
+    now = datetime.now()
+    card_ids = sorted(metadata)
+    for start in range(0, len(card_ids), batch_size):
+        batch_ids = card_ids[start:start + batch_size]
+        existing = {
+            card["card_id"]: card
+            for card in await cards_collection.find({"card_id": {"$in": batch_ids}}).to_list(None)
+        }
+        for card_id in batch_ids:
+            card = existing.get(card_id)
+            if card is None and card_id in entries_by_card:
+                entry = entries_by_card[card_id][-1]
+                card = {**new_card_document(entry, release_dates.get(entry["set_folder"]), now), "image_path": entry["filename"]}
+            if card is None:
+                valid[card_id] = metadata[card_id]
+                continue
+            try:
+                valid[card_id] = validated_fields(card, metadata[card_id])
+            except ValidationError as e:
+                invalid.append({"card_id": card_id, "error": validation_message(e)})
+    return valid, invalid
 
-async def populate_cards():
+async def dry_run_diff(cards_collection, card_ids, changed, metadata, batch_size):
+    """Print the cards a run would add or change, reading the current cards in batches"""
+    images = {entry["card_id"]: entry["filename"] for entry in changed}
+    added = changed_count = unchanged = unknown = 0
+    shown = 0
+    for start in range(0, len(card_ids), batch_size):
+        batch_ids = card_ids[start:start + batch_size]
+        existing = {
+            card["card_id"]: card
+            for card in await cards_collection.find({"card_id": {"$in": batch_ids}}).to_list(None)
+        }
+        for card_id in batch_ids:
+            fields = dict(metadata.get(card_id, {}))
+            if card_id in images:
+                fields["image_path"] = images[card_id]
+            card = existing.get(card_id)
+            if card is None:
+                if card_id in images:
+                    added += 1
+                    line = f"➕ {card_id} (new card)"
+                else:
+                    unknown += 1
+                    line = f"❓ {card_id}: metadata for a card that is not in the database"
+            else:
+                differences = [
+                    f"{field} {describe_value(card.get(field))} → {describe_value(value)}"
+                    for field, value in fields.items()
+                    if card.get(field) != value
+                ]
+                if not differences:
+                    unchanged += 1
+                    continue
+                changed_count += 1
+                line = f"✏️  {card_id}: " + ", ".join(differences)
+            if shown < DRY_RUN_DETAILS:
+                print(line)
+            shown += 1
+    if shown > DRY_RUN_DETAILS:
+        print(f"... and {shown - DRY_RUN_DETAILS} more")
+    return {"added": added, "changed": changed_count, "unchanged": unchanged, "unknown": unknown}
+
+async def populate_cards(
+    metadata_path=None,
+    batch_size=500,
+    concurrency=4,
+    dry_run=False,
+    resume=False,
+    full=False,
+    checkpoint_path=DEFAULT_CHECKPOINT
+):
     """Populate the database with card data from the Riftbound_Cards directory"""
     # Connect to MongoDB
     client = AsyncIOMotorClient("mongodb://localhost:27017")
@@ -117,113 +249,151 @@ async def populate_cards():
         print(f"❌ Cards directory not found: {cards_path}")
         return
     
-    added_count = 0
-    updated_count = 0
-    errors = []
+    await create_sets(db, dry_run)
+    
+    # Walk the set folders off the event loop and keep only what changed since the last run
+    start = time.perf_counter()
+    entries, skipped = await asyncio.get_running_loop().run_in_executor(None, scan_directory, cards_path)
+    manifest = {} if full else await read_manifest(db.card_manifest)
+    changed, removed = diff_manifest(entries, manifest)
+    print(f"📁 Scanned {len(entries)} images in {time.perf_counter() - start:.2f}s: "
+          f"{len(changed)} new or changed, {len(entries) - len(changed)} unchanged")
+    for path in skipped:
+        print(f"⚠️  Skipped {path} - doesn't match expected format")
     
-    for set_folder in os.listdir(cards_path):
-        set_path = os.path.join(cards_path, set_folder)
-        if os.path.isdir(set_path) and not set_folder.startswith('.'):
-            print(f"\n📁 Processing set: {set_folder}")
+    entries_by_card = {}
+    for entry in changed:
+        entries_by_card.setdefault(entry["card_id"], []).append(entry)
+    release_dates = {set_folder: set_info["release_date"] for set_folder, set_info in SETS_INFO.items()}
+    
+    # Invalid rows are reported and left out; the rest of the file is loaded
+    metadata = {}
+    invalid_rows = []
+    if metadata_path:
+        metadata, metadata_errors = load_metadata(metadata_path)
+        metadata, invalid_cards = await validate_metadata(cards_collection, metadata, entries_by_card, release_dates, batch_size)
+        print(f"📄 Read details of {len(metadata)} cards from {metadata_path}")
+        invalid_rows = [
+            f"record {error['record']}: {error['error']}" for error in metadata_errors
+        ] + [f"{error['card_id']}: {error['error']}" for error in invalid_cards]
+        for row in invalid_rows:
+            print(f"❌ {metadata_path} {row}")
+    
+    card_ids, operations = card_upserts(changed, release_dates, datetime.now(), metadata)
+    
+    if dry_run:
+        print("\n🔍 Dry run: nothing will be written\n")
+        diff = await dry_run_diff(cards_collection, card_ids, changed, metadata, batch_size)
+        print("\n" + "="*60)
+        print("DRY RUN SUMMARY")
+        print("="*60)
+        print(f"➕ Would add: {diff['added']} cards")
+        print(f"✏️  Would change: {diff['changed']} cards")
+        print(f"⏭️  Already up to date: {diff['unchanged']} cards")
+        print(f"❓ Metadata for unknown cards: {diff['unknown']}")
+        print(f"❌ Invalid metadata rows (would be skipped): {len(invalid_rows)}")
+        client.close()
+        return
+    
+    fingerprint = input_fingerprint(metadata_path, full)
+    done = load_checkpoint(checkpoint_path, fingerprint) if resume else set()
+    if done:
+        print(f"⏩ Resuming: {len(done)} cards were written by the interrupted run")
+    pending = [(card_id, operation) for card_id, operation in zip(card_ids, operations) if card_id not in done]
+    
+    # Metadata of a card with no image on disk only updates an existing card
+    metadata_only = [card_id for card_id, _ in pending if card_id not in entries_by_card]
+    unknown = len(metadata_only) - await cards_collection.count_documents({"card_id": {"$in": metadata_only}}) if metadata_only else 0
+    
+    batches = [pending[start:start + batch_size] for start in range(0, len(pending), batch_size)]
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+    totals = {"added": 0, "updated": 0, "errors": []}
+    
+    async def write_batch(number, batch):
+        async with semaphore:
+            batch_start = time.perf_counter()
+            batch_ids = [card_id for card_id, _ in batch]
+            result = await write_cards(cards_collection, batch_ids, [operation for _, operation in batch])
+            failed_ids = {error["card_id"] for error in result["errors"]}
+            written_ids = [card_id for card_id in batch_ids if card_id not in failed_ids]
             
-            for filename in os.listdir(set_path):
-                if filename.lower().endswith(('.png', '.jpg', '.jpeg')):
-                    try:
-                        # Extract card ID from filename (e.g., "OGN_001.png" -> "OGN_001")
-                        card_id = os.path.splitext(filename)[0]
-                        
-                        # Extract set code from card ID
-                        set_code_match = re.match(r'^([A-Z]{2,3})_(\d{3})([aS]?)$', card_id)
-                        if not set_code_match:
-                            print(f"⚠️  Skipping {filename} - doesn't match expected format")
-                            continue
-                            
-                        set_code = set_code_match.group(1)
-                        collector_number = set_code_match.group(2)
-                        variant = set_code_match.group(3)  # 'a' for alt art, 'S' for signature, '' for regular
-                        
-                        # Determine variant type
-                        if variant == 'a':
-                            variant_type = "alt_art"
-                        elif variant == 'S':
-                            variant_type = "signature"
-                        else:
-                            variant_type = "regular"
-                        
-                        # Check if card already exists
-                        existing = await cards_collection.find_one({"card_id": card_id})
-                        if not existing:
-                            # Create basic card entry
-                            card_doc = {
-                                "name": f"Card {card_id}",
-                                "image_path": filename,
-                                "card_id": card_id,
-                                "set_name": set_folder,
-                                "set_code": set_code,
-                                "set_release_date": SETS_INFO.get(set_folder, {}).get("release_date", "2024-01-01"),
-                                "card_type": "Spell",  # Default, should be updated manually
-                                "subtype": [],
-                                "color": ["Colorless"],  # Default, should be updated manually
-                                "cost": 0,  # Default, should be updated manually
-                                "rarity": "Common",  # Default, should be updated manually
-                                "might": 0,
-                                "description": "",
-                                "flavor_text": "",
-                                "artist": "",
-                                "collector_number": collector_number,
-                                "variant": variant_type,
-                                "keywords": [],
-                                "created_at": datetime.now(),
-                                "updated_at": datetime.now()
-                            }
-                            
-                            await cards_collection.insert_one(card_doc)
-                            print(f"✅ Added {card_id}: {filename}")
-                            added_count += 1
-                        else:
-                            # Update existing card with new image path if needed
-                            if existing.get("image_path") != filename:
-                                await cards_collection.update_one(
-                                    {"_id": existing["_id"]},
-                                    {"$set": {"image_path": filename, "updated_at": datetime.now()}}
-                                )
-                                print(f"🔄 Updated {card_id}: {filename}")
-                                updated_count += 1
-                            else:
-                                print(f"⏭️  Skipped {card_id}: already exists")
-                                
-                    except Exception as e:
-                        print(f"❌ Error processing {filename}: {str(e)}")
-                        errors.append({"filename": filename, "error": str(e)})
+            # Failed cards stay out of the manifest and the checkpoint, so the next run retries them
+            scanned = [entry for card_id in written_ids for entry in entries_by_card.get(card_id, [])]
+            if scanned:
+                await db.card_manifest.bulk_write(manifest_operations(scanned), ordered=False)
+            done.update(written_ids)
+            save_checkpoint(checkpoint_path, fingerprint, done)
+            
+            elapsed = time.perf_counter() - batch_start
+            for key in ("added", "updated"):
+                totals[key] += result[key]
+            totals["errors"].extend(result["errors"])
+            print(f"📦 Batch {number}/{len(batches)}: {len(batch)} cards in {elapsed:.2f}s "
+                  f"({len(batch) / elapsed if elapsed > 0 else 0:,.0f} cards/s) - "
+                  f"{result['added']} added, {result['updated']} updated, {len(result['errors'])} errors")
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(write_batch(number, batch) for number, batch in enumerate(batches, start=1)))
+    elapsed = time.perf_counter() - start
+    if removed:
+        await db.card_manifest.bulk_write(manifest_operations([], removed), ordered=False)
+        for path in removed:
+            print(f"🗑️  {path} is no longer on disk (card kept)")
     
     # Print summary
     print("\n" + "="*60)
     print("POPULATION SUMMARY")
     print("="*60)
-    print(f"✅ Successfully added: {added_count} cards")
-    print(f"🔄 Updated: {updated_count} cards")
-    print(f"❌ Errors: {len(errors)} cards")
+    print(f"⏱️  Wrote {len(pending)} cards in {len(batches)} batches in {elapsed:.2f}s "
+          f"({len(pending) / elapsed if elapsed > 0 else 0:,.0f} cards/s)")
+    print(f"✅ Successfully added: {totals['added']} cards")
+    print(f"🔄 Updated: {totals['updated']} cards")
+    if unknown:
+        print(f"❓ Metadata for unknown cards (skipped): {unknown}")
+    if invalid_rows:
+        print(f"❌ Invalid metadata rows (skipped): {len(invalid_rows)}")
+    print(f"❌ Errors: {len(totals['errors'])} cards")
     
-    if errors:
+    if totals["errors"]:
         print("\nErrors:")
-        for error in errors:
-            print(f"  - {error['filename']}: {error['error']}")
+        for error in totals["errors"]:
+            print(f"  - {error['card_id']}: {error['error']}")
+        print(f"\nRun again with --resume to retry them (checkpoint: {checkpoint_path})")
+    elif os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
     
     # Close connection
     client.close()
     print("\nDatabase connection closed.")
+    print("Call POST /reload-catalog if the backend is running.")
 
-async def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--metadata", help="JSON or CSV file with card details to load in the same pass")
+    parser.add_argument("--batch-size", type=int, default=500, help="cards per bulk write")
+    parser.add_argument("--concurrency", type=int, default=4, help="bulk writes in flight at once")
+    parser.add_argument("--dry-run", action="store_true", help="print what would change without writing")
+    parser.add_argument("--resume", action="store_true", help="skip the cards written by an interrupted run")
+    parser.add_argument("--full", action="store_true", help="ignore the manifest and rewrite every image's card")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="checkpoint file used by --resume")
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """Main function to run the population process"""
+    args = parse_args(argv)
     print("🚀 Starting Riftbound Card Population Process")
     print("="*60)
     
     try:
-        # Create sets first
-        await create_sets()
-        
-        # Then populate cards
-        await populate_cards()
+        asyncio.run(populate_cards(
+            metadata_path=args.metadata,
+            batch_size=args.batch_size,
+            concurrency=args.concurrency,
+            dry_run=args.dry_run,
+            resume=args.resume,
+            full=args.full,
+            checkpoint_path=args.checkpoint
+        ))
         
         print("\n🎉 Population process completed successfully!")
         
@@ -232,4 +402,4 @@ async def main():
         sys.exit(1)
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    main()
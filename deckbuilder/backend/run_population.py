@@ -4,7 +4,6 @@ Script to run the card population process.
 This is a simple wrapper around populate_cards.py for easy execution.
 """
 
-import asyncio
 import sys
 import os
 
@@ -20,4 +19,4 @@ if __name__ == "__main__":
     print()
     
     # Run the population process
-    asyncio.run(main())
+    main()
@@ -0,0 +1,207 @@
+"""
+JSON encoding of MongoDB documents.
+
+convert_mongo_document walks and mutates a document so FastAPI's default
+JSONResponse can encode it, and FastAPI then walks the result again with
+jsonable_encoder. MongoJSONResponse skips both: it encodes BSON types
+(ObjectId, datetime) directly in a single pass, with orjson when it is
+installed and the stdlib json module otherwise.
+
+Listings can also be streamed as NDJSON (one document per line), encoding
+each batch of documents as soon as it comes off the Mongo cursor so memory
+stays flat however many documents there are.
+
+Callers can ask for a sparse fieldset (?fields=), either a comma-separated
+list of field names or a named preset, which is passed to MongoDB as a
+projection (or applied to in-memory documents) so unused fields are never
+read, decoded or serialized.
+"""
+
+import json
+import re
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from bson import ObjectId
+from fastapi.responses import Response, StreamingResponse
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Documents encoded per streamed chunk (and fetched per Mongo batch)
+STREAM_BATCH_SIZE = 100
+
+# Named ?fields= presets; None means the full document
+CARD_FIELD_PRESETS = {
+    "thumb": ("card_id", "name", "cost", "color", "image_path", "set_name"),
+    "full": None,
+}
+DECK_FIELD_PRESETS = {
+    "summary": ("name", "description", "deck_colors", "average_cost", "card_type_distribution",
+                "section_counts", "legend_id", "created_at", "updated_at"),
+    "full": None,
+}
+
+FIELD_NAME_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+# Helper function to convert MongoDB documents to JSON-serializable format
+def convert_mongo_document(doc):
+    """Convert MongoDB document to JSON-serializable format"""
+    if isinstance(doc, dict):
+        # Convert ObjectId to string
+        if "_id" in doc and isinstance(doc["_id"], ObjectId):
+            doc["_id"] = str(doc["_id"])
+
+        # Convert datetime objects to ISO strings
+        for key, value in doc.items():
+            if isinstance(value, datetime):
+                doc[key] = value.isoformat()
+            elif isinstance(value, dict):
+                doc[key] = convert_mongo_document(value)
+            elif isinstance(value, list):
+                doc[key] = [convert_mongo_document(item) if isinstance(item, dict) else item for item in value]
+
+        return doc
+    return doc
+
+
+def _default(value: Any):
+    """Encode the types neither encoder handles natively"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    # Other BSON types (Decimal128, Int64, ...) have a sensible str()
+    return str(value)
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def encode_json(content: Any) -> bytes:
+        """Encode content, including raw MongoDB documents, to JSON bytes"""
+        return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+else:
+    def encode_json(content: Any) -> bytes:
+        """Encode content, including raw MongoDB documents, to JSON bytes"""
+        return json.dumps(
+            content,
+            default=_default,
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":")
+        ).encode("utf-8")
+
+
+def encode_list_response(key: str, encoded_items: Iterable[bytes], extra: dict) -> bytes:
+    """Build {key: [...items], **extra} from items that are already encoded"""
+    body = b'{"' + key.encode() + b'":[' + b",".join(encoded_items) + b"]"
+    if extra:
+        body += b"," + encode_json(extra)[1:]
+    else:
+        body += b"}"
+    return body
+
+
+class MongoJSONResponse(Response):
+    """JSON response that encodes MongoDB documents without a conversion pass.
+
+    Content that is already bytes (e.g. from encode_list_response) is sent as is.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return encode_json(content)
+
+
+def wants_ndjson(accept: Optional[str], stream: bool = False) -> bool:
+    """Whether a listing should be streamed (?stream=1 or Accept: application/x-ndjson)"""
+    return stream or (accept is not None and NDJSON_MEDIA_TYPE in accept)
+
+
+async def ndjson_from_cursor(
+    cursor,
+    batch_size: int = STREAM_BATCH_SIZE,
+    transform: Optional[Callable[[dict], dict]] = None
+) -> AsyncIterator[bytes]:
+    """Stream a Motor cursor as NDJSON, one chunk per batch of documents"""
+    lines = []
+    async for doc in cursor.batch_size(batch_size):
+        if transform is not None:
+            doc = transform(doc)
+        lines.append(encode_json(doc))
+        if len(lines) >= batch_size:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        yield b"\n".join(lines) + b"\n"
+
+
+def ndjson_from_encoded(encoded_items: Iterable[bytes], batch_size: int = STREAM_BATCH_SIZE) -> Iterator[bytes]:
+    """Stream already encoded documents as NDJSON, one chunk per batch"""
+    lines = []
+    for item in encoded_items:
+        lines.append(item)
+        if len(lines) >= batch_size:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        yield b"\n".join(lines) + b"\n"
+
+
+def ndjson_response(chunks) -> StreamingResponse:
+    return StreamingResponse(chunks, media_type=NDJSON_MEDIA_TYPE)
+
+
+def parse_fields(value: Optional[str], presets: Dict[str, Optional[Tuple[str, ...]]]) -> Optional[Tuple[str, ...]]:
+    """Turn a ?fields= value into a sorted tuple of field names, or None for the full document.
+
+    Presets and field names can be mixed, e.g. "thumb,rarity". Raises ValueError
+    for names that are not plain field names.
+    """
+    if not value:
+        return None
+    fields = set()
+    for name in (part.strip() for part in value.split(",")):
+        if not name:
+            continue
+        if name in presets:
+            if presets[name] is None:
+                return None
+            fields.update(presets[name])
+        elif FIELD_NAME_PATTERN.match(name):
+            fields.add(name)
+        else:
+            raise ValueError(f"Invalid field name: {name}")
+    return tuple(sorted(fields)) if fields else None
+
+
+def mongo_projection(fields: Optional[Tuple[str, ...]]) -> Optional[dict]:
+    """Mongo projection for a fieldset (_id is always included, as Mongo does by default)"""
+    if fields is None:
+        return None
+    return {field: 1 for field in fields}
+
+
+def project_document(doc: dict, fields: Optional[Tuple[str, ...]]) -> dict:
+    """Apply a fieldset to an in-memory document, the way a Mongo projection would"""
+    if fields is None:
+        return doc
+    projected = {"_id": doc["_id"]} if "_id" in doc else {}
+    for field in fields:
+        if field in doc:
+            projected[field] = doc[field]
+    return projected
@@ -0,0 +1,41 @@
+import pytest
+
+from card_catalog import CardCatalog, encode_cursor
+
+
+def catalog(count=10):
+    cards = CardCatalog()
+    cards.load([
+        {"card_id": f"OGN_{number:03d}", "name": f"Card {number}", "cost": number % 4, "set_code": "OGN"}
+        for number in range(1, count + 1)
+    ])
+    return cards
+
+
+def test_cursor_pages_cover_every_card_once():
+    cards = catalog()
+    bits = cards.select()
+    seen = []
+    cursor = None
+    while True:
+        slots, _, cursor = cards.search_page(bits, sort_by="cost", sort_order="asc", cursor=cursor, limit=3)
+        seen += [cards.get_slot(slot)["card_id"] for slot in slots]
+        if cursor is None:
+            break
+    assert sorted(seen) == [f"OGN_{number:03d}" for number in range(1, 11)]
+    assert len(seen) == len(set(seen))
+
+
+def test_cursor_with_wrong_key_types_is_invalid():
+    cards = catalog()
+    # Right order, but a string where the rank and cost are numbers
+    cursor = encode_cursor("cost:asc", ("one", "two", "OGN_001"))
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        cards.search_page(cards.select(), sort_by="cost", sort_order="asc", cursor=cursor, limit=3)
+
+
+def test_cursor_for_another_order_is_rejected():
+    cards = catalog()
+    cursor = encode_cursor("name:asc", (2, "Card 1", "OGN_001"))
+    with pytest.raises(ValueError):
+        cards.search_page(cards.select(), sort_by="cost", sort_order="asc", cursor=cursor, limit=3)
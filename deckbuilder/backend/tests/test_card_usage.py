@@ -0,0 +1,74 @@
+from collections import Counter
+
+from pymongo import UpdateOne
+
+from card_usage import ALL_DECKS, merge_deltas, play_rates, usage_deltas, usage_operations
+
+CARDS = {
+    "OGN_001": {"set_code": "OGN", "color": ["Fury"]},
+    "OGN_002": {"set_code": "OGN", "color": ["Mind"]},
+    "OGS_003": {"set_code": "OGS", "color": ["Fury"]},
+}
+
+
+def nonzero(deltas):
+    return {name: {key: value for key, value in counter.items() if value} for name, counter in deltas.items()}
+
+
+def test_new_deck_counts_every_card_pair_and_feature():
+    deltas = nonzero(usage_deltas({}, {"OGN_001": 3, "OGN_002": 1}, CARDS))
+    assert deltas["usage"] == {"OGN_001": 1, "OGN_002": 1}
+    assert deltas["copies"] == {"OGN_001": 3, "OGN_002": 1}
+    assert deltas["pairs"] == {("OGN_001", "OGN_002"): 1, ("OGN_002", "OGN_001"): 1}
+    assert deltas["features"] == {ALL_DECKS: 1, "set:OGN": 1, "color:Fury": 1, "color:Mind": 1}
+
+
+def test_adding_a_card_pairs_it_in_both_directions():
+    deltas = nonzero(usage_deltas({"OGN_001": 3, "OGN_002": 1}, {"OGN_001": 3, "OGN_002": 1, "OGS_003": 2}, CARDS))
+    assert deltas["usage"] == {"OGS_003": 1}
+    assert deltas["copies"] == {"OGS_003": 2}
+    assert deltas["pairs"] == {
+        ("OGS_003", "OGN_001"): 1, ("OGN_001", "OGS_003"): 1,
+        ("OGS_003", "OGN_002"): 1, ("OGN_002", "OGS_003"): 1,
+    }
+    assert deltas["features"] == {"set:OGS": 1}
+
+
+def test_changing_copies_leaves_presence_alone():
+    deltas = nonzero(usage_deltas({"OGN_001": 1, "OGN_002": 1}, {"OGN_001": 3, "OGN_002": 1}, CARDS))
+    assert deltas == {"usage": {}, "copies": {"OGN_001": 2}, "pairs": {}, "features": {}}
+
+
+def test_removing_the_last_copy_uncounts_the_card():
+    deltas = nonzero(usage_deltas({"OGN_001": 2, "OGN_002": 1}, {"OGN_001": 2}, CARDS))
+    assert deltas["usage"] == {"OGN_002": -1}
+    assert deltas["copies"] == {"OGN_002": -1}
+    assert deltas["pairs"] == {("OGN_002", "OGN_001"): -1, ("OGN_001", "OGN_002"): -1}
+    assert deltas["features"] == {"color:Mind": -1}
+
+
+def test_deleting_a_deck_undoes_creating_it():
+    quantities = {"OGN_001": 3, "OGN_002": 1, "OGS_003": 2}
+    created = usage_deltas({}, quantities, CARDS)
+    deleted = usage_deltas(quantities, {}, CARDS)
+    assert nonzero(deleted)["features"][ALL_DECKS] == -1
+    total = {}
+    merge_deltas(total, created)
+    merge_deltas(total, deleted)
+    assert all(not value for counter in total.values() for value in counter.values())
+
+
+def test_usage_operations_skip_zero_deltas():
+    deltas = usage_deltas({"OGN_001": 1}, {"OGN_001": 3}, CARDS)
+    operations = usage_operations(deltas)
+    assert operations["card_usage"] == [UpdateOne({"_id": "OGN_001"}, {"$inc": {"copies": 2}}, upsert=True)]
+    assert operations["card_pairs"] == []
+    assert operations["deck_features"] == []
+
+
+def test_play_rates_are_shares_of_all_decks():
+    features = Counter({ALL_DECKS: 4, "color:Fury": 3, "color:Mind": 1, "set:OGN": 4, "color:Calm": 0})
+    assert play_rates(features, "color:", "color") == [
+        {"color": "Fury", "deck_count": 3, "play_rate": 0.75},
+        {"color": "Mind", "deck_count": 1, "play_rate": 0.25},
+    ]
@@ -0,0 +1,68 @@
+import base64
+
+import pytest
+
+from deck_codes import DECK_CODE_VERSION, decode_deck, encode_deck
+
+
+def raw_code(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def test_round_trip_keeps_every_card_and_quantity():
+    quantities = {
+        "OGN_001": 3, "OGN_007a": 2, "OGN_299S": 1, "OGN_300": 1,
+        "OGS_024": 3, "OGN_006": 6, "AB_999": 1,
+    }
+    code = encode_deck(quantities)
+    assert decode_deck(code) == quantities
+    assert "=" not in code and "+" not in code and "/" not in code
+
+
+def test_round_trip_of_a_full_deck_is_short():
+    quantities = {f"OGN_{number:03d}": 3 for number in range(1, 15)}
+    quantities.update({"OGN_200": 1, "OGN_201": 1, "OGN_202": 1, "OGN_250": 1, "OGN_006": 12})
+    code = encode_deck(quantities)
+    assert decode_deck(code) == quantities
+    assert len(code) < 80
+
+
+def test_empty_quantities_are_left_out():
+    assert decode_deck(encode_deck({"OGN_001": 2, "OGN_002": 0})) == {"OGN_001": 2}
+
+
+def test_large_varints_round_trip():
+    assert decode_deck(encode_deck({"OGN_999": 300})) == {"OGN_999": 300}
+
+
+@pytest.mark.parametrize("card_id", ["OGN-001", "ogn_001", "OGN_01", "OGN_001b", "OGNX_001"])
+def test_unencodable_card_ids_are_rejected(card_id):
+    with pytest.raises(ValueError, match="cannot be encoded"):
+        encode_deck({card_id: 1})
+
+
+@pytest.mark.parametrize("code, message", [
+    ("", "Empty"),
+    (raw_code(bytes([DECK_CODE_VERSION + 1, 0])), "Unsupported deck code version"),
+    (raw_code(bytes([DECK_CODE_VERSION, 1])), "Truncated"),
+    (raw_code(bytes([DECK_CODE_VERSION, 1, 3]) + b"og"), "Invalid set code"),
+    (raw_code(bytes([DECK_CODE_VERSION, 0, 0])), "Trailing data"),
+    (raw_code(bytes([DECK_CODE_VERSION, 0x80, 0x80, 0x80, 0x80, 0x80, 0x80])), "Invalid deck code"),
+])
+def test_malformed_codes_are_rejected(code, message):
+    with pytest.raises(ValueError, match=message):
+        decode_deck(code)
+
+
+def test_truncated_entries_are_rejected():
+    code = encode_deck({"OGN_001": 3, "OGN_002": 3})
+    data = base64.urlsafe_b64decode(code + "=" * (-len(code) % 4))
+    with pytest.raises(ValueError, match="Truncated"):
+        decode_deck(raw_code(data[:-1]))
+
+
+def test_invalid_variant_bits_are_rejected():
+    # One set, one entry: number 1 with variant bits 3 (no such suffix)
+    data = bytes([DECK_CODE_VERSION, 1, 3]) + b"OGN" + bytes([1, (1 << 2) | 3, 1])
+    with pytest.raises(ValueError, match="Invalid card"):
+        decode_deck(raw_code(data))
@@ -0,0 +1,124 @@
+import numpy as np
+
+from deck_recommend import DeckMatrix, legend_colors, suggestion_filter
+
+CARDS = {
+    "OGN_001": {"card_type": "Legend", "color": ["Fury"]},
+    "OGN_002": {"card_type": "Unit", "color": ["Fury"]},
+    "OGN_003": {"card_type": "Unit", "color": ["Mind"]},
+    "OGN_004": {"card_type": "Battlefield", "color": ["Colorless"]},
+    "OGN_005": {"card_type": "Spell", "color": ["Colorless"]},
+    "OGN_006": {"card_type": "Spell", "color": []},
+}
+
+
+def test_colorless_cards_fit_any_legend():
+    quantities = {"OGN_001": 1, "OGN_002": 3}
+    _, colors = legend_colors(quantities, CARDS)
+    allowed = suggestion_filter(quantities, CARDS.get, colors)
+    assert colors == {"Fury"}
+    assert allowed("OGN_004")
+    assert allowed("OGN_005")
+    assert allowed("OGN_006")
+    assert not allowed("OGN_003")
+
+
+def test_recommend_with_legend_keeps_colorless_suggestions():
+    matrix = DeckMatrix()
+    matrix.load([
+        ("a", ["OGN_001", "OGN_002", "OGN_004", "OGN_005", "OGN_003"]),
+        ("b", ["OGN_001", "OGN_002", "OGN_004", "OGN_005"]),
+    ])
+    quantities = {"OGN_001": 1, "OGN_002": 3}
+    _, colors = legend_colors(quantities, CARDS)
+    suggestions = matrix.recommend(quantities, suggestion_filter(quantities, CARDS.get, colors), limit=10)
+    assert {suggestion["card_id"] for suggestion in suggestions} == {"OGN_004", "OGN_005"}
+
+
+DECKS = [
+    ("a", ["OGN_001", "OGN_002", "OGN_003"]),
+    ("b", ["OGN_001", "OGN_002"]),
+    ("c", ["OGN_002", "OGN_004"]),
+]
+
+
+def deck_cards(matrix, deck_id):
+    columns = matrix._deck_columns(deck_id)
+    return None if columns is None else {matrix.card_ids[column] for column in columns}
+
+
+def card_scores(matrix, card_ids):
+    return dict(zip(matrix.card_ids, matrix.scores(card_ids)))
+
+
+def popularity(matrix):
+    return {card_id: count for card_id, count in zip(matrix.card_ids, matrix.popularity) if count}
+
+
+def assert_same_as_fresh_load(matrix, decks):
+    fresh = DeckMatrix()
+    fresh.load(decks)
+    assert len(matrix) == len(fresh)
+    assert popularity(matrix) == popularity(fresh)
+    for deck_id, _ in decks:
+        assert deck_cards(matrix, deck_id) == deck_cards(fresh, deck_id)
+    for partial in (["OGN_002"], ["OGN_001", "OGN_005"], []):
+        expected = card_scores(fresh, partial)
+        actual = card_scores(matrix, partial)
+        for card_id, score in expected.items():
+            assert np.isclose(actual[card_id], score)
+
+
+def test_update_moves_the_deck_to_pending():
+    matrix = DeckMatrix()
+    matrix.load(DECKS)
+    matrix.update("b", ["OGN_002", "OGN_005"])
+    matrix.update("d", ["OGN_005"])
+    assert not matrix.alive[matrix.row_of["b"]]
+    assert set(matrix.pending) == {"b", "d"}
+    assert deck_cards(matrix, "b") == {"OGN_002", "OGN_005"}
+    assert_same_as_fresh_load(matrix, [DECKS[0], ("b", ["OGN_002", "OGN_005"]), DECKS[2], ("d", ["OGN_005"])])
+
+
+def test_remove_drops_live_and_pending_decks():
+    matrix = DeckMatrix()
+    matrix.load(DECKS)
+    matrix.update("d", ["OGN_005"])
+    matrix.remove("a")
+    matrix.remove("d")
+    assert deck_cards(matrix, "a") is None
+    assert matrix.pending == {}
+    assert_same_as_fresh_load(matrix, DECKS[1:])
+
+
+def test_compaction_merges_pending_rows():
+    matrix = DeckMatrix()
+    matrix.load(DECKS)
+    matrix.update("a", ["OGN_003", "OGN_005"])
+    matrix.remove("c")
+    matrix.update("d", ["OGN_001", "OGN_005"])
+    assert matrix.needs_compaction()
+
+    snapshot = matrix.compaction_snapshot()
+    matrix.install(snapshot, DeckMatrix.compact(snapshot))
+    assert matrix.pending == {}
+    assert matrix.alive.all()
+    assert not matrix.needs_compaction()
+    assert_same_as_fresh_load(matrix, [("a", ["OGN_003", "OGN_005"]), DECKS[1], ("d", ["OGN_001", "OGN_005"])])
+
+
+def test_writes_during_compaction_stay_pending():
+    matrix = DeckMatrix()
+    matrix.load(DECKS)
+    matrix.update("d", ["OGN_004"])
+    snapshot = matrix.compaction_snapshot()
+    assert not matrix.needs_compaction()
+    matrices = DeckMatrix.compact(snapshot)
+    matrix.update("d", ["OGN_001", "OGN_003"])
+    matrix.remove("a")
+    matrix.install(snapshot, matrices)
+
+    assert set(matrix.pending) == {"d"}
+    assert not matrix.alive[matrix.row_of["a"]]
+    assert not matrix.alive[matrix.row_of["d"]]
+    assert_same_as_fresh_load(matrix, [DECKS[1], DECKS[2], ("d", ["OGN_001", "OGN_003"])])
@@ -0,0 +1,88 @@
+from deck_format import compact_fields
+from deck_rules import add_card_filter, add_card_violation, counter_increments, deck_violations
+
+CARD_TYPES = {
+    "LEG_001": "Legend", "LEG_002": "Legend",
+    "SIG_001": "Signature Unit", "SIG_002": "Signature Spell",
+    "BF_001": "Battlefield", "BF_002": "Battlefield", "BF_003": "Battlefield", "BF_004": "Battlefield",
+    "RUN_001": "Rune",
+}
+CARD_TYPES.update({f"OGN_{number:03d}": "Unit" for number in range(1, 20)})
+
+
+def stored(quantities):
+    """A stored deck document with its counters"""
+    return compact_fields(quantities, CARD_TYPES)
+
+
+def legal_quantities():
+    quantities = {f"OGN_{number:03d}": 3 for number in range(1, 14)}
+    quantities["OGN_014"] = 1
+    quantities.update({"LEG_001": 1, "BF_001": 1, "BF_002": 1, "BF_003": 1, "RUN_001": 12})
+    return quantities
+
+
+def test_legal_deck_has_no_violations():
+    assert deck_violations(legal_quantities(), CARD_TYPES) == []
+
+
+def test_deck_violations_report_every_broken_rule():
+    quantities = {**legal_quantities(), "OGN_001": 4, "BF_004": 1, "LEG_002": 1, "XYZ_001": 1}
+    violations = deck_violations(quantities, CARD_TYPES)
+    assert "Unknown card IDs: XYZ_001" in violations
+    assert "Regular deck cannot exceed 40 cards" in violations
+    assert "You must have exactly 3 Battlefield cards" in violations
+    assert "You must have exactly 1 Legend card" in violations
+    assert "Cannot have more than 3 copies of OGN_001" in violations
+
+
+def test_fourth_copy_is_rejected():
+    deck = stored({"OGN_001": 3})
+    assert add_card_violation(deck, "OGN_001", "Unit") == "Cannot have more than 3 copies of OGN_001"
+    assert add_card_violation(stored({"OGN_001": 2}), "OGN_001", "Unit") is None
+
+
+def test_full_main_deck_is_rejected():
+    quantities = {f"OGN_{number:03d}": 3 for number in range(1, 14)}
+    quantities["OGN_014"] = 1
+    assert add_card_violation(stored(quantities), "OGN_015", "Unit") == "Deck is full (40 cards)"
+
+
+def test_second_legend_is_rejected():
+    deck = stored({"LEG_001": 1})
+    assert add_card_violation(deck, "LEG_002", "Legend") == "Deck already has 1 Legend card(s)"
+
+
+def test_signature_card_with_a_legend_is_rejected():
+    deck = stored({"LEG_001": 1})
+    assert add_card_violation(deck, "SIG_001", "Signature Unit") == (
+        "You can only have 1 Legend, Signature Unit, or Signature Spell card in your deck"
+    )
+    assert add_card_violation(stored({"SIG_001": 1}), "SIG_002", "Signature Spell") is not None
+    assert add_card_violation(stored({"OGN_001": 3}), "SIG_001", "Signature Unit") is None
+
+
+def test_fourth_battlefield_is_rejected():
+    deck = stored({"BF_001": 1, "BF_002": 1, "BF_003": 1})
+    assert add_card_violation(deck, "BF_004", "Battlefield") == "Deck already has 3 Battlefield card(s)"
+    assert add_card_violation(stored({"BF_001": 1, "BF_002": 1}), "BF_003", "Battlefield") is None
+
+
+def test_thirteenth_rune_is_rejected():
+    assert add_card_violation(stored({"RUN_001": 12}), "RUN_001", "Rune") is not None
+
+
+def test_add_card_filter_mirrors_the_limits():
+    assert add_card_filter("OGN_001", "Unit") == {
+        "section_counts.main": {"$not": {"$gte": 40}},
+        "sections.main.OGN_001": {"$not": {"$gte": 3}},
+    }
+    assert add_card_filter("SIG_001", "Signature Unit")["special_count"] == {"$not": {"$gte": 1}}
+    assert add_card_filter("BF_001", "Battlefield") == {"section_counts.battlefields": {"$not": {"$gte": 3}}}
+
+
+def test_counter_increments_track_sections_and_special_cards():
+    assert counter_increments("LEG_001", "Legend", 1) == {
+        "sections.legend.LEG_001": 1, "section_counts.legend": 1, "special_count": 1,
+    }
+    assert counter_increments("OGN_001", "Unit", -1) == {"sections.main.OGN_001": -1, "section_counts.main": -1}
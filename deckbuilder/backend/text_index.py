@@ -0,0 +1,180 @@
+"""
+Inverted token and n-gram index for the free-text card search.
+
+The old search compiled an unanchored case-insensitive regex and ran it over
+name, description, flavor_text, keywords and subtype, which MongoDB can only
+answer with a full collection scan. This index keeps, per field, the card
+bitmap (see card_catalog) of every 1-, 2- and 3-character gram and of every
+word token, so a substring query only has to verify the few cards whose grams
+all match. Results can be ranked so name hits come before description hits.
+"""
+
+import re
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from bitmaps import bit_positions
+
+
+# Longest gram stored in the index; longer queries are split into grams of this size
+GRAM_SIZE = 3
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# (exact, prefix, word prefix, substring) scores per field. The name tiers are all
+# above every other field, so any name hit ranks above keyword/subtype/description hits.
+FIELD_SCORES = {
+    "name": (100, 90, 80, 70),
+    "keywords": (50, 45, 40, 35),
+    "subtype": (50, 45, 40, 35),
+    "description": (25, 20, 15, 10),
+    "flavor_text": (8, 6, 4, 2),
+}
+
+
+def _field_texts(value) -> List[str]:
+    """Lower-cased strings of a field: the string itself, or each string of an array"""
+    if isinstance(value, str):
+        return [value.lower()]
+    if isinstance(value, list):
+        return [item.lower() for item in value if isinstance(item, str)]
+    return []
+
+
+def _grams(text: str) -> set:
+    """Every substring of length 1..GRAM_SIZE"""
+    grams = set()
+    for size in range(1, GRAM_SIZE + 1):
+        for start in range(len(text) - size + 1):
+            grams.add(text[start:start + size])
+    return grams
+
+
+class CardTextIndex:
+    """Per-field gram and token postings, stored as slot bitmaps"""
+
+    def __init__(self, fields: Tuple[str, ...]):
+        self.fields = fields
+        self._grams: Dict[str, Dict[str, int]] = {field: {} for field in fields}
+        self._tokens: Dict[str, Dict[str, int]] = {field: {} for field in fields}
+        # Sorted token lists for prefix lookups, rebuilt lazily after writes
+        self._sorted_tokens: Dict[str, Optional[List[str]]] = {field: None for field in fields}
+        # slot -> field -> lower-cased texts, used to verify long queries and to rank
+        self._texts: Dict[int, Dict[str, List[str]]] = {}
+
+    def add(self, slot: int, card: dict):
+        bit = 1 << slot
+        texts = {}
+        for field in self.fields:
+            values = _field_texts(card.get(field))
+            texts[field] = values
+            grams = self._grams[field]
+            tokens = self._tokens[field]
+            for text in values:
+                for gram in _grams(text):
+                    grams[gram] = grams.get(gram, 0) | bit
+                for token in TOKEN_PATTERN.findall(text):
+                    if token not in tokens:
+                        self._sorted_tokens[field] = None
+                    tokens[token] = tokens.get(token, 0) | bit
+        self._texts[slot] = texts
+
+    def remove(self, slot: int):
+        texts = self._texts.pop(slot, None)
+        if texts is None:
+            return
+        mask = ~(1 << slot)
+        for field, values in texts.items():
+            for text in values:
+                self._clear_bit(self._grams[field], _grams(text), mask)
+                if self._clear_bit(self._tokens[field], TOKEN_PATTERN.findall(text), mask):
+                    self._sorted_tokens[field] = None
+
+    @staticmethod
+    def _clear_bit(postings: Dict[str, int], keys, mask: int) -> bool:
+        """Clear one slot from the given postings; returns True if a key disappeared"""
+        dropped = False
+        for key in keys:
+            remaining = postings.get(key, 0) & mask
+            if remaining:
+                postings[key] = remaining
+            elif postings.pop(key, None) is not None:
+                dropped = True
+        return dropped
+
+    # ----- Matching -----
+
+    def match(self, query: str, fields: Tuple[str, ...], candidates: int = -1) -> int:
+        """Bitmap of the cards where any of the fields contains the query (case-insensitive).
+
+        `candidates` restricts the result (and the verification work) to a bitmap.
+        """
+        query = query.lower()
+        bits = 0
+        for field in fields:
+            bits |= self._match_field(query, field, candidates)
+        return bits
+
+    def _match_field(self, query: str, field: str, candidates: int) -> int:
+        grams = self._grams[field]
+        if len(query) <= GRAM_SIZE:
+            # Short queries are grams themselves, so the postings are exact
+            return grams.get(query, 0) & candidates
+
+        bits = candidates
+        for start in range(len(query) - GRAM_SIZE + 1):
+            bits &= grams.get(query[start:start + GRAM_SIZE], 0)
+            if not bits:
+                return 0
+
+        # All grams present does not guarantee the substring is, so verify
+        misses = 0
+        for slot in bit_positions(bits):
+            if not any(query in text for text in self._texts[slot][field]):
+                misses |= 1 << slot
+        return bits & ~misses
+
+    def token_prefix(self, prefix: str, field: str) -> int:
+        """Bitmap of the cards with a word in the field starting with the prefix"""
+        prefix = prefix.lower()
+        sorted_tokens = self._sorted_tokens[field]
+        if sorted_tokens is None:
+            sorted_tokens = sorted(self._tokens[field])
+            self._sorted_tokens[field] = sorted_tokens
+        tokens = self._tokens[field]
+        bits = 0
+        index = bisect_left(sorted_tokens, prefix)
+        while index < len(sorted_tokens) and sorted_tokens[index].startswith(prefix):
+            bits |= tokens[sorted_tokens[index]]
+            index += 1
+        return bits
+
+    # ----- Ranking -----
+
+    def scores(self, slots: List[int], query: str, fields: Tuple[str, ...]) -> Dict[int, int]:
+        """Match-quality score of each slot for the query: the best field tier that matches"""
+        query = query.lower()
+        word_prefix_bits = {field: self.token_prefix(query, field) for field in fields}
+        result = {}
+        for slot in slots:
+            texts = self._texts.get(slot, {})
+            best = 0
+            for field in fields:
+                exact_score, prefix_score, word_prefix_score, substring_score = FIELD_SCORES.get(field, (1, 1, 1, 1))
+                if exact_score <= best:
+                    # This field cannot beat the current best
+                    continue
+                values = texts.get(field, [])
+                if any(text == query for text in values):
+                    score = exact_score
+                elif any(text.startswith(query) for text in values):
+                    score = prefix_score
+                elif (word_prefix_bits[field] >> slot) & 1:
+                    score = word_prefix_score
+                elif any(query in text for text in values):
+                    score = substring_score
+                else:
+                    continue
+                best = max(best, score)
+            result[slot] = best
+        return result
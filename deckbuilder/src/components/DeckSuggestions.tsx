@@ -0,0 +1,73 @@
+import React, { useEffect, useState } from 'react';
+import { Card } from '../types';
+import { deckService, CardSuggestion } from '../services/deckService';
+
+interface DeckSuggestionsProps {
+  cardIds: string[];
+  legendId?: string;
+  cards: Card[];
+  onAddCard: (card: Card) => void;
+}
+
+const DeckSuggestions: React.FC<DeckSuggestionsProps> = ({ cardIds, legendId, cards, onAddCard }) => {
+  const [suggestions, setSuggestions] = useState<CardSuggestion[]>([]);
+  const cardKey = cardIds.join(',');
+
+  useEffect(() => {
+    // Wait until the deck stops changing before asking for new suggestions
+    let cancelled = false;
+    const timeout = setTimeout(() => {
+      deckService.getRecommendations(cardIds, legendId)
+        .then((result) => !cancelled && setSuggestions(result))
+        .catch(() => !cancelled && setSuggestions([]));
+    }, 300);
+    return () => {
+      cancelled = true;
+      clearTimeout(timeout);
+    };
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [cardKey, legendId]);
+
+  const suggestedCards = suggestions
+    .map((suggestion) => cards.find((card) => card.card_id === suggestion.card_id))
+    .filter((card): card is Card => card !== undefined);
+
+  return (
+    <div className="bg-base-200 p-4 rounded-lg space-y-3">
+      <h3 className="text-lg font-semibold">Suggested Cards</h3>
+      {suggestedCards.length === 0 ? (
+        <div className="text-center py-4 text-base-content/50 text-sm">
+          No suggestions yet
+        </div>
+      ) : (
+        <div className="space-y-2 max-h-64 overflow-y-auto">
+          {suggestedCards.map((card) => (
+            <div
+              key={card.card_id}
+              className="flex items-center gap-2 p-2 bg-base-100 rounded-lg cursor-pointer hover:bg-base-300"
+              onClick={() => onAddCard(card)}
+              title={`Click to add ${card.name} to deck`}
+            >
+              <img
+                src={`/image/${card.set_name}/${card.image_path}`}
+                alt={card.name}
+                className="w-10 h-12 object-cover rounded"
+                onError={(e) => {
+                  const target = e.target as HTMLImageElement;
+                  target.src = 'https://via.placeholder.com/40x48?text=Card';
+                }}
+              />
+              <div className="flex-1 min-w-0">
+                <h5 className="font-semibold text-xs truncate">{card.name}</h5>
+                <p className="text-xs text-base-content/50">{card.card_type}</p>
+              </div>
+              <div className="badge badge-primary badge-sm">{card.card_id}</div>
+            </div>
+          ))}
+        </div>
+      )}
+    </div>
+  );
+};
+
+export default DeckSuggestions;
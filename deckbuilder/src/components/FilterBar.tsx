@@ -1,9 +1,10 @@
-import React from 'react';
-import { Card, CardColor } from '../types';
+import React, { useState } from 'react';
+import { Card, CardColor, CardCompletion } from '../types';
 
 interface FilterBarProps {
   searchTerm: string;
   onSearchChange: (value: string) => void;
+  completions?: CardCompletion[];
   selectedSet: string;
   onSetChange: (value: string) => void;
   selectedType: string;
@@ -26,6 +27,7 @@ interface FilterBarProps {
 const FilterBar: React.FC<FilterBarProps> = ({
   searchTerm,
   onSearchChange,
+  completions = [],
   selectedSet,
   onSetChange,
   selectedType,
@@ -50,6 +52,7 @@ const FilterBar: React.FC<FilterBarProps> = ({
   const uniqueRarities = ['all', ...Array.from(new Set(cards.map(card => card.rarity)))];
   const uniqueColors = ['all', ...Array.from(new Set(cards.flatMap(card => card.color || [])))];
   const costOptions = ['all', '0', '1', '2', '3', '4', '5', '6', '7+'];
+  const [showCompletions, setShowCompletions] = useState(false);
 
   return (
     <div className="bg-base-200 p-4 rounded-lg space-y-3">
@@ -61,8 +64,34 @@ const FilterBar: React.FC<FilterBarProps> = ({
             placeholder="Search Cards by Name, ID, set, type etc"
             className="input input-bordered w-full pr-10"
             value={searchTerm}
-            onChange={(e) => onSearchChange(e.target.value)}
+            onChange={(e) => {
+              onSearchChange(e.target.value);
+              setShowCompletions(true);
+            }}
+            onFocus={() => setShowCompletions(true)}
+            onBlur={() => setShowCompletions(false)}
           />
+          {showCompletions && completions.length > 0 && (
+            <ul className="menu bg-base-100 rounded-box shadow-lg absolute left-0 right-0 top-full mt-1 z-20">
+              {completions.map(completion => (
+                <li key={`${completion.field}:${completion.text}`}>
+                  <button
+                    type="button"
+                    className="flex justify-between"
+                    // Keeps the input focused until the click lands
+                    onMouseDown={(e) => e.preventDefault()}
+                    onClick={() => {
+                      onSearchChange(completion.text);
+                      setShowCompletions(false);
+                    }}
+                  >
+                    <span>{completion.text}</span>
+                    <span className="text-xs text-base-content/50">{completion.field}</span>
+                  </button>
+                </li>
+              ))}
+            </ul>
+          )}
           <button className="absolute right-2 top-1/2 transform -translate-y-1/2">
             <svg className="w-5 h-5" fill="none" stroke="currentColor" viewBox="0 0 24 24">
               <path strokeLinecap="round" strokeLinejoin="round" strokeWidth="2" d="M21 21l-6-6m2-5a7 7 0 11-14 0 7 7 0 0114 0z" />
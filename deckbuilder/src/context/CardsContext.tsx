@@ -1,5 +1,5 @@
 import React, { createContext, useContext, useState, useEffect, ReactNode } from 'react';
-import { Card, CardColor } from '../types';
+import { Card, CardColor, CardCompletion } from '../types';
 import { cardsService } from '../services/cardsService';
 
 interface CardsContextType {
@@ -9,6 +9,7 @@ interface CardsContextType {
   filteredCards: Card[];
   searchTerm: string;
   setSearchTerm: (term: string) => void;
+  completions: CardCompletion[];
   selectedSet: string;
   setSelectedSet: (set: string) => void;
   selectedType: string;
@@ -43,6 +44,7 @@ export const CardsProvider: React.FC<CardsProviderProps> = ({ children }) => {
   
   // Filter states
   const [searchTerm, setSearchTerm] = useState('');
+  const [completions, setCompletions] = useState<CardCompletion[]>([]);
   const [selectedSet, setSelectedSet] = useState('all');
   const [selectedType, setSelectedType] = useState('all');
   const [selectedRarity, setSelectedRarity] = useState('all');
@@ -72,6 +74,25 @@ export const CardsProvider: React.FC<CardsProviderProps> = ({ children }) => {
     fetchCards();
   }, []);
 
+  // Type-ahead completions for the search dropdown, from the server's autocomplete index once typing pauses
+  useEffect(() => {
+    const prefix = searchTerm.trim();
+    if (!prefix) {
+      setCompletions([]);
+      return;
+    }
+    let cancelled = false;
+    const timeout = setTimeout(() => {
+      cardsService.autocomplete(prefix, 8)
+        .then((result) => !cancelled && setCompletions(result))
+        .catch(() => !cancelled && setCompletions([]));
+    }, 200);
+    return () => {
+      cancelled = true;
+      clearTimeout(timeout);
+    };
+  }, [searchTerm]);
+
   // Apply filters whenever filter states change
   useEffect(() => {
     applyFilters();
@@ -132,6 +153,7 @@ export const CardsProvider: React.FC<CardsProviderProps> = ({ children }) => {
     filteredCards,
     searchTerm,
     setSearchTerm,
+    completions,
     selectedSet,
     setSelectedSet,
     selectedType,
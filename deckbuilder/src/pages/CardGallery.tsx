@@ -13,6 +13,7 @@ const CardGalleryContent: React.FC = () => {
     filteredCards,
     searchTerm,
     setSearchTerm,
+    completions,
     selectedSet,
     setSelectedSet,
     selectedType,
@@ -49,6 +50,7 @@ const CardGalleryContent: React.FC = () => {
       <FilterBar
         searchTerm={searchTerm}
         onSearchChange={setSearchTerm}
+        completions={completions}
         selectedSet={selectedSet}
         onSetChange={setSelectedSet}
         selectedType={selectedType}
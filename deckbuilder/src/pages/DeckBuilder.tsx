@@ -9,6 +9,7 @@ import DeckStats from '../components/DeckStats';
 import LoadingSpinner from '../components/LoadingSpinner';
 import ErrorModal from '../components/ErrorModal';
 import DeckValidationModal from '../components/DeckValidationModal';
+import DeckSuggestions from '../components/DeckSuggestions';
 
 const DeckBuilderContent: React.FC = () => {
   const {
@@ -17,6 +18,7 @@ const DeckBuilderContent: React.FC = () => {
     filteredCards,
     searchTerm,
     setSearchTerm,
+    completions,
     selectedSet,
     setSelectedSet,
     selectedType,
@@ -81,6 +83,7 @@ const DeckBuilderContent: React.FC = () => {
           <FilterBar
             searchTerm={searchTerm}
             onSearchChange={setSearchTerm}
+            completions={completions}
             selectedSet={selectedSet}
             onSetChange={setSelectedSet}
             selectedType={selectedType}
@@ -191,6 +194,19 @@ const DeckBuilderContent: React.FC = () => {
             </button>
           </div>
 
+          {/* Suggestions from similar stored decks */}
+          <DeckSuggestions
+            cardIds={[
+              ...deck.card_ids,
+              ...specialCards.battlefield.map((card: Card) => card.card_id),
+              ...specialCards.rune.map((card: Card) => card.card_id),
+              ...(specialCards.legend ? [specialCards.legend.card_id] : [])
+            ]}
+            legendId={specialCards.legend?.card_id}
+            cards={cards}
+            onAddCard={handleAddCard}
+          />
+
           {/* Special Cards Section */}
           <div className="bg-base-200 p-4 rounded-lg space-y-4">
             <h3 className="text-lg font-semibold">Special Cards</h3>
@@ -2,7 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { Card, Deck } from '../types';
 import { CardsProvider, useCards } from '../context/CardsContext';
 import { useErrorModal } from '../hooks/useErrorModal';
-import { deckService } from '../services/deckService';
+import { deckService, DeckSummary } from '../services/deckService';
 import CardImage from '../components/CardImage';
 import DeckStats from '../components/DeckStats';
 import LoadingSpinner from '../components/LoadingSpinner';
@@ -16,17 +16,20 @@ interface SavedDeck extends Deck {
 
 const DeckViewerContent: React.FC = () => {
   const { cards: allCards, loading: cardsLoading } = useCards();
-  const [savedDecks, setSavedDecks] = useState<SavedDeck[]>([]);
+  const [savedDecks, setSavedDecks] = useState<DeckSummary[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [selectedDeck, setSelectedDeck] = useState<SavedDeck | null>(null);
   const { errorModal, showError, closeError } = useErrorModal();
 
-  // Fetch saved decks
+  // Fetch the first page of saved deck summaries
   useEffect(() => {
     const fetchDecks = async () => {
       try {
-        const decks = await deckService.getDecks();
-        setSavedDecks(decks);
+        const page = await deckService.getDecks();
+        setSavedDecks(page.decks);
+        setNextCursor(page.next_cursor);
       } catch (error) {
         console.error('Error fetching decks:', error);
         showError('Error', 'Failed to fetch saved decks', 'error');
@@ -38,6 +41,35 @@ const DeckViewerContent: React.FC = () => {
     fetchDecks();
   }, [showError]);
 
+  // Fetch the next page of saved deck summaries
+  const loadMoreDecks = async () => {
+    if (!nextCursor) {
+      return;
+    }
+    setLoadingMore(true);
+    try {
+      const page = await deckService.getDecks({ cursor: nextCursor });
+      setSavedDecks([...savedDecks, ...page.decks]);
+      setNextCursor(page.next_cursor);
+    } catch (error) {
+      console.error('Error fetching decks:', error);
+      showError('Error', 'Failed to fetch more decks', 'error');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  // Summaries have no card list, so the full deck is fetched when selected
+  const selectDeck = async (deckId: string) => {
+    try {
+      const deck = await deckService.getDeckById(deckId);
+      setSelectedDeck(deck as SavedDeck | null);
+    } catch (error) {
+      console.error('Error fetching deck:', error);
+      showError('Error', 'Failed to fetch deck', 'error');
+    }
+  };
+
   // Get deck cards with full details and count
   const getDeckCardsWithCount = (deck: SavedDeck) => {
     return deck.card_ids.reduce((acc, cardId) => {
@@ -137,22 +169,28 @@ const DeckViewerContent: React.FC = () => {
                         ? 'bg-primary text-primary-content' 
                         : 'bg-base-100 hover:bg-base-300'
                     }`}
-                    onClick={() => setSelectedDeck(deck)}
+                    onClick={() => selectDeck(deck._id)}
                   >
                     <h4 className="font-semibold text-sm truncate">{deck.name}</h4>
-                    {(() => {
-                      const counts = getDeckCardCounts(deck);
-                      return (
-                        <p className="text-xs opacity-70">
-                          {counts.regular}/40, {counts.battlefield}/3, {counts.legend}/1, {counts.rune}/12
-                        </p>
-                      );
-                    })()}
+                    {deck.section_counts && (
+                      <p className="text-xs opacity-70">
+                        {deck.section_counts.main ?? 0}/40, {deck.section_counts.battlefields ?? 0}/3, {deck.section_counts.legend ?? 0}/1, {deck.section_counts.runes ?? 0}/12
+                      </p>
+                    )}
                     <p className="text-xs opacity-50">
                       {new Date(deck.created_at).toLocaleDateString()}
                     </p>
                   </div>
                 ))}
+                {nextCursor && (
+                  <button
+                    className="btn btn-ghost btn-sm w-full"
+                    onClick={loadMoreDecks}
+                    disabled={loadingMore}
+                  >
+                    {loadingMore ? 'Loading...' : 'Load more'}
+                  </button>
+                )}
               </div>
             )}
           </div>
@@ -1,4 +1,4 @@
-import { Card } from '../types';
+import { Card, CardCompletion } from '../types';
 
 class CardsService {
   private baseUrl = '';
@@ -47,6 +47,20 @@ class CardsService {
       throw error;
     }
   }
+
+  async autocomplete(prefix: string, limit: number = 10): Promise<CardCompletion[]> {
+    try {
+      const response = await fetch(`${this.baseUrl}/cards/autocomplete?prefix=${encodeURIComponent(prefix)}&limit=${limit}`);
+      if (!response.ok) {
+        throw new Error(`Failed to autocomplete cards: ${response.statusText}`);
+      }
+      const data = await response.json();
+      return data.completions || [];
+    } catch (error) {
+      console.error('Error autocompleting cards:', error);
+      throw error;
+    }
+  }
 }
 
 export const cardsService = new CardsService();
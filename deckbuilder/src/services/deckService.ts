@@ -1,4 +1,4 @@
-import { Deck } from '../types';
+import { Card, Deck, DeckSection } from '../types';
 
 interface SavedDeck extends Deck {
   _id: string;
@@ -6,17 +6,54 @@ interface SavedDeck extends Deck {
   updated_at: string;
 }
 
+export interface DeckSummary extends Omit<SavedDeck, 'card_ids' | 'sections'> {
+  section_counts?: Partial<Record<DeckSection, number>>;
+  legend_id?: string | null;
+}
+
+export interface DeckListOptions {
+  sortBy?: 'updated_at' | 'name';
+  sortOrder?: 'asc' | 'desc';
+  color?: string;
+  legend?: string;
+  namePrefix?: string;
+  cursor?: string | null;
+  limit?: number;
+}
+
+export interface CardSuggestion {
+  card_id: string;
+  score: number;
+  deck_count: number;
+  in_deck: number;
+  card: Partial<Card> | null;
+}
+
+export interface DeckPage {
+  decks: DeckSummary[];
+  next_cursor: string | null;
+}
+
 class DeckService {
   private baseUrl = '';
 
-  async getDecks(): Promise<SavedDeck[]> {
+  async getDecks(options: DeckListOptions = {}): Promise<DeckPage> {
     try {
-      const response = await fetch(`${this.baseUrl}/decks`);
+      const params = new URLSearchParams();
+      if (options.sortBy) params.set('sort_by', options.sortBy);
+      if (options.sortOrder) params.set('sort_order', options.sortOrder);
+      if (options.color) params.set('color', options.color);
+      if (options.legend) params.set('legend', options.legend);
+      if (options.namePrefix) params.set('name_prefix', options.namePrefix);
+      if (options.cursor) params.set('cursor', options.cursor);
+      if (options.limit) params.set('limit', String(options.limit));
+
+      const response = await fetch(`${this.baseUrl}/decks?${params.toString()}`);
       if (!response.ok) {
         throw new Error(`Failed to fetch decks: ${response.statusText}`);
       }
       const data = await response.json();
-      return data.decks || [];
+      return { decks: data.decks || [], next_cursor: data.next_cursor || null };
     } catch (error) {
       console.error('Error fetching decks:', error);
       throw error;
@@ -40,6 +77,26 @@ class DeckService {
     }
   }
 
+  async getRecommendations(cardIds: string[], legend?: string, limit = 12): Promise<CardSuggestion[]> {
+    try {
+      const response = await fetch(`${this.baseUrl}/decks/recommend`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ card_ids: cardIds, legend, limit }),
+      });
+      if (!response.ok) {
+        throw new Error(`Failed to fetch recommendations: ${response.statusText}`);
+      }
+      const data = await response.json();
+      return data.suggestions || [];
+    } catch (error) {
+      console.error('Error fetching recommendations:', error);
+      throw error;
+    }
+  }
+
   async saveDeck(deck: Omit<Deck, '_id' | 'created_at' | 'updated_at'>): Promise<SavedDeck> {
     try {
       const response = await fetch(`${this.baseUrl}/decks`, {
@@ -21,11 +21,20 @@ export interface Card {
   updated_at?: string;
 }
 
+export interface CardCompletion {
+  text: string;
+  field: "name" | "keywords" | "subtype";
+  card_id: string; // First matching card, e.g. the regular variant of a name
+  card_ids: string[];
+}
+
 export interface Deck {
   _id?: string;
   name: string;
   description?: string;
   card_ids: string[];
+  // Quantities per card, e.g. { main: { OGN_001: 3 }, runes: { OGN_006: 6 } } (returned by the backend)
+  sections?: Partial<Record<DeckSection, Record<string, number>>>;
   deck_colors: CardColor[];
   average_cost: number;
   card_type_distribution: Record<CardType, number>;
@@ -33,6 +42,8 @@ export interface Deck {
   updated_at?: string;
 }
 
+export type DeckSection = "main" | "battlefields" | "legend" | "runes";
+
 export type CardType = 
   | "Spell"
   | "Unit"